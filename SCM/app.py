@@ -1,9 +1,12 @@
 import streamlit as st
 import base64
 from utils.auth import check_auth, init_auth
-from utils.db import init_database, init_admin
+from utils.db import init_database, init_admin, flush_telemetry
+from utils.telemetry import configure_logging, page_timer
 from views import home, assessment, dashboard, documentation, admin, projects
 
+configure_logging()
+
 # Page configuration
 st.set_page_config(
     page_title="Stormwater Infrastructure Assessment",
@@ -213,15 +216,20 @@ def main():
             if st.session_state.get("is_admin", False):
                 pages["⚙️ Admin"] = admin.show
 
-            # Navigation buttons with enhanced styling
-            selected_page = None
+            # Navigation buttons with enhanced styling; the choice is kept in
+            # session state so widgets inside a page can rerun without leaving it
+            selected_name = st.session_state.get("current_page", "🏠 Dashboard")
             for page_name, page_func in pages.items():
                 if st.button(
                     page_name,
                     use_container_width=True,
                     key=f"nav_{page_name}"
                 ):
-                    selected_page = page_func
+                    selected_name = page_name
+                    st.session_state.current_page = page_name
+            if selected_name not in pages:
+                selected_name = "🏠 Dashboard"
+            selected_page = pages[selected_name]
 
             # Clean divider before user section
             st.markdown('<hr style="margin: 20px 0; border: none; height: 1px; background: linear-gradient(to right, rgba(0,0,0,0), rgba(0,0,0,0.1), rgba(0,0,0,0));">', unsafe_allow_html=True)
@@ -244,14 +252,16 @@ def main():
                 st.session_state.authenticated = False
                 st.session_state.is_admin = False
                 st.session_state.user_id = None
+                st.session_state.pop("current_page", None)
                 st.rerun()
 
     # Main content area
-    with st.container():
-        if selected_page:
-            selected_page()
-        else:
-            dashboard.show()  # Default to dashboard
+    with st.container(), page_timer(selected_name.split(" ", 1)[1]):
+        selected_page()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Persist sampled timings; only writes once FLUSH_INTERVAL has passed
+        flush_telemetry()
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""Benchmark database bootstrap time on process cold start.
+
+Compares the old delete-and-reseed startup (drop the file, create every
+table, hash demo passwords, insert 200 assessments) with the migration
+runner against a database whose schema is already current.
+
+Run from the SCM directory:
+    python benchmarks/bench_cold_start.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_migration import migrate
+from utils.seed_data import seed_demo_data
+
+def dict_factory(cursor, row):
+    return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = dict_factory
+    return conn
+
+def legacy_startup(path):
+    """Replicates the previous init_database: delete, recreate, reseed"""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path)
+    migrate(conn)
+    seed_demo_data(conn)
+    conn.close()
+
+def migrated_startup(path):
+    conn = connect(path)
+    migrate(conn)
+    conn.close()
+
+def timeit(func, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        legacy_best, legacy_mean = timeit(legacy_startup, path, 3)
+        current_best, current_mean = timeit(migrated_startup, path, 50)
+
+    print(f"{'startup':<28}{'best (ms)':>12}{'mean (ms)':>12}")
+    print(f"{'delete + reseed (before)':<28}{legacy_best * 1000:>12.2f}{legacy_mean * 1000:>12.2f}")
+    print(f"{'migrate, schema current':<28}{current_best * 1000:>12.2f}{current_mean * 1000:>12.2f}")
+    print(f"speedup: {legacy_mean / current_mean:,.0f}x")
+
+if __name__ == "__main__":
+    main()
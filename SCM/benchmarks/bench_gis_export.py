@@ -0,0 +1,80 @@
+"""Benchmark exporting an infrastructure layer in each file format.
+
+For 10k and 100k synthetic points, times (and with --memory measures the
+peak traced memory of) writing:
+
+* legacy geojson - json.loads(gdf.to_json()) then json.dumps(indent=2), as
+  GISManager.export_geojson used to
+* geojson - features streamed to disk in chunks
+* parquet - GeoParquet
+* fgb - FlatGeobuf with its spatial index
+
+Run from the SCM directory:
+    python benchmarks/bench_gis_export.py [--memory] [counts...]
+"""
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.gis_export import LAYER_EXPORT_FORMATS, write_layer
+from utils.gis_layers import points_to_geodataframe
+
+TYPES = ['pipes', 'culverts', 'drainageInlets', 'manholes', 'channels', 'retention_ponds']
+
+def synthetic_points(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'assessment_id': 1,
+            'name': f"Location {i + 1}",
+            'type': rng.choice(TYPES),
+            'latitude': 40.7 + rng.random(),
+            'longitude': -74.0 + rng.random(),
+            'age': rng.randint(1, 80) if rng.random() > 0.01 else None,
+            'last_maintenance_days': rng.randint(0, 1500)
+        }
+        for i in range(count)
+    ]
+
+def write_legacy_geojson(gdf, path):
+    with open(path, 'w') as f:
+        f.write(json.dumps(json.loads(gdf.to_json()), indent=2))
+
+def measure(label, count, path, func, memory=False):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = ""
+    if memory:
+        peak = f"  peak {tracemalloc.get_traced_memory()[1] / 1e6:8.1f} MB"
+        tracemalloc.stop()
+    print(f"{count:>7,} points  {label:<15} {elapsed:7.2f} s  file {os.path.getsize(path) / 1e6:7.2f} MB{peak}", flush=True)
+
+def main(counts, memory=False):
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    try:
+        for count in counts:
+            gdf = points_to_geodataframe(synthetic_points(count))
+            path = os.path.join(directory, 'legacy.geojson')
+            measure("legacy geojson", count, path, lambda: write_legacy_geojson(gdf, path), memory)
+            for fmt, (extension, _, _) in LAYER_EXPORT_FORMATS.items():
+                path = os.path.join(directory, f"layer{extension}")
+                measure(fmt, count, path, lambda: write_layer(gdf, path, fmt), memory)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    main([int(arg) for arg in args] or [10_000, 100_000], memory='--memory' in sys.argv)
@@ -0,0 +1,100 @@
+"""Benchmark building the GIS view's infrastructure layer.
+
+For 10k and 100k synthetic points, times building the Folium map and
+rendering it to HTML:
+
+* per row - one CircleMarker and Popup per GeoDataFrame.iterrows() row, as
+  GISManager.create_infrastructure_map used to (10k only unless
+  --legacy-all is given; it does not scale)
+* bulk - the np.select status colours and a single GeoJson layer with a
+  GeoJsonPopup used now
+
+Run from the SCM directory:
+    python benchmarks/bench_gis_layers.py [--legacy-all] [counts...]
+"""
+import logging
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import folium
+
+from components.gis_integration import GISManager
+
+TYPES = ['pipes', 'culverts', 'drainageInlets', 'manholes', 'channels', 'retention_ponds']
+
+def synthetic_points(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f"Location {i + 1}",
+            'type': rng.choice(TYPES),
+            'latitude': 40.7 + rng.random(),
+            'longitude': -74.0 + rng.random(),
+            'age': rng.randint(1, 80),
+            'last_maintenance_days': rng.randint(0, 1500)
+        }
+        for i in range(count)
+    ]
+
+def per_row_map(manager):
+    """The previous layer build: a marker and popup per iterrows() row"""
+    m = folium.Map(location=[40.7, -74.0], zoom_start=12)
+    for layer_name, gdf in manager.infrastructure_layers.items():
+        feature_group = folium.FeatureGroup(name=layer_name)
+        for idx, row in gdf.iterrows():
+            popup_content = f"""
+            <div style='width: 200px'>
+                <h4>{row['name']}</h4>
+                <p><b>Type:</b> {row['type']}</p>
+                <p><b>Age:</b> {row['age']} years</p>
+                <p><b>Last Maintenance:</b> {row['last_maintenance_days']} days ago</p>
+            </div>
+            """
+            if row['age'] > 20 or row['last_maintenance_days'] > 365:
+                icon_color = 'red'
+            elif row['age'] > 10 or row['last_maintenance_days'] > 180:
+                icon_color = 'orange'
+            else:
+                icon_color = 'green'
+            folium.CircleMarker(
+                location=[row['latitude'], row['longitude']],
+                radius=8,
+                popup=folium.Popup(popup_content, max_width=300),
+                color=icon_color,
+                fill=True,
+                fill_color=icon_color
+            ).add_to(feature_group)
+        feature_group.add_to(m)
+    folium.LayerControl().add_to(m)
+    return m
+
+def bulk_map(manager):
+    return manager.create_infrastructure_map(center_lat=40.7, center_lon=-74.0, zoom=12)
+
+def measure(label, count, build):
+    start = time.perf_counter()
+    m = build()
+    built = time.perf_counter()
+    html = folium.Figure().add_child(m).render()
+    rendered = time.perf_counter()
+    print(f"{count:>7,} features  {label:<8} build {built - start:7.2f} s  render {rendered - built:7.2f} s  "
+          f"total {rendered - start:7.2f} s  html {len(html) / 1e6:7.1f} MB", flush=True)
+
+def main(counts, legacy_all=False):
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter('ignore')
+    for count in counts:
+        manager = GISManager()
+        manager.add_infrastructure_points(synthetic_points(count))
+        if legacy_all or count <= 10_000:
+            measure("per row", count, lambda: per_row_map(manager))
+        measure("bulk", count, lambda: bulk_map(manager))
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    main([int(arg) for arg in args] or [10_000, 100_000], legacy_all='--legacy-all' in sys.argv)
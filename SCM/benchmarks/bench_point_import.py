@@ -0,0 +1,89 @@
+"""Benchmark bulk inventory imports in rows per second.
+
+Writes a synthetic inventory (about 1% invalid rows) as CSV, GeoJSON and a
+zipped Shapefile in Web Mercator, then imports each into the points table
+of a fresh in-memory database in one transaction, as the project inventory
+import does.
+
+Run from the SCM directory:
+    python benchmarks/bench_point_import.py [counts...]
+"""
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geopandas as gpd
+import pandas as pd
+
+from utils.db_migration import migrate
+from utils.infrastructure_points import POINT_TYPES
+from utils.point_import import import_points
+
+def synthetic_inventory(count, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        row = {
+            'name': f"Structure {i + 1}",
+            'type': rng.choice(POINT_TYPES),
+            'lat': 40.7 + rng.random(),
+            'lon': -74.0 + rng.random(),
+            'age': rng.randint(1, 80),
+            'last_maintenance_days': rng.randint(0, 1500)
+        }
+        if rng.random() < 0.01:
+            row[rng.choice(['type', 'lat', 'age'])] = rng.choice(['unknown', -5, 200])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def write_sources(df, directory):
+    csv_path = os.path.join(directory, 'inventory.csv')
+    df.to_csv(csv_path, index=False)
+
+    points = df[pd.to_numeric(df['lat'], errors='coerce').between(-90, 90)]
+    gdf = gpd.GeoDataFrame(points.drop(columns=['lat', 'lon']),
+                           geometry=gpd.points_from_xy(points['lon'], points['lat']), crs=4326)
+    geojson_path = os.path.join(directory, 'inventory.geojson')
+    gdf.to_file(geojson_path, driver='GeoJSON')
+
+    shapefile_dir = os.path.join(directory, 'shp')
+    os.makedirs(shapefile_dir)
+    gdf.rename(columns={'last_maintenance_days': 'maint_days'}).to_crs(3857).to_file(os.path.join(shapefile_dir, 'inventory.shp'))
+    zip_path = os.path.join(directory, 'inventory.zip')
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        for name in os.listdir(shapefile_dir):
+            archive.write(os.path.join(shapefile_dir, name), name)
+    return {'csv': csv_path, 'geojson': geojson_path, 'shapefile': zip_path}
+
+def run_import(path, fmt):
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    conn.execute("INSERT INTO projects (name, description, created_by, created_at) VALUES ('Bench', '', 1, '')")
+    with conn:
+        result = import_points(conn.cursor(), 1, path, fmt)
+    stored = conn.execute("SELECT COUNT(*) FROM infrastructure_points").fetchone()[0]
+    conn.close()
+    return result, stored
+
+def main(counts):
+    logging.disable(logging.CRITICAL)
+    for count in counts:
+        directory = tempfile.mkdtemp()
+        try:
+            sources = write_sources(synthetic_inventory(count), directory)
+            for fmt, path in sources.items():
+                result, stored = run_import(path, fmt)
+                print(f"{count:>7,} rows  {fmt:<10} imported {result.imported:>7,}  rejected {result.rejected:>5,}  "
+                      f"stored {stored:>7,}  {result.seconds:6.2f} s  {result.rows_per_second:>9,.0f} rows/s", flush=True)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,67 @@
+"""Benchmark PDF report throughput in reports per second.
+
+Seeds the demo assessments into an in-memory database and times:
+
+* single - one generate_report call per assessment, as the report tab and
+  the ZIP export do, with the shared ReportTemplate
+* rebuilt template - the same, but building a new ReportTemplate (style
+  sheet, table style, page decoration) for every report as generate_report
+  used to
+* batch - one generate_merged_report call over every assessment, as the
+  merged PDF export does (two layout passes for the table of contents)
+
+Run from the SCM directory:
+    python benchmarks/bench_report_generation.py [rounds]
+"""
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.platypus import SimpleDocTemplate
+
+from utils.db_migration import migrate
+from utils.seed_data import seed_demo_data
+from utils.report import ReportTemplate, generate_report, generate_merged_report
+
+def load_assessments():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    seed_demo_data(conn)
+    return [json.loads(data) for (data,) in conn.execute("SELECT data FROM assessments ORDER BY id")]
+
+def generate_with_new_template(assessment_data, project_name):
+    template = ReportTemplate()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, **template.doc_kwargs)
+    add_page_number = template.page_decorator(project_name)
+    doc.build(template.story(assessment_data, project_name), onFirstPage=add_page_number, onLaterPages=add_page_number)
+    return buffer
+
+def rate(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {count:6d} reports {elapsed:8.3f} s {count / elapsed:8.1f} reports/s")
+
+def main(rounds=3):
+    logging.disable(logging.CRITICAL)
+    assessments = load_assessments()
+    count = len(assessments) * rounds
+    print(f"{len(assessments)} seeded assessments x {rounds} rounds")
+
+    # Warm up imports and font metrics
+    generate_report(assessments[0], "Benchmark Project")
+
+    rate("single", count, lambda: [generate_report(a, "Benchmark Project") for _ in range(rounds) for a in assessments])
+    rate("rebuilt template", count, lambda: [generate_with_new_template(a, "Benchmark Project") for _ in range(rounds) for a in assessments])
+    entries = [(f"Assessment {i}", a) for i, a in enumerate(assessments)]
+    rate("batch (merged)", count, lambda: [generate_merged_report(entries, "Benchmark Project") for _ in range(rounds)])
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
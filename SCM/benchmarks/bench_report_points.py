@@ -0,0 +1,99 @@
+"""Benchmark PDF reports for assessments with many infrastructure points.
+
+For 10k and 100k synthetic points, times (and with --memory measures the
+peak traced memory of; tracing slows layout several times over):
+
+* single table - every point in one ReportLab Table, as reports used to be
+  built (10k only unless --legacy-all is given; it does not scale)
+* chunked rows - every point in LongTable chunks of POINT_TABLE_CHUNK_ROWS
+  rows with a repeated header
+* summary - the per-type summary table used above POINT_DETAIL_LIMIT points
+
+Run from the SCM directory:
+    python benchmarks/bench_report_points.py [--legacy-all] [--memory] [counts...]
+"""
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.platypus import SimpleDocTemplate, Table
+
+from utils.files import spooled_file
+from utils.report import ReportTemplate, generate_report, report_template, POINT_TABLE_HEADER
+
+TYPES = ['pipes', 'culverts', 'drainageInlets', 'manholes', 'channels', 'retention_ponds']
+
+def synthetic_assessment(count, seed=7):
+    rng = random.Random(seed)
+    return {
+        'condition': {'OSAC': {'score': 6}},
+        'infrastructure_points': [
+            {
+                'name': f"Location {i + 1}",
+                'type': rng.choice(TYPES),
+                'latitude': 40.7 + rng.random(),
+                'longitude': -74.0 + rng.random(),
+                'age': rng.randint(1, 80) if rng.random() > 0.01 else None,
+                'last_maintenance_days': rng.randint(0, 1500)
+            }
+            for i in range(count)
+        ]
+    }
+
+class SingleTableTemplate(ReportTemplate):
+    """The previous layout: every point in one auto-sized Table"""
+
+    def point_tables(self, points):
+        data = [POINT_TABLE_HEADER] + [
+            [
+                str(point.get('name', 'N/A')),
+                str(point.get('type', 'N/A')).replace('_', ' ').title(),
+                str(point.get('age', 'N/A')),
+                str(point.get('last_maintenance_days', 'N/A')) + " days ago"
+            ]
+            for point in points
+        ]
+        return [Table(data, style=self.table_style)]
+
+def generate_single_table(assessment_data):
+    template = SingleTableTemplate()
+    output = spooled_file()
+    doc = SimpleDocTemplate(output, **template.doc_kwargs)
+    add_page_number = template.page_decorator("Benchmark Project")
+    doc.build(template.story(assessment_data, "Benchmark Project", 'rows'),
+              onFirstPage=add_page_number, onLaterPages=add_page_number)
+    return output
+
+def measure(label, count, func, memory=False):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    output = func()
+    elapsed = time.perf_counter() - start
+    peak = ""
+    if memory:
+        peak = f"  peak {tracemalloc.get_traced_memory()[1] / 1e6:8.1f} MB"
+        tracemalloc.stop()
+    size = output.seek(0, os.SEEK_END)
+    output.close()
+    print(f"{count:>7,} points  {label:<14} {elapsed:8.2f} s  pdf {size / 1e6:7.2f} MB{peak}", flush=True)
+
+def main(counts, legacy_all=False, memory=False):
+    logging.disable(logging.CRITICAL)
+    report_template()
+    for count in counts:
+        assessment = synthetic_assessment(count)
+        if legacy_all or count <= 10_000:
+            measure("single table", count, lambda: generate_single_table(assessment), memory)
+        measure("chunked rows", count, lambda: generate_report(assessment, "Benchmark Project", point_detail='rows'), memory)
+        measure("summary", count, lambda: generate_report(assessment, "Benchmark Project", point_detail='summary'), memory)
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    main([int(arg) for arg in args] or [10_000, 100_000],
+         legacy_all='--legacy-all' in sys.argv, memory='--memory' in sys.argv)
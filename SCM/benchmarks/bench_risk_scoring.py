@@ -0,0 +1,80 @@
+"""Benchmark vectorized heat map risk scoring against the per-point rule.
+
+Generates synthetic infrastructure points (asset types with and without a
+recorded damage level, missing and numeric-string ages and maintenance
+days) for an assessment whose damage levels mix the old string format and
+the form's {condition, score} dicts. Checks that score_point_risk agrees
+with calculate_point_risk on every point and reports the time taken by each.
+
+Run from the SCM directory:
+    python benchmarks/bench_risk_scoring.py [count]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.heat_map import calculate_point_risk, get_risk_status
+from utils.risk_scoring import damage_risk_by_type, score_point_risk, risk_status
+
+TYPES = ['pipes', 'culverts', 'drainageInlets', 'manholes', 'channels', 'reinforcedConcreteBoxes', 'unknownAsset']
+
+ASSESSMENT = {
+    'condition': {
+        'stormwaterHydraulicAssetCondition': {
+            'damageLevels': {
+                'pipes': 'moderate',
+                'culverts': 'high',
+                'drainageInlets': {'condition': 'Fair (4-6)', 'score': 5},
+                'manholes': {'condition': 'Poor (0-3)', 'score': 1},
+                'channels': {'condition': 'Good (7-10)'},
+                'reinforcedConcreteBoxes': {'condition': '', 'score': 9.5}
+            }
+        }
+    }
+}
+
+def random_value(rng, low, high):
+    roll = rng.random()
+    if roll < 0.02:
+        return None
+    if roll < 0.03:
+        return str(rng.randint(low, high))
+    return rng.randint(low, high) if roll < 0.6 else round(rng.uniform(low, high), 2)
+
+def main(count=1_000_000):
+    rng = random.Random(11)
+    types = [rng.choice(TYPES) for _ in range(count)]
+    ages = [random_value(rng, 0, 80) for _ in range(count)]
+    maintenance = [random_value(rng, 0, 900) for _ in range(count)]
+    print(f"{count:,} synthetic points")
+
+    start = time.perf_counter()
+    expected = np.array([
+        calculate_point_risk({'type': t, 'age': a, 'last_maintenance_days': m}, ASSESSMENT)
+        for t, a, m in zip(types, ages, maintenance)
+    ])
+    expected_status = [get_risk_status(risk) for risk in expected]
+    per_point = time.perf_counter() - start
+
+    start = time.perf_counter()
+    risk = score_point_risk(types, ages, maintenance, damage_risk_by_type(ASSESSMENT))
+    status = risk_status(risk)
+    vector = time.perf_counter() - start
+
+    mismatched = np.flatnonzero(risk != expected)
+    status_mismatches = int(sum(a != b for a, b in zip(status, expected_status)))
+    print(f"per-point calculate_point_risk: {per_point:8.3f} s ({count / per_point:,.0f} points/s)")
+    print(f"score_point_risk + risk_status: {vector:8.3f} s ({count / vector:,.0f} points/s, "
+          f"{per_point / vector:.1f}x faster)")
+    print(f"risk mismatches: {len(mismatched)}, status mismatches: {status_mismatches}")
+    for i in mismatched[:5]:
+        print(f"  point {i}: per-point {expected[i]} vector {risk[i]} ({types[i]}, {ages[i]}, {maintenance[i]})")
+    return 1 if len(mismatched) or status_mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
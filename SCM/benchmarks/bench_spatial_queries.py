@@ -0,0 +1,64 @@
+"""Benchmark batch spatial queries over an infrastructure point layer.
+
+For 10k and 100k synthetic points spread over a city-sized area, times
+building the cached layer with its projected copy, then:
+
+* index - building the STRtrees over manholes and outfalls
+* within 200 m - manholes within 200 m of every drainage inlet
+* nearest k=1 / k=5 - the nearest outfalls to every drainage inlet
+* nearest k=5 <= 100 m - the same, limited to 100 m
+* 20 polygons - manholes inside 20 small boxes
+
+Run from the SCM directory:
+    python benchmarks/bench_spatial_queries.py [counts...]
+"""
+import logging
+import os
+import random
+import sys
+import time
+
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.gis_layers import GisLayer, points_to_geodataframe
+from utils.infrastructure_points import POINT_TYPES
+from utils.spatial_queries import points_within, nearest_points, points_in_polygons, layer_points
+
+def synthetic_points(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f"Location {i + 1}",
+            'type': rng.choice(POINT_TYPES),
+            'latitude': 40.6 + rng.random() * 0.3,
+            'longitude': -74.1 + rng.random() * 0.3
+        }
+        for i in range(count)
+    ]
+
+def measure(label, count, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    rows = f"  {len(result):>9,} rows" if hasattr(result, '__len__') and not isinstance(result, tuple) else ""
+    print(f"{count:>7,} points  {label:<22} {elapsed:7.3f} s{rows}", flush=True)
+
+def main(counts):
+    logging.disable(logging.CRITICAL)
+    for count in counts:
+        gdf = points_to_geodataframe(synthetic_points(count))
+        layer = GisLayer(gdf)
+        measure("layer + projection", count, layer.projected)
+        inlets = layer_points(layer, ['drainageInlets'])
+        boxes = [shapely.box(-74.0 + i * 0.01, 40.7, -73.99 + i * 0.01, 40.71) for i in range(20)]
+        measure("index", count, lambda: (layer.projected_index(['manholes']), layer.projected_index(['outfalls'])))
+        measure("within 200 m", count, lambda: points_within(layer, inlets, 200, ['manholes']))
+        measure("nearest k=1", count, lambda: nearest_points(layer, inlets, 1, ['outfalls']))
+        measure("nearest k=5", count, lambda: nearest_points(layer, inlets, 5, ['outfalls']))
+        measure("nearest k=5 <= 100 m", count, lambda: nearest_points(layer, inlets, 5, ['outfalls'], max_distance_m=100))
+        measure("20 polygons", count, lambda: points_in_polygons(layer, boxes, ['manholes']))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
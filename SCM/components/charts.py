@@ -1,7 +1,9 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+from utils.telemetry import timed
 
+@timed('chart')
 def create_radar_chart(assessment_data):
     """Create a radar chart showing different aspects of the infrastructure assessment"""
     try:
@@ -43,6 +45,7 @@ def create_radar_chart(assessment_data):
         # Return a simple empty figure if there's an error
         return go.Figure()
 
+@timed('chart')
 def create_trend_chart(assessments):
     """Create a line chart showing assessment trends over time"""
     try:
@@ -65,6 +68,7 @@ def create_trend_chart(assessments):
     except Exception as e:
         return go.Figure()
 
+@timed('chart')
 def create_component_trend_chart(assessments, component):
     """Create a trend chart for a specific component"""
     try:
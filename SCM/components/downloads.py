@@ -0,0 +1,32 @@
+import os
+import streamlit as st
+from utils.feature_service import file_download_url
+
+# Largest file handed to st.download_button, which copies it into the server's
+# in-memory media store for every session and rerun that shows the button.
+# Bigger files are only offered as feature service links.
+DOWNLOAD_MEMORY_LIMIT = int(os.environ.get('STORMWATER_DOWNLOAD_MEMORY_LIMIT', 32 * 1024 * 1024))
+
+def show_file_download(path, label, file_name, mime, **button_args):
+    """Offer a generated file for download without holding large files in memory.
+
+    With the feature service configured the file is streamed from disk through
+    a signed link; otherwise files up to DOWNLOAD_MEMORY_LIMIT bytes use a
+    download button and larger ones show where they were saved.
+    """
+    url = file_download_url(path, file_name)
+    if url is not None:
+        st.link_button(label, url, **button_args)
+        return
+
+    size = os.path.getsize(path)
+    if size > DOWNLOAD_MEMORY_LIMIT:
+        st.warning(
+            f"{file_name} is {size / 1024 / 1024:,.1f} MB, over the {DOWNLOAD_MEMORY_LIMIT / 1024 / 1024:,.1f} MB "
+            f"limit for in-app downloads. It was saved on the server as `{os.path.abspath(path)}`; "
+            "run `python manage.py serve-features` to download large files through a link."
+        )
+        return
+
+    with open(path, 'rb') as f:
+        st.download_button(label, data=f, file_name=file_name, mime=mime, **button_args)
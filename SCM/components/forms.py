@@ -1,5 +1,10 @@
 import streamlit as st
 from components.heat_map import create_risk_heat_map, calculate_risk_levels
+from utils.infrastructure_points import POINT_TYPES
+from utils.point_import import IMPORT_FORMATS, detect_format, load_points
+
+# Points listed by name under the infrastructure form; imports can add tens of thousands
+POINT_LIST_LIMIT = 50
 
 def condition_assessment_form():
     st.header("Stormwater Condition Assessment")
@@ -860,11 +865,7 @@ def infrastructure_location_form():
 
         with col1:
             name = st.text_input("Location Name")
-            type_options = [
-                "pipes", "culverts", "drainageInlets", "manholes",
-                "channels", "outfalls", "bioRetentionBasins"
-            ]
-            point_type = st.selectbox("Infrastructure Type", type_options)
+            point_type = st.selectbox("Infrastructure Type", POINT_TYPES)
             age = st.number_input("Age (years)", 0, 100, 0)
 
         with col2:
@@ -884,14 +885,45 @@ def infrastructure_location_form():
             st.session_state.infrastructure_points.append(point)
             st.success(f"Added {name} to infrastructure points")
 
+    with st.expander("Import Infrastructure Points"):
+        uploaded = st.file_uploader(
+            "Inventory file",
+            type=['csv', 'geojson', 'json', 'zip'],
+            help="CSV with latitude/longitude columns, GeoJSON, or a zipped Shapefile of points"
+        )
+        if uploaded is not None and st.button("Import Points"):
+            fmt = detect_format(uploaded.name)
+            if fmt is None:
+                st.error(f"Unsupported file type; use one of: {', '.join(IMPORT_FORMATS.values())}")
+            else:
+                try:
+                    points, result = load_points(uploaded, fmt)
+                    st.session_state.infrastructure_points.extend(points)
+                    show_import_result(result)
+                except Exception as e:
+                    st.error(f"Failed to import infrastructure points: {str(e)}")
+
     # Display existing points
     if st.session_state.infrastructure_points:
         st.subheader("Infrastructure Points")
-        for i, point in enumerate(st.session_state.infrastructure_points):
+        points = st.session_state.infrastructure_points
+        for i, point in enumerate(points[:POINT_LIST_LIMIT]):
             st.text(f"{i+1}. {point['name']} ({point['type']})")
+        if len(points) > POINT_LIST_LIMIT:
+            st.caption(f"... and {len(points) - POINT_LIST_LIMIT:,} more points")
 
         if st.button("Clear All Points"):
             st.session_state.infrastructure_points = []
             st.rerun()
 
-    return {'infrastructure_points': st.session_state.infrastructure_points}
\ No newline at end of file
+    return {'infrastructure_points': st.session_state.infrastructure_points}
+
+def show_import_result(result):
+    """Summarize an inventory import: counts, throughput and the first rejected rows"""
+    st.success(f"Imported {result.imported:,} points in {result.seconds:.1f} s ({result.rows_per_second:,.0f} rows/s)")
+    if result.rejected:
+        st.warning(f"Rejected {result.rejected:,} rows")
+        st.dataframe(
+            [{'Row': row, 'Reason': reason} for row, reason in result.rejects],
+            hide_index=True
+        )
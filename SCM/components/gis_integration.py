@@ -1,21 +1,124 @@
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
 import folium
-from shapely.geometry import Point, Polygon
 import streamlit as st
 from streamlit_folium import folium_static
-import json
-from typing import List, Dict, Any
+from jinja2 import Template
+from folium.map import Layer
+from typing import List, Dict, Any, Optional, Tuple
+from utils.db import get_infrastructure_points, get_infrastructure_extent
+from components.downloads import show_file_download
+from utils.feature_service import FEATURE_SERVICE_URL, FEATURE_SERVICE_SECRET, feature_layer_url
+from utils.gis_layers import get_layer
+from utils.spatial_queries import points_within, nearest_points, points_in_polygons, layer_points
+from utils.gis_export import LAYER_EXPORT_FORMATS, export_layer, export_points
+from utils.infrastructure_points import POINT_TYPES, CRITICAL_AGE, CRITICAL_MAINTENANCE_DAYS, WARNING_AGE, WARNING_MAINTENANCE_DAYS
+
+# Spatial query results shown in the results table
+QUERY_RESULT_LIMIT = 1000
+
+# Point properties shown in map popups, with their labels
+POPUP_FIELDS = {
+    'name': 'Name',
+    'type': 'Type',
+    'age': 'Age (years)',
+    'last_maintenance_days': 'Last maintenance (days ago)'
+}
+
+class FeatureServiceLayer(Layer):
+    """GeoJSON overlay that fetches the features inside the current viewport from the feature service.
+
+    The layer is refetched after every pan or zoom; responses carry ETags, so
+    the browser revalidates layers it has already seen instead of downloading
+    them again. Aggregated grid cells (features with a ``count``) are drawn as
+    count-sized circles.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJSON(null, {
+                pointToLayer: function (feature, latlng) {
+                    var p = feature.properties;
+                    var radius = p.count ? 6 + 4 * Math.log10(p.count) : 8;
+                    return L.circleMarker(latlng, {radius: radius, color: p.status, fill: true,
+                        fillColor: p.status, fillOpacity: p.count ? 0.6 : 0.2});
+                },
+                onEachFeature: function (feature, layer) {
+                    var p = feature.properties;
+                    var text = function (value) {
+                        return String(value).replace(/[&<>"']/g, function (ch) { return '&#' + ch.charCodeAt(0) + ';'; });
+                    };
+                    if (p.count) {
+                        layer.bindTooltip(p.count.toLocaleString() + " points: " + p.critical.toLocaleString() +
+                            " critical, " + p.warning.toLocaleString() + " need attention");
+                    } else {
+                        layer.bindPopup(
+                            "<div style='width: 200px'><h4>" + text(p.name) + "</h4>" +
+                            "<p><b>Type:</b> " + text(p.type) + "</p>" +
+                            "<p><b>Age:</b> " + text(p.age) + " years</p>" +
+                            "<p><b>Last Maintenance:</b> " + text(p.last_maintenance_days) + " days ago</p></div>",
+                            {maxWidth: 300});
+                    }
+                }
+            });
+            (function (layer, map) {
+                var request = null;
+                function refresh() {
+                    var b = map.getBounds();
+                    var bbox = [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()]
+                        .map(function (v) { return v.toFixed(6); }).join(',');
+                    if (request) { request.abort(); }
+                    request = new AbortController();
+                    var url = new URL({{ this.url|tojson }}, window.location.href);
+                    url.searchParams.set('bbox', bbox);
+                    fetch(url, {signal: request.signal})
+                        .then(function (response) { return response.json(); })
+                        .then(function (data) { layer.clearLayers(); layer.addData(data); })
+                        .catch(function (error) { if (error.name !== 'AbortError') { console.error(error); } });
+                }
+                map.on('moveend', refresh);
+                refresh();
+            })({{ this.get_name() }}, {{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, url: str, name: Optional[str] = None, overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'FeatureServiceLayer'
+        self.url = url
 
 class GISManager:
     def __init__(self):
         self.infrastructure_layers = {}
+        # Layers the browser loads from the feature service, by name
+        self.service_layers = {}
+        # Cached GisLayers behind infrastructure_layers, for spatial queries
+        self.gis_layers = {}
         
-    def add_infrastructure_points(self, points_data: List[Dict[Any, Any]], layer_name: str = "Infrastructure"):
-        """Convert infrastructure points to GeoDataFrame"""
-        geometry = [Point(p['longitude'], p['latitude']) for p in points_data]
-        gdf = gpd.GeoDataFrame(points_data, geometry=geometry)
-        self.infrastructure_layers[layer_name] = gdf
-        return gdf
+    def add_infrastructure_points(self, points_data: List[Dict[Any, Any]], layer_name: str = "Infrastructure",
+                                  assessment_id: Optional[int] = None):
+        """Add infrastructure points as a layer, reusing the cached GeoDataFrame for the same points"""
+        layer = get_layer(points_data, assessment_id=assessment_id)
+        self.gis_layers[layer_name] = layer
+        self.infrastructure_layers[layer_name] = layer.gdf
+        return layer.gdf
+
+    def load_infrastructure_points(self, assessment_id: int, bbox: Optional[Tuple[float, float, float, float]] = None,
+                                   layer_name: str = "Infrastructure"):
+        """Load an assessment's points from the database, optionally only those inside a (south, west, north, east) box.
+
+        The project's imported inventory is included.
+        """
+        points = get_infrastructure_points(assessment_id=assessment_id, bbox=bbox)
+        return self.add_infrastructure_points(points, layer_name, assessment_id=assessment_id)
+
+    def add_service_layer(self, assessment_id: int, layer_name: str = "Infrastructure", base_url: Optional[str] = None):
+        """Register an assessment's points as a layer fetched from the feature service by viewport"""
+        url = feature_layer_url(assessment_id, base_url)
+        self.service_layers[layer_name] = url
+        return url
 
     def create_infrastructure_map(self, center_lat: float = 39.8283, center_lon: float = -98.5795, zoom: int = 4):
         """Create a Folium map with infrastructure layers"""
@@ -26,66 +129,105 @@ class GISManager:
         folium.TileLayer('cartodbpositron', name='Light Mode').add_to(m)
         folium.TileLayer('cartodbdark_matter', name='Dark Mode').add_to(m)
         
-        # Add infrastructure layers
+        # Add infrastructure layers, each serialized in one pass as a single GeoJson
         for layer_name, gdf in self.infrastructure_layers.items():
-            feature_group = folium.FeatureGroup(name=layer_name)
-            
-            for idx, row in gdf.iterrows():
-                # Create popup content
-                popup_content = f"""
-                <div style='width: 200px'>
-                    <h4>{row['name']}</h4>
-                    <p><b>Type:</b> {row['type']}</p>
-                    <p><b>Age:</b> {row['age']} years</p>
-                    <p><b>Last Maintenance:</b> {row['last_maintenance_days']} days ago</p>
-                </div>
-                """
-                
-                # Add marker with custom icon based on type
-                icon_color = self._get_status_color(row['age'], row['last_maintenance_days'])
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=8,
-                    popup=folium.Popup(popup_content, max_width=300),
-                    color=icon_color,
-                    fill=True,
-                    fill_color=icon_color
-                ).add_to(feature_group)
-            
-            feature_group.add_to(m)
+            self._point_layer(gdf, layer_name).add_to(m)
+
+        for layer_name, url in self.service_layers.items():
+            FeatureServiceLayer(url, name=layer_name).add_to(m)
         
         # Add layer control
         folium.LayerControl().add_to(m)
         return m
 
-    def _get_status_color(self, age: int, last_maintenance_days: int) -> str:
-        """Determine infrastructure point status color based on age and maintenance"""
-        if age > 20 or last_maintenance_days > 365:
-            return 'red'
-        elif age > 10 or last_maintenance_days > 180:
-            return 'orange'
-        return 'green'
+    @staticmethod
+    def _status_colors(gdf: gpd.GeoDataFrame) -> np.ndarray:
+        """Status colour per row from age and maintenance, with the thresholds of point_status"""
+        age = pd.to_numeric(gdf['age'], errors='coerce').fillna(0).to_numpy()
+        maintenance_days = pd.to_numeric(gdf['last_maintenance_days'], errors='coerce').fillna(0).to_numpy()
+        return np.select(
+            [
+                (age > CRITICAL_AGE) | (maintenance_days > CRITICAL_MAINTENANCE_DAYS),
+                (age > WARNING_AGE) | (maintenance_days > WARNING_MAINTENANCE_DAYS)
+            ],
+            ['red', 'orange'],
+            default='green'
+        )
 
-    def export_geojson(self, layer_name: str) -> dict:
-        """Export a layer as GeoJSON"""
+    def _point_layer(self, gdf: gpd.GeoDataFrame, layer_name: str) -> folium.GeoJson:
+        """Build a layer of status-coloured circle markers with popups from a GeoDataFrame"""
+        properties = gdf.reindex(columns=list(POPUP_FIELDS))
+        status = self._status_colors(properties)
+        properties = properties.astype(object).where(properties.notna(), None)
+        properties['status'] = status
+        # Assemble the FeatureCollection from column arrays; GeoDataFrame.to_json
+        # walks the rows one Series at a time
+        coordinates = np.column_stack([gdf.geometry.x, gdf.geometry.y]).tolist()
+        data = {
+            'type': 'FeatureCollection',
+            'features': [
+                {'type': 'Feature', 'id': str(i), 'geometry': {'type': 'Point', 'coordinates': xy}, 'properties': props}
+                for i, (xy, props) in enumerate(zip(coordinates, properties.to_dict('records')))
+            ]
+        }
+        return folium.GeoJson(
+            data,
+            name=layer_name,
+            marker=folium.CircleMarker(radius=8, fill=True),
+            style_function=lambda feature: {
+                'color': feature['properties']['status'],
+                'fillColor': feature['properties']['status']
+            },
+            popup=folium.GeoJsonPopup(
+                fields=list(POPUP_FIELDS),
+                aliases=list(POPUP_FIELDS.values()),
+                max_width=300
+            )
+        )
+
+    def export_layer(self, layer_name: str, fmt: str = 'geojson') -> Optional[str]:
+        """Export a layer as GeoJSON, GeoParquet or FlatGeobuf and return the file path"""
         if layer_name in self.infrastructure_layers:
-            return json.loads(self.infrastructure_layers[layer_name].to_json())
-        return {}
+            return export_layer(self.infrastructure_layers[layer_name], layer_name, fmt)
+        return None
+
+    def export_project_layers(self, project_id: int, fmt: str = 'geojson') -> str:
+        """Export the points of every assessment in a project as one file, with an assessment_id column"""
+        points = get_infrastructure_points(project_id=project_id)
+        return export_points(points, f"project_{project_id}_infrastructure", fmt)
+
+def show_gis_dashboard(assessment_data: dict, assessment_id: Optional[int] = None, project_id: Optional[int] = None,
+                       key: str = "gis"):
+    """Display GIS dashboard with infrastructure data; ``project_id`` enables exporting the whole project.
 
-def show_gis_dashboard(assessment_data: dict):
-    """Display GIS dashboard with infrastructure data"""
+    ``key`` prefixes widget keys so several dashboards can share a page.
+    """
     st.subheader("Infrastructure GIS View")
     
     # Initialize GIS manager
     gis_manager = GISManager()
     
-    if 'infrastructure_points' in assessment_data:
-        # Add infrastructure points to GIS manager
-        gis_manager.add_infrastructure_points(assessment_data['infrastructure_points'])
-        
-        # Create map centered on first point
-        first_point = assessment_data['infrastructure_points'][0]
-        map_center = [first_point['latitude'], first_point['longitude']]
+    # Saved assessments also show their project's imported inventory
+    extent = get_infrastructure_extent(assessment_id) if assessment_id is not None else None
+    if (extent and extent['count']) or assessment_data.get('infrastructure_points'):
+        use_service = extent and extent['count'] and FEATURE_SERVICE_URL and FEATURE_SERVICE_SECRET
+        if use_service:
+            # Saved assessments are fetched by viewport from the feature service
+            gis_manager.add_service_layer(assessment_id)
+            map_center = [(extent['south'] + extent['north']) / 2, (extent['west'] + extent['east']) / 2]
+        else:
+            # Add infrastructure points to GIS manager, from the points table when the assessment is saved
+            if assessment_id is not None:
+                gdf = gis_manager.load_infrastructure_points(assessment_id)
+            else:
+                gdf = gis_manager.add_infrastructure_points(assessment_data['infrastructure_points'])
+            if gdf.empty:
+                st.info("No infrastructure points with coordinates to map")
+                return
+
+            # Create map centered on first point
+            first_point = gdf.iloc[0]
+            map_center = [first_point['latitude'], first_point['longitude']]
         
         # Create and display map
         infrastructure_map = gis_manager.create_infrastructure_map(
@@ -98,13 +240,95 @@ def show_gis_dashboard(assessment_data: dict):
         folium_static(infrastructure_map)
         
         # Add export option
-        if st.button("Export Infrastructure Data as GeoJSON"):
-            geojson_data = gis_manager.export_geojson("Infrastructure")
-            st.download_button(
-                "Download GeoJSON",
-                data=json.dumps(geojson_data, indent=2),
-                file_name="infrastructure.geojson",
-                mime="application/json"
+        col1, col2 = st.columns(2)
+        with col1:
+            fmt = st.selectbox(
+                "Export format",
+                list(LAYER_EXPORT_FORMATS),
+                format_func=lambda fmt: LAYER_EXPORT_FORMATS[fmt][2],
+                key=f"{key}_export_format"
             )
+        with col2:
+            scopes = ["This assessment"] + (["All project assessments"] if project_id is not None else [])
+            scope = st.radio("Export scope", scopes, horizontal=True, key=f"{key}_export_scope")
+
+        if st.button("Export Infrastructure Data", key=f"{key}_export"):
+            try:
+                if scope == "All project assessments":
+                    path = gis_manager.export_project_layers(project_id, fmt)
+                else:
+                    if "Infrastructure" not in gis_manager.infrastructure_layers:
+                        gis_manager.load_infrastructure_points(assessment_id)
+                    path = gis_manager.export_layer("Infrastructure", fmt)
+                extension, mime, label = LAYER_EXPORT_FORMATS[fmt]
+                show_file_download(
+                    path,
+                    f"Download {label}",
+                    file_name=f"infrastructure{extension}",
+                    mime=mime,
+                    key=f"{key}_download"
+                )
+            except Exception as e:
+                st.error(f"Failed to export infrastructure data: {str(e)}")
+
+        show_spatial_queries(gis_manager, assessment_id, key=key)
     else:
         st.info("No infrastructure points available for GIS visualization")
+
+def _parse_area(text: str):
+    """Parse a WGS 84 polygon given as GeoJSON or WKT"""
+    text = text.strip()
+    return shapely.from_geojson(text) if text.startswith('{') else shapely.from_wkt(text)
+
+def show_spatial_queries(gis_manager: GISManager, assessment_id: Optional[int] = None, layer_name: str = "Infrastructure",
+                         key: str = "gis"):
+    """Run distance, nearest-neighbour and area queries between infrastructure types"""
+    with st.expander("Spatial Queries"):
+        query = st.radio("Query", ["Within distance", "Nearest", "Inside area"], horizontal=True, key=f"{key}_query")
+        col1, col2 = st.columns(2)
+        with col1:
+            target_type = st.selectbox("Find", POINT_TYPES, index=POINT_TYPES.index("manholes"), key=f"{key}_target")
+            if query == "Inside area":
+                area = st.text_area("Area (GeoJSON or WKT polygon, WGS 84)", key=f"{key}_area")
+        if query != "Inside area":
+            with col2:
+                source_type = st.selectbox("Near each", POINT_TYPES, index=POINT_TYPES.index("drainageInlets"),
+                                           key=f"{key}_source")
+                if query == "Within distance":
+                    distance = st.number_input("Distance (m)", min_value=1.0, value=200.0, step=50.0, key=f"{key}_distance")
+                else:
+                    k = st.number_input("Number of nearest", min_value=1, max_value=50, value=1, key=f"{key}_k")
+
+        if not st.button("Run Query", key=f"{key}_run_query"):
+            return
+        try:
+            if layer_name not in gis_manager.gis_layers:
+                gis_manager.load_infrastructure_points(assessment_id, layer_name=layer_name)
+            layer = gis_manager.gis_layers[layer_name]
+            if layer.gdf.empty:
+                st.info("No infrastructure points to query")
+                return
+            # Label results by point name, or by row when the layer has no names
+            names = layer.gdf.get('name')
+            names = (names if names is not None else layer.gdf.index.to_series()).astype(str).to_numpy()
+
+            if query == "Inside area":
+                results = points_in_polygons(layer, [_parse_area(area)], [target_type])
+                table = pd.DataFrame({target_type: names[results['target']]})
+            else:
+                sources = layer_points(layer, [source_type])
+                if query == "Within distance":
+                    results = points_within(layer, sources, distance, [target_type])
+                else:
+                    results = nearest_points(layer, sources, int(k), [target_type])
+                table = pd.DataFrame({
+                    source_type: names[results['source']],
+                    target_type: names[results['target']],
+                    'Distance (m)': results['distance_m'].round(1)
+                })
+        except Exception as e:
+            st.error(f"Failed to run spatial query: {str(e)}")
+            return
+
+        st.caption(f"{len(table):,} results" + (f", showing the first {QUERY_RESULT_LIMIT:,}" if len(table) > QUERY_RESULT_LIMIT else ""))
+        st.dataframe(table.head(QUERY_RESULT_LIMIT), hide_index=True)
@@ -1,13 +1,56 @@
 import streamlit as st
 import folium
+from folium.plugins import HeatMap
 from streamlit_folium import folium_static
 import json
+import hashlib
+import pickle
 from branca.colormap import LinearColormap
+from utils.telemetry import timed
+from utils.risk_scoring import (
+    damage_risk_by_type,
+    score_points,
+    risk_density_grid,
+    DEFAULT_DAMAGE_RISK,
+    DEFAULT_AGE,
+    DEFAULT_MAINTENANCE_DAYS,
+    RISK_STATUSES,
+    LOW_RISK_STATUS
+)
 
-def create_risk_heat_map(assessment_data=None, center=[40.7128, -74.0060]):
+# Above this many points the map shows a risk-weighted density layer instead of one circle per point
+HEAT_LAYER_THRESHOLD = 500
+# Grid cells per side of the density layer; bounds the layer to HEAT_GRID_CELLS ** 2 cells
+HEAT_GRID_CELLS = 100
+# Density layer colours, matching the risk colormap
+HEAT_GRADIENT = {0.25: 'green', 0.5: 'yellow', 0.75: 'orange', 1.0: 'red'}
+
+def risk_input_digest(assessment_data, points):
+    """Hash of the points and damage levels a risk map is computed from"""
+    # Pickling is several times faster than JSON for large point lists; a
+    # different key order only costs a cache miss
+    return hashlib.sha1(pickle.dumps((points, damage_risk_by_type(assessment_data)), protocol=4)).hexdigest()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _risk_density_layer(digest, _assessment_data, _points):
+    """Density grid rows for one version of an assessment's risk inputs (cached by ``digest``).
+
+    Weights are scaled to 0-1, the intensity range of the HeatMap layer.
+    """
+    risk = score_points(_points, _assessment_data)
+    cells = risk_density_grid(risk['lat'], risk['lng'], risk['risk_level'], HEAT_GRID_CELLS)
+    if len(cells):
+        cells[:, 2] /= cells[:, 2].max() or 1
+    return cells.tolist()
+
+@timed('map')
+def create_risk_heat_map(assessment_data=None, center=[40.7128, -74.0060], points=None):
     """
     Create an interactive heat map showing infrastructure risk levels
-    Default center is New York City coordinates
+    Default center is New York City coordinates. ``points`` overrides the
+    assessment's own list, e.g. with rows from a bounding-box query.
+    Above HEAT_LAYER_THRESHOLD points a risk-weighted density layer is drawn
+    from a grid computed once per version of the points and damage levels.
     """
     # Create base map
     m = folium.Map(location=center, zoom_start=12)
@@ -20,9 +63,25 @@ def create_risk_heat_map(assessment_data=None, center=[40.7128, -74.0060]):
         caption='Infrastructure Risk Level'
     )
     
-    if assessment_data:
+    if points is None and assessment_data:
+        points = assessment_data.get('infrastructure_points') or []
+
+    if assessment_data and points and len(points) > HEAT_LAYER_THRESHOLD:
+        cells = _risk_density_layer(risk_input_digest(assessment_data, points), assessment_data, points)
+        if cells:
+            HeatMap(
+                cells,
+                name='Infrastructure Risk Density',
+                radius=18,
+                blur=15,
+                gradient=HEAT_GRADIENT
+            ).add_to(m)
+            lats = [lat for lat, _, _ in cells]
+            lngs = [lng for _, lng, _ in cells]
+            m.fit_bounds([[min(lats), min(lngs)], [max(lats), max(lngs)]])
+    elif assessment_data:
         # Extract risk levels from assessment data
-        risk_levels = calculate_risk_levels(assessment_data)
+        risk_levels = calculate_risk_levels(assessment_data, points)
         
         # Add markers for each infrastructure point
         for point in risk_levels:
@@ -44,55 +103,40 @@ def create_risk_heat_map(assessment_data=None, center=[40.7128, -74.0060]):
     
     return m
 
-def calculate_risk_levels(assessment_data):
-    """Calculate risk levels from assessment data"""
-    # Example risk calculation - this should be customized based on your needs
-    points = []
-    
-    if 'infrastructure_points' in assessment_data:
-        for point in assessment_data['infrastructure_points']:
-            risk_level = calculate_point_risk(point, assessment_data)
-            points.append({
-                'lat': point['latitude'],
-                'lng': point['longitude'],
-                'name': point['name'],
-                'risk_level': risk_level,
-                'status': get_risk_status(risk_level)
-            })
-    
-    return points
+def calculate_risk_levels(assessment_data, points=None):
+    """Calculate risk levels from assessment data for all points in one vectorized pass"""
+    if points is None:
+        points = assessment_data.get('infrastructure_points', [])
+    if not points:
+        return []
+    return score_points(points, assessment_data).to_dict('records')
+
+def _point_value(value, default):
+    try:
+        return default if value is None else float(value)
+    except (TypeError, ValueError):
+        return default
 
 def calculate_point_risk(point, assessment_data):
     """Calculate risk level for a specific infrastructure point"""
-    # Example risk calculation using assessment metrics
-    risk_factors = {
-        'condition': assessment_data['condition']['stormwaterHydraulicAssetCondition']['damageLevels'].get(point['type'], 'low'),
-        'age': point.get('age', 0),
-        'maintenance': point.get('last_maintenance_days', 365)
-    }
-    
-    # Convert text-based damage levels to numbers
-    damage_scores = {'low': 2, 'moderate': 5, 'high': 8}
-    
-    # Calculate base risk from condition
-    risk = damage_scores[risk_factors['condition']]
-    
+    # Same rule as utils.risk_scoring.score_point_risk, for a single point
+    risk = damage_risk_by_type(assessment_data).get(point.get('type'), DEFAULT_DAMAGE_RISK)
+
+    age = _point_value(point.get('age'), DEFAULT_AGE)
+    maintenance = _point_value(point.get('last_maintenance_days'), DEFAULT_MAINTENANCE_DAYS)
+
     # Adjust for age (assume 50 years is maximum age)
-    age_factor = min(risk_factors['age'] / 50, 1) * 2
-    
+    age_factor = min(age / 50, 1) * 2
+
     # Adjust for maintenance (assume 365 days without maintenance is maximum)
-    maintenance_factor = min(risk_factors['maintenance'] / 365, 1) * 2
-    
+    maintenance_factor = min(maintenance / 365, 1) * 2
+
     final_risk = min((risk + age_factor + maintenance_factor) / 1.2, 10)
     return round(final_risk, 1)
 
 def get_risk_status(risk_level):
     """Get text status based on risk level"""
-    if risk_level >= 8:
-        return "Critical - Immediate Action Required"
-    elif risk_level >= 6:
-        return "High Risk - Priority Maintenance"
-    elif risk_level >= 4:
-        return "Moderate Risk - Regular Monitoring"
-    else:
-        return "Low Risk - Routine Maintenance"
+    for threshold, status in RISK_STATUSES:
+        if risk_level >= threshold:
+            return status
+    return LOW_RISK_STATUS
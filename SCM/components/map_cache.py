@@ -0,0 +1,91 @@
+"""Process-wide cache of rendered Folium map HTML.
+
+Static maps are rendered to HTML once and kept in an LRU bounded by total
+size, keyed by what determines their content (assessment id or input
+digest, map type, tile set and zoom). Reruns that hit the cache send the
+stored HTML straight to the browser without building the Folium map.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import folium
+import streamlit.components.v1 as components
+
+logger = logging.getLogger(__name__)
+
+# Total size of cached map HTML; least recently used maps are evicted first
+MAP_CACHE_MAX_BYTES = int(os.environ.get('STORMWATER_MAP_CACHE_BYTES', 64 * 1024 * 1024))
+
+class MapHtmlCache:
+    """Thread-safe LRU of rendered map HTML bounded by total size in bytes"""
+
+    def __init__(self, max_bytes=MAP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached ``(html, height)`` for ``key``, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[:2]
+
+    def put(self, key, html, height):
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            # A single map larger than the whole budget is served uncached
+            logger.info("Map %s (%s bytes) exceeds the map cache budget", key, size)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            self._entries[key] = (html, height, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+map_html_cache = MapHtmlCache()
+
+def render_map_html(m, height=500):
+    """Render a Folium map to the standalone HTML folium_static would embed"""
+    figure = folium.Figure().add_child(m)
+    return figure.render(), (figure.height or height) + 10
+
+def show_cached_map(key, build_map, width=700, height=500):
+    """Display the map cached under ``key``, building it with ``build_map()`` on a miss.
+
+    ``key`` must identify everything the map shows, e.g.
+    ``(assessment_id, map_type, tiles, zoom)``. Returns False when
+    ``build_map`` returned None and nothing was displayed.
+    """
+    cached = map_html_cache.get(key)
+    if cached is None:
+        m = build_map()
+        if m is None:
+            return False
+        cached = render_map_html(m, height)
+        map_html_cache.put(key, *cached)
+    html, frame_height = cached
+    components.html(html, height=frame_height, width=width)
+    return True
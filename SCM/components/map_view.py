@@ -1,12 +1,126 @@
 import folium
+import html
+import math
 import streamlit as st
-from streamlit_folium import folium_static
+from folium.plugins import FastMarkerCluster
+from streamlit_folium import folium_static, st_folium
+from components.map_cache import show_cached_map
+from utils.db import (
+    get_infrastructure_points,
+    get_infrastructure_extent,
+    count_infrastructure_points,
+    get_infrastructure_grid
+)
+from utils.infrastructure_points import point_status, cell_status
 import logging
+from utils.telemetry import timed
 
 logger = logging.getLogger(__name__)
 
+# Assessments with more points than this are drawn from viewport bounding-box
+# queries against the R*Tree index instead of embedding every point
+VIEWPORT_QUERY_THRESHOLD = 2000
+# Viewports holding more points than this are drawn as server-side grid cells
+MAX_VIEWPORT_POINTS = 500
+# Grid cells per side of the viewport when points are aggregated
+GRID_CELLS_PER_SIDE = 16
+# Half-width in degrees of the initial viewport for large assessments
+INITIAL_VIEWPORT_SPAN = 0.02
+# Maps built from assessment JSON with more points than this cluster them in the
+# browser from compact arrays instead of embedding a marker and popup per point
+CLUSTER_THRESHOLD = 300
+
+# Base layer and initial zoom of static maps; both are part of the map cache key
+MAP_TILES = "OpenStreetMap"
+MAP_ZOOM = 12
+
+STATUS_COLORS = ['green', 'orange', 'red']
+
+# Builds the same marker and popup as _add_point_marker from a compact
+# [lat, lon, status, name, type, age, maintenance_days] row
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var colors = %s;
+    var color = colors[row[2]];
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 8, color: color, fill: true, fillColor: color, fillOpacity: 0.2});
+    marker.bindPopup(
+        "<div style='width: 200px'><h4>" + row[3] + "</h4>" +
+        "<p><b>Type:</b> " + row[4] + "</p>" +
+        "<p><b>Age:</b> " + row[5] + " years</p>" +
+        "<p><b>Last Maintenance:</b> " + row[6] + " days ago</p>" +
+        "<p><b>Status:</b> <span style='color: " + color + "'>●</span></p></div>",
+        {maxWidth: 300});
+    return marker;
+}
+""" % STATUS_COLORS
+
+def _add_point_marker(target, point):
+    """Add a status-coloured CircleMarker for one infrastructure point"""
+    # Calculate status color based on age and maintenance
+    age = point.get('age', 0)
+    maintenance_days = point.get('last_maintenance_days', 0)
+    color = point_status(age, maintenance_days)
+
+    # Create popup content
+    popup_html = f"""
+    <div style='width: 200px'>
+        <h4>{point.get('name', 'Unknown')}</h4>
+        <p><b>Type:</b> {point.get('type', 'N/A')}</p>
+        <p><b>Age:</b> {age} years</p>
+        <p><b>Last Maintenance:</b> {maintenance_days} days ago</p>
+        <p><b>Status:</b> <span style='color: {color}'>●</span></p>
+    </div>
+    """
+
+    # Add marker
+    folium.CircleMarker(
+        location=[point.get('latitude'), point.get('longitude')],
+        radius=8,
+        popup=folium.Popup(popup_html, max_width=300),
+        color=color,
+        fill=True,
+        fill_color=color
+    ).add_to(target)
+
+def _add_point_cluster(target, points):
+    """Add a browser-side marker cluster fed by one compact array row per point"""
+    rows = [
+        [
+            point.get('latitude'),
+            point.get('longitude'),
+            STATUS_COLORS.index(point_status(point.get('age', 0), point.get('last_maintenance_days', 0))),
+            html.escape(str(point.get('name', 'Unknown'))),
+            html.escape(str(point.get('type', 'N/A'))),
+            point.get('age', 0),
+            point.get('last_maintenance_days', 0)
+        ]
+        for point in points
+        if point.get('latitude') is not None and point.get('longitude') is not None
+    ]
+    FastMarkerCluster(rows, callback=CLUSTER_MARKER_CALLBACK, name="Infrastructure").add_to(target)
+
+def _add_grid_cells(target, cells):
+    """Add one count-sized circle per aggregated grid cell"""
+    for cell in cells:
+        count, critical, warning = cell['count'], cell['critical'] or 0, cell['warning'] or 0
+        color = cell_status(count, critical, warning)
+        folium.CircleMarker(
+            location=[cell['latitude'], cell['longitude']],
+            radius=6 + 4 * math.log10(count),
+            tooltip=f"{count:,} points: {critical:,} critical, {warning:,} need attention",
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.6
+        ).add_to(target)
+
+@timed('map')
 def create_infrastructure_map(assessment_data):
-    """Create a Folium map showing infrastructure points"""
+    """Create a Folium map showing infrastructure points.
+
+    Above CLUSTER_THRESHOLD points the markers are clustered in the browser.
+    """
     try:
         # Default center (US center)
         center_lat, center_lon = 39.8283, -98.5795
@@ -21,52 +135,106 @@ def create_infrastructure_map(assessment_data):
         # Create base map
         m = folium.Map(
             location=[center_lat, center_lon],
-            zoom_start=12,
-            tiles="OpenStreetMap"
+            zoom_start=MAP_ZOOM,
+            tiles=MAP_TILES
         )
 
         # Add points to map
-        for point in points:
-            # Calculate status color based on age and maintenance
-            age = point.get('age', 0)
-            maintenance_days = point.get('last_maintenance_days', 0)
-            
-            if age > 20 or maintenance_days > 365:
-                color = 'red'
-            elif age > 10 or maintenance_days > 180:
-                color = 'orange'
-            else:
-                color = 'green'
-
-            # Create popup content
-            popup_html = f"""
-            <div style='width: 200px'>
-                <h4>{point.get('name', 'Unknown')}</h4>
-                <p><b>Type:</b> {point.get('type', 'N/A')}</p>
-                <p><b>Age:</b> {age} years</p>
-                <p><b>Last Maintenance:</b> {maintenance_days} days ago</p>
-                <p><b>Status:</b> <span style='color: {color}'>●</span></p>
-            </div>
-            """
-
-            # Add marker
-            folium.CircleMarker(
-                location=[point.get('latitude'), point.get('longitude')],
-                radius=8,
-                popup=folium.Popup(popup_html, max_width=300),
-                color=color,
-                fill=True,
-                fill_color=color
-            ).add_to(m)
+        if len(points) > CLUSTER_THRESHOLD:
+            _add_point_cluster(m, points)
+        else:
+            for point in points:
+                _add_point_marker(m, point)
 
         return m
     except Exception as e:
-        logger.error(f"Error creating map: {e}", exc_info=True)
+        logger.error("Error creating map: %s", e, exc_info=True)
+        return None
+
+def _bounds_to_bbox(bounds):
+    """Convert Leaflet bounds returned by st_folium to (south, west, north, east)"""
+    try:
+        south_west, north_east = bounds['_southWest'], bounds['_northEast']
+        return (south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng'])
+    except (KeyError, TypeError):
         return None
 
-def show_infrastructure_map(assessment_data):
-    """Display infrastructure map in Streamlit"""
+@timed('map')
+def show_viewport_map(assessment_id, extent):
+    """Display a map that only loads the points inside the current viewport.
+
+    The last bounds reported by the map are kept in session state under the
+    component key; each rerun answers them with an R*Tree bounding-box query.
+    Viewports with more than MAX_VIEWPORT_POINTS points are aggregated into a
+    GRID_CELLS_PER_SIDE square grid in SQL, so the map size does not grow
+    with the number of points.
+    """
+    state_key = f"infrastructure_map_{assessment_id}"
+    previous = st.session_state.get(state_key) or {}
+
+    bbox = _bounds_to_bbox(previous.get('bounds'))
+    if bbox is None:
+        # Start zoomed in on the middle of the assessment area
+        center_lat = (extent['south'] + extent['north']) / 2
+        center_lon = (extent['west'] + extent['east']) / 2
+        bbox = (center_lat - INITIAL_VIEWPORT_SPAN, center_lon - INITIAL_VIEWPORT_SPAN,
+                center_lat + INITIAL_VIEWPORT_SPAN, center_lon + INITIAL_VIEWPORT_SPAN)
+    center = previous.get('center') or {'lat': (bbox[0] + bbox[2]) / 2, 'lng': (bbox[1] + bbox[3]) / 2}
+    zoom = previous.get('zoom') or 14
+
+    m = folium.Map(location=[center['lat'], center['lng']], zoom_start=zoom, tiles="OpenStreetMap")
+    feature_group = folium.FeatureGroup(name="Infrastructure")
+
+    visible = count_infrastructure_points(assessment_id, bbox)
+    if visible > MAX_VIEWPORT_POINTS:
+        cell_size = max(bbox[2] - bbox[0], bbox[3] - bbox[1]) / GRID_CELLS_PER_SIDE
+        cells = get_infrastructure_grid(assessment_id, bbox, cell_size)
+        _add_grid_cells(feature_group, cells)
+        caption = (f"{visible:,} of {extent['count']:,} infrastructure points in the current view, "
+                   f"grouped into {len(cells):,} areas (zoom in to see individual points)")
+    else:
+        points = get_infrastructure_points(assessment_id=assessment_id, bbox=bbox)
+        for point in points:
+            _add_point_marker(feature_group, point)
+        caption = f"Showing {len(points):,} of {extent['count']:,} infrastructure points in the current view"
+
+    st.subheader("Infrastructure Map")
+    st.caption(caption)
+    st_folium(
+        m,
+        key=state_key,
+        center=(center['lat'], center['lng']),
+        zoom=zoom,
+        feature_group_to_add=feature_group,
+        returned_objects=['bounds', 'center', 'zoom'],
+        use_container_width=True
+    )
+
+@timed('map')
+def show_infrastructure_map(assessment_data, assessment_id=None):
+    """Display infrastructure map in Streamlit.
+
+    Saved assessments are drawn from the points table, which also holds the
+    project's imported inventory. Their map HTML is rendered once per set of
+    points (count and newest point id) and served from the map cache on
+    later reruns.
+    """
     try:
+        if assessment_id is not None:
+            extent = get_infrastructure_extent(assessment_id)
+            if extent['count'] > VIEWPORT_QUERY_THRESHOLD:
+                show_viewport_map(assessment_id, extent)
+                return
+
+            st.subheader("Infrastructure Map")
+            key = (assessment_id, 'infrastructure', extent['count'], extent['last_id'], MAP_TILES, MAP_ZOOM)
+            build_map = lambda: create_infrastructure_map(
+                {'infrastructure_points': get_infrastructure_points(assessment_id=assessment_id)}
+            )
+            if not show_cached_map(key, build_map):
+                st.warning("Could not create infrastructure map")
+            return
+
         map_obj = create_infrastructure_map(assessment_data)
         if map_obj:
             st.subheader("Infrastructure Map")
@@ -74,5 +242,5 @@ def show_infrastructure_map(assessment_data):
         else:
             st.warning("Could not create infrastructure map")
     except Exception as e:
-        logger.error(f"Error displaying map: {e}", exc_info=True)
+        logger.error("Error displaying map: %s", e, exc_info=True)
         st.error("Unable to display infrastructure map")
@@ -1,34 +1,34 @@
 import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
-from utils.db import get_db
+from utils.db import read_connection
 from datetime import datetime, timedelta
 
 def create_org_tree():
     """Create an organizational tree showing users and their current work"""
     try:
-        db = get_db()
-        c = db.cursor()
+        with read_connection() as db:
+            c = db.cursor()
         
-        # Get all active users and their projects
-        c.execute("""
-            SELECT 
-                u.username,
-                p.name as project_name,
-                pm.role,
-                al.action_type,
-                al.action_details,
-                al.timestamp
-            FROM users u
-            LEFT JOIN project_members pm ON u.id = pm.user_id
-            LEFT JOIN projects p ON pm.project_id = p.id
-            LEFT JOIN activity_log al ON (u.id = al.user_id AND pm.project_id = al.project_id)
-            WHERE al.timestamp >= datetime('now', '-30 days')
-            OR al.timestamp IS NULL
-            ORDER BY al.timestamp DESC
-        """)
+            # Get all active users and their projects
+            c.execute("""
+                SELECT 
+                    u.username,
+                    p.name as project_name,
+                    pm.role,
+                    al.action_type,
+                    al.action_details,
+                    al.timestamp
+                FROM users u
+                LEFT JOIN project_members pm ON u.id = pm.user_id
+                LEFT JOIN projects p ON pm.project_id = p.id
+                LEFT JOIN activity_log al ON (u.id = al.user_id AND pm.project_id = al.project_id)
+                WHERE al.timestamp >= datetime('now', '-30 days')
+                OR al.timestamp IS NULL
+                ORDER BY al.timestamp DESC
+            """)
         
-        activities = c.fetchall()
+            activities = c.fetchall()
         
         # Process data for tree visualization
         nodes = ["Stormwater<br>Assessment<br>System"]  # Root node
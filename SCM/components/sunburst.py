@@ -3,15 +3,16 @@ import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
 import logging
+from utils.telemetry import timed
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+@timed('chart')
 def create_sunburst_chart(assessment_data):
     """Create a sunburst chart showing project progress and component relationships"""
     try:
         logger.debug("Creating sunburst chart with assessment data")
-        logger.debug(f"Assessment data keys: {assessment_data.keys() if assessment_data else 'None'}")
+        logger.debug("Assessment data keys: %s", assessment_data.keys() if assessment_data else 'None')
 
         if not assessment_data:
             logger.warning("No assessment data provided")
@@ -36,7 +37,7 @@ def create_sunburst_chart(assessment_data):
         }
 
         for key, label in categories.items():
-            logger.debug(f"Processing category: {key}")
+            logger.debug("Processing category: %s", key)
             data['ids'].append(key)
             data['labels'].append(label)
             data['parents'].append('root')
@@ -47,7 +48,7 @@ def create_sunburst_chart(assessment_data):
                 # Add subcategories based on available data
                 if key == 'condition' and 'condition' in assessment_data:
                     condition_data = assessment_data.get('condition', {})
-                    logger.debug(f"Condition data: {condition_data}")
+                    logger.debug("Condition data: %s", condition_data)
 
                     asset_condition = condition_data.get('stormwaterHydraulicAssetCondition', {})
                     damage_levels = asset_condition.get('damageLevels', {})
@@ -63,7 +64,7 @@ def create_sunburst_chart(assessment_data):
 
                 elif key == 'functionality' and 'functionality' in assessment_data:
                     func_data = assessment_data.get('functionality', {})
-                    logger.debug(f"Functionality data: {func_data}")
+                    logger.debug("Functionality data: %s", func_data)
 
                     performance = func_data.get('hydraulicPerformance', {})
                     for metric, value in performance.items():
@@ -75,11 +76,11 @@ def create_sunburst_chart(assessment_data):
                             data['values'].append(numeric_value)
                             data['colors'].append('#3498db')
                         except (ValueError, TypeError) as e:
-                            logger.error(f"Error converting value for metric {metric}: {e}")
+                            logger.error("Error converting value for metric %s: %s", metric, e)
 
                 elif key == 'environmental_social' and 'environmental_social' in assessment_data:
                     env_data = assessment_data.get('environmental_social', {})
-                    logger.debug(f"Environmental data: {env_data}")
+                    logger.debug("Environmental data: %s", env_data)
 
                     metrics = {
                         'pollutant': env_data.get('pollutantConcentrationReduction', 0),
@@ -94,10 +95,10 @@ def create_sunburst_chart(assessment_data):
                             data['values'].append(numeric_value)
                             data['colors'].append('#27ae60')
                         except (ValueError, TypeError) as e:
-                            logger.error(f"Error converting value for metric {metric}: {e}")
+                            logger.error("Error converting value for metric %s: %s", metric, e)
 
             except Exception as e:
-                logger.error(f"Error processing category {key}: {e}")
+                logger.error("Error processing category %s: %s", key, e)
                 continue
 
         logger.debug("Creating Plotly figure")
@@ -125,6 +126,6 @@ def create_sunburst_chart(assessment_data):
         return fig
 
     except Exception as e:
-        logger.error(f"Failed to create sunburst chart: {str(e)}", exc_info=True)
+        logger.error("Failed to create sunburst chart: %s", e, exc_info=True)
         st.error(f"Error creating visualization: {str(e)}")
         return go.Figure()
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""Command line maintenance tasks for the stormwater assessment database.
+
+Usage:
+    python manage.py migrate          Apply pending schema migrations and rescore stale metrics
+    python manage.py seed             Load demo users, projects and assessments
+    python manage.py backfill-metrics Project assessment scores into assessment_metrics
+    python manage.py reset --seed     Delete the database and rebuild it
+    python manage.py build-manual     Prebuild the user manual PDF
+    python manage.py serve-features   Serve map layers as bbox-filtered GeoJSON
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+from utils.db import DB_PATH, dict_factory
+from utils.db_migration import migrate, get_schema_version, run_data_tasks
+from utils.seed_data import seed_demo_data
+from utils.assessment_metrics import backfill_assessment_metrics
+from utils.documentation_generator import build_user_manual
+from utils.report import remove_cached_reports
+from utils.feature_service import create_server, FEATURE_SERVICE_HOST, FEATURE_SERVICE_PORT, FEATURE_SERVICE_SECRET, FEATURE_SERVICE_ORIGIN
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = dict_factory
+    return conn
+
+def cmd_migrate(args):
+    conn = _connect(args.db)
+    applied = migrate(conn)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    print(f"Schema version: {get_schema_version(conn)}")
+    written = run_data_tasks(conn)
+    if written:
+        print(f"Rescored metrics for {written} assessments")
+
+def cmd_seed(args):
+    conn = _connect(args.db)
+    migrate(conn)
+    if seed_demo_data(conn):
+        print("Demo data loaded")
+    else:
+        print("Database already contains users, skipping demo data")
+
+def cmd_backfill_metrics(args):
+    conn = _connect(args.db)
+    migrate(conn)
+    written = backfill_assessment_metrics(conn.cursor(), stale_only=not args.all)
+    conn.commit()
+    print(f"Wrote metrics for {written} assessments")
+
+def cmd_reset(args):
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    # The new database reuses assessment ids, so drop PDFs rendered from the old one
+    remove_cached_reports()
+    conn = _connect(args.db)
+    migrate(conn)
+    print(f"Recreated {args.db} at schema version {get_schema_version(conn)}")
+    if args.seed:
+        seed_demo_data(conn)
+        print("Demo data loaded")
+
+def cmd_build_manual(args):
+    path = build_user_manual(force=args.force)
+    print(f"User manual: {path}")
+
+def cmd_serve_features(args):
+    conn = _connect(args.db)
+    migrate(conn)
+    conn.close()
+    try:
+        server = create_server(args.db, args.host, args.port, secret=args.secret, origin=args.origin)
+    except ValueError as e:
+        print(f"Cannot serve map layers: {e}")
+        return 1
+    print(f"Serving map layers on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stormwater assessment maintenance tasks")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("migrate", help="Apply pending schema migrations").set_defaults(func=cmd_migrate)
+    subparsers.add_parser("seed", help="Load demo data into an empty database").set_defaults(func=cmd_seed)
+
+    backfill = subparsers.add_parser("backfill-metrics", help="Fill assessment_metrics from assessment JSON")
+    backfill.add_argument("--all", action="store_true", help="Recompute every row, not only missing or stale ones")
+    backfill.set_defaults(func=cmd_backfill_metrics)
+
+    reset = subparsers.add_parser("reset", help="Delete and recreate the database")
+    reset.add_argument("--seed", action="store_true", help="Load demo data after recreating")
+    reset.set_defaults(func=cmd_reset)
+
+    manual = subparsers.add_parser("build-manual", help="Prebuild the user manual PDF for the documentation page")
+    manual.add_argument("--force", action="store_true", help="Rebuild even if the current version exists")
+    manual.set_defaults(func=cmd_build_manual)
+
+    features = subparsers.add_parser("serve-features", help="Serve map layers as bounding-box filtered GeoJSON")
+    features.add_argument("--host", default=FEATURE_SERVICE_HOST, help="Interface to listen on")
+    features.add_argument("--port", type=int, default=FEATURE_SERVICE_PORT, help="Port to listen on")
+    features.add_argument("--secret", default=FEATURE_SERVICE_SECRET, help="Key the app signs layer tokens with")
+    features.add_argument("--origin", default=FEATURE_SERVICE_ORIGIN, help="App origin allowed to fetch layers")
+    features.set_defaults(func=cmd_serve_features)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
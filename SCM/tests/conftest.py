@@ -0,0 +1,17 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_migration import migrate
+
+@pytest.fixture
+def cursor():
+    """A cursor on a migrated in-memory database"""
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    yield conn.cursor()
+    conn.close()
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+
+import pytest
+
+from utils.db_migration import LATEST_VERSION, MIGRATIONS, get_schema_version, migrate, run_data_tasks
+from utils.scoring import WEIGHTS_VERSION, calculate_overall_score
+
+# The schema init_database created before versioned migrations
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    is_admin BOOLEAN NOT NULL DEFAULT 0
+);
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    created_by INTEGER NOT NULL,
+    created_at DATETIME NOT NULL,
+    status TEXT DEFAULT 'active'
+);
+CREATE TABLE project_members (
+    project_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    joined_at DATETIME NOT NULL,
+    PRIMARY KEY (project_id, user_id)
+);
+CREATE TABLE activity_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    project_id INTEGER NOT NULL,
+    action_type TEXT NOT NULL,
+    action_details TEXT NOT NULL,
+    timestamp DATETIME NOT NULL
+);
+CREATE TABLE assessments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    project_id INTEGER NOT NULL,
+    timestamp DATETIME NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+def _assessment(score, points):
+    return {
+        'condition': {'OSAC': {'score': score, 'rating': 'Fair'}},
+        'functionality': {'overallFunctionality': {'score': score + 1}},
+        'time_effectiveness': {'overallTimeScore': score},
+        'cost_effectiveness': {'overallCostScore': score - 1},
+        'environmental_social': {'overallScore': score},
+        'infrastructure_points': points
+    }
+
+ASSESSMENTS = [
+    _assessment(6, [
+        {'name': 'Inlet', 'type': 'drainageInlets', 'latitude': 40.70, 'longitude': -74.00, 'age': 4},
+        {'name': 'Outfall', 'type': 'outfalls', 'latitude': 40.71, 'longitude': -74.01, 'age': 30}
+    ]),
+    # Points without coordinates are not copied into the points table
+    _assessment(8, [{'name': 'Unplaced', 'type': 'pipes'}]),
+    _assessment(4, [])
+]
+
+@pytest.fixture
+def baseline():
+    """A database in the pre-migration schema holding users, a project and assessments"""
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO users (username, password, is_admin) VALUES ('admin', 'x', 1)")
+    conn.execute("INSERT INTO projects (name, created_by, created_at) VALUES ('Baseline', 1, '2024-01-01')")
+    conn.executemany(
+        "INSERT INTO assessments (user_id, project_id, timestamp, data) VALUES (1, 1, ?, ?)",
+        [(f"2024-01-0{i + 1}T00:00:00", json.dumps(data)) for i, data in enumerate(ASSESSMENTS)]
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_empty_database_migrates_to_the_latest_version():
+    conn = sqlite3.connect(':memory:')
+
+    assert migrate(conn) == [version for version, _, _ in MIGRATIONS]
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert _count(conn, 'assessment_metrics') == _count(conn, 'infrastructure_points') == 0
+    assert run_data_tasks(conn) == 0
+    assert migrate(conn) == []
+
+def test_baseline_database_is_migrated_and_backfilled(baseline):
+    assert get_schema_version(baseline) == 0
+    assert migrate(baseline) == list(range(1, LATEST_VERSION + 1))
+    assert get_schema_version(baseline) == LATEST_VERSION
+
+    # Migration 2 projects every assessment; its rows carry no weights version yet
+    assert _count(baseline, 'assessment_metrics') == len(ASSESSMENTS)
+    assert baseline.execute("SELECT COUNT(*) FROM assessment_metrics WHERE weights_version IS NULL").fetchone()[0] == len(ASSESSMENTS)
+
+    # Migration 3 copies the placed points out of the assessment JSON, and indexes them
+    points = baseline.execute(
+        "SELECT assessment_id, name, latitude, longitude FROM infrastructure_points ORDER BY id"
+    ).fetchall()
+    assert points == [(1, 'Inlet', 40.70, -74.00), (1, 'Outfall', 40.71, -74.01)]
+    assert baseline.execute("SELECT id FROM infrastructure_points_rtree ORDER BY id").fetchall() == \
+        baseline.execute("SELECT id FROM infrastructure_points ORDER BY id").fetchall()
+
+    # The data task scores every row with the live scorer
+    assert run_data_tasks(baseline) == len(ASSESSMENTS)
+    rows = baseline.execute(
+        "SELECT m.overall_score, m.weights_version, m.infrastructure_point_count, a.data "
+        "FROM assessment_metrics m JOIN assessments a ON a.id = m.assessment_id ORDER BY a.id"
+    ).fetchall()
+    for overall_score, weights_version, point_count, data in rows:
+        data = json.loads(data)
+        assert overall_score == calculate_overall_score(data)
+        assert weights_version == WEIGHTS_VERSION
+        assert point_count == len(data['infrastructure_points'])
+
+def test_rerunning_migrations_and_data_tasks_is_a_no_op(baseline):
+    migrate(baseline)
+    run_data_tasks(baseline)
+    before = [baseline.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+              for table in ('schema_version', 'assessment_metrics', 'infrastructure_points')]
+
+    assert migrate(baseline) == []
+    assert run_data_tasks(baseline) == 0
+    after = [baseline.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+             for table in ('schema_version', 'assessment_metrics', 'infrastructure_points')]
+    assert after == before
+
+def test_failed_step_leaves_the_previous_version(baseline, monkeypatch):
+    from utils import db_migration
+
+    def broken(c):
+        c.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("step failed")
+    monkeypatch.setattr(db_migration, 'MIGRATIONS', MIGRATIONS[:2] + [(3, "Broken", broken)])
+    monkeypatch.setattr(db_migration, 'LATEST_VERSION', 3)
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(baseline)
+    assert get_schema_version(baseline) == 2
+    assert not baseline.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchall()
@@ -0,0 +1,155 @@
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils import feature_service
+from utils.db_migration import migrate
+from utils.feature_service import (
+    create_server,
+    file_download_url,
+    parse_bbox,
+    sign_file_token,
+    sign_layer_token,
+    verify_layer_token
+)
+from utils.infrastructure_points import insert_points
+
+SECRET = 'test-secret'
+ORIGIN = 'https://stormwater.example.org'
+REPORT = b'%PDF-1.4 ' + bytes(range(256)) * 4096
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    """A running feature server with one assessment holding one point and one
+    cached report; yields its base URL"""
+    path = str(tmp_path_factory.mktemp('features') / 'features.db')
+    reports = tmp_path_factory.mktemp('reports')
+    (reports / 'report_1.pdf').write_bytes(REPORT)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.execute("INSERT INTO assessments (id, user_id, project_id, timestamp, data) VALUES (1, 1, 1, '2026-01-01', '{}')")
+    insert_points(conn.cursor(), 1, 1, [{'name': 'Inlet', 'type': 'drainageInlets', 'latitude': 40.7, 'longitude': -74.0}])
+    conn.commit()
+    conn.close()
+
+    server = create_server(path, port=0, secret=SECRET, origin=ORIGIN, dirs={'reports': str(reports)})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    server.connections.close()
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.headers, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, json.loads(e.read())
+
+def _layer(base, token=None, query=''):
+    url = f"{base}/assessments/1/infrastructure.geojson"
+    return url + (f"?token={token}" if token is not None else '?') + query
+
+def test_signed_request_is_served_to_the_app_origin_only(server):
+    status, headers, body = _get(_layer(server, sign_layer_token(1, SECRET)))
+
+    assert status == 200
+    assert body['properties']['count'] == 1
+    assert headers['Access-Control-Allow-Origin'] == ORIGIN
+    assert headers['Vary'] == 'Origin'
+
+@pytest.mark.parametrize('token', [
+    None,
+    '',
+    'not-a-token',
+    '123.deadbeef',
+    sign_layer_token(1, SECRET, now=0),
+    sign_layer_token(2, SECRET),
+    sign_layer_token(1, 'another-secret')
+], ids=['missing', 'empty', 'malformed', 'bad signature', 'expired', 'other assessment', 'other secret'])
+def test_requests_without_a_valid_token_are_forbidden(server, token):
+    status, headers, body = _get(_layer(server, token))
+
+    assert status == 403
+    assert 'features' not in body
+    assert headers['Access-Control-Allow-Origin'] == ORIGIN
+
+@pytest.mark.parametrize('bbox', ['bad', '1,2,3', '1,2,0,3', '-74,40,-73,nan'])
+def test_bad_bbox_is_rejected(server, bbox):
+    status, _, body = _get(_layer(server, sign_layer_token(1, SECRET), f"&bbox={bbox}"))
+
+    assert status == 400
+    assert body['error'].startswith('bbox must')
+
+def test_health_needs_no_token(server):
+    assert _get(f"{server}/health")[:3:2] == (200, {'status': 'ok'})
+
+def test_create_server_requires_a_secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_service, 'FEATURE_SERVICE_SECRET', None)
+
+    with pytest.raises(ValueError):
+        create_server(str(tmp_path / 'features.db'), port=0)
+
+def test_tokens_expire_after_their_window():
+    token = sign_layer_token(1, SECRET, ttl=100, now=1000)
+
+    assert verify_layer_token(token, 1, SECRET, now=1150)
+    assert verify_layer_token(token, 1, SECRET, now=1200)
+    assert not verify_layer_token(token, 1, SECRET, now=1201)
+    assert not verify_layer_token(token, 2, SECRET, now=1000)
+
+def test_parse_bbox_returns_south_west_north_east():
+    assert parse_bbox('-74.1,40.7,-74.0,40.8') == (40.7, -74.1, 40.8, -74.0)
+
+def _download(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def test_signed_file_is_streamed_as_an_attachment(server):
+    token = sign_file_token('reports', 'report_1.pdf', SECRET)
+    status, headers, body = _download(f"{server}/files/reports/report_1.pdf?token={token}&filename=Site%20A%0D%0A.pdf")
+
+    assert status == 200
+    assert body == REPORT
+    assert headers['Content-Type'] == 'application/pdf'
+    assert headers['Content-Length'] == str(len(REPORT))
+    assert headers['Content-Disposition'] == 'attachment; filename="Site A__.pdf"'
+
+@pytest.mark.parametrize('token', [
+    None,
+    sign_file_token('reports', 'report_2.pdf', SECRET),
+    sign_file_token('exports', 'report_1.pdf', SECRET),
+    sign_file_token('reports', 'report_1.pdf', SECRET, now=0),
+    sign_layer_token(1, SECRET)
+], ids=['missing', 'other file', 'other area', 'expired', 'layer token'])
+def test_files_without_a_valid_token_are_forbidden(server, token):
+    status, _, body = _download(f"{server}/files/reports/report_1.pdf?token={token}")
+
+    assert status == 403
+    assert REPORT not in body
+
+@pytest.mark.parametrize('area, name', [('reports', 'report_2.pdf'), ('secrets', 'report_1.pdf'), ('reports', '..')])
+def test_missing_files_and_unknown_areas_are_not_found(server, area, name):
+    status, _, _ = _download(f"{server}/files/{area}/{name}?token={sign_file_token(area, name, SECRET)}")
+
+    assert status == 404
+
+def test_file_download_url_only_signs_files_in_download_areas(tmp_path):
+    reports, elsewhere = tmp_path / 'reports', tmp_path / 'elsewhere'
+    reports.mkdir()
+    elsewhere.mkdir()
+    args = {'base_url': 'http://features.example.org/', 'secret': SECRET, 'dirs': {'reports': str(reports)}}
+
+    url = file_download_url(str(reports / 'report_1.pdf'), 'Site A.pdf', **args)
+    token = sign_file_token('reports', 'report_1.pdf', SECRET)
+    assert url == f"http://features.example.org/files/reports/report_1.pdf?token={token}&filename=Site%20A.pdf"
+    assert file_download_url(str(elsewhere / 'report_1.pdf'), 'Site A.pdf', **args) is None
+    assert file_download_url(str(reports / 'report_1.pdf'), 'Site A.pdf', dirs=args['dirs']) is None
@@ -0,0 +1,39 @@
+from utils.infrastructure_points import count_points, insert_points, query_points
+
+# (south, west, north, east); none of the edges is exact in float32
+BBOX = (40.7, -74.1, 40.8, -74.0)
+# Well inside the R*Tree's float32 rounding of the edges
+JUST = 1e-9
+
+def _point(name, latitude, longitude):
+    return {'name': name, 'type': 'manholes', 'latitude': latitude, 'longitude': longitude}
+
+EDGE_POINTS = [
+    _point('south', 40.7, -74.05),
+    _point('north', 40.8, -74.05),
+    _point('west', 40.75, -74.1),
+    _point('east', 40.75, -74.0),
+    _point('south-west corner', 40.7, -74.1),
+    _point('north-east corner', 40.8, -74.0)
+]
+
+OUTSIDE_POINTS = [
+    _point('below south', 40.7 - JUST, -74.05),
+    _point('above north', 40.8 + JUST, -74.05),
+    _point('past west', 40.75, -74.1 - JUST),
+    _point('past east', 40.75, -74.0 + JUST)
+]
+
+def test_bbox_includes_edge_points_and_excludes_points_just_outside(cursor):
+    insert_points(cursor, 1, 1, EDGE_POINTS + OUTSIDE_POINTS + [_point('centre', 40.75, -74.05)])
+
+    names = {point[3] for point in query_points(cursor, assessment_id=1, bbox=BBOX)}
+    assert names == {point['name'] for point in EDGE_POINTS} | {'centre'}
+    assert count_points(cursor, 1, BBOX) == len(EDGE_POINTS) + 1
+
+def test_bbox_is_limited_to_the_assessment(cursor):
+    insert_points(cursor, 1, 1, EDGE_POINTS)
+    insert_points(cursor, 1, 2, EDGE_POINTS)
+
+    assert count_points(cursor, 2, BBOX) == len(EDGE_POINTS)
+    assert len(query_points(cursor, assessment_id=2, bbox=BBOX)) == len(EDGE_POINTS)
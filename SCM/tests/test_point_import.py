@@ -0,0 +1,162 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from utils import db, point_import
+from components.gis_integration import GISManager
+from utils.feature_service import feature_collection
+from utils.infrastructure_points import POINT_COLUMNS, POINT_TYPES
+from utils.point_import import import_points
+
+INVENTORY_CSV = b"""name,type,latitude,longitude,age,last_maintenance_days
+Inlet A,drainageInlets,40.7001,-74.0001,5,30
+Manhole B,manholes,40.7010,-74.0010,25,400
+"""
+
+ASSESSED_POINT = {'name': 'Outfall C', 'type': 'outfalls', 'latitude': 40.7020, 'longitude': -74.0020,
+                  'age': 3, 'last_maintenance_days': 10}
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A project with two saved assessments in a fresh database"""
+    monkeypatch.setattr(db, 'DB_PATH', str(tmp_path / 'stormwater.db'))
+    db.init_database.clear()
+    with db.write_transaction() as conn:
+        user_id = conn.execute(
+            "INSERT INTO users (username, password, is_admin) VALUES ('tester', 'x', 1)"
+        ).lastrowid
+    project_id = db.create_project("Inventory", "", user_id)
+    assessment_ids = [
+        db.save_assessment({'user_id': user_id, 'project_id': project_id, 'timestamp': '2026-01-01T00:00:00',
+                            'infrastructure_points': points})
+        for points in ([ASSESSED_POINT], [])
+    ]
+    yield project_id, assessment_ids
+    db.init_database().close()
+    db.init_database.clear()
+
+def test_imported_inventory_is_found_by_the_gis_loader(project):
+    project_id, (assessment_id, other_id) = project
+    result = db.import_infrastructure_points(project_id, io.BytesIO(INVENTORY_CSV), 'csv')
+    assert result.imported == 2
+
+    gdf = GISManager().load_infrastructure_points(assessment_id)
+    assert sorted(gdf['name']) == ['Inlet A', 'Manhole B', 'Outfall C']
+
+    # Assessments without points of their own still see the project's inventory
+    gdf = GISManager().load_infrastructure_points(other_id, bbox=(40.70, -74.01, 40.71, -74.00))
+    assert sorted(gdf['name']) == ['Inlet A', 'Manhole B']
+    assert db.get_infrastructure_extent(other_id)['count'] == 2
+    assert db.count_infrastructure_points(other_id, (40.70, -74.01, 40.71, -74.00)) == 2
+
+def test_imported_inventory_is_served_as_a_layer(project):
+    project_id, (assessment_id, _) = project
+    db.import_infrastructure_points(project_id, io.BytesIO(INVENTORY_CSV), 'csv')
+
+    with db.read_connection() as conn:
+        collection = feature_collection(conn.cursor(), assessment_id)
+    assert collection['properties']['count'] == 3
+    assert sorted(f['properties']['name'] for f in collection['features']) == ['Inlet A', 'Manhole B', 'Outfall C']
+
+def test_other_projects_inventory_is_not_included(project):
+    project_id, (assessment_id, _) = project
+    other_project = db.create_project("Elsewhere", "", 1)
+    db.import_infrastructure_points(other_project, io.BytesIO(INVENTORY_CSV), 'csv')
+
+    gdf = GISManager().load_infrastructure_points(assessment_id)
+    assert list(gdf['name']) == ['Outfall C']
+
+def test_replacing_the_inventory_changes_the_extent_stamp(project):
+    project_id, (assessment_id, _) = project
+    db.import_infrastructure_points(project_id, io.BytesIO(INVENTORY_CSV), 'csv')
+    before = db.get_infrastructure_extent(assessment_id)
+
+    # A same-size replacement keeps the count but not the newest point id
+    with db.write_transaction() as conn:
+        conn.execute("DELETE FROM infrastructure_points WHERE project_id = ? AND assessment_id IS NULL", (project_id,))
+    db.import_infrastructure_points(project_id, io.BytesIO(INVENTORY_CSV), 'csv')
+    after = db.get_infrastructure_extent(assessment_id)
+    assert after['count'] == before['count'] == 3
+    assert after['last_id'] > before['last_id']
+
+def _stored_points(c):
+    c.execute(f"SELECT {', '.join(POINT_COLUMNS)} FROM infrastructure_points ORDER BY id")
+    return c.fetchall()
+
+MIXED_CSV = b"""Name,Type,Lat,Lon,Age,Last_Maintenance_Days
+Good inlet,drainageInlets,40.70,-74.00,5,30
+Too far north,manholes,95,-74.00,1,1
+Too far west,manholes,40.70,-200,1,1
+Hydrant,hydrant,40.70,-74.00,1,1
+No latitude,manholes,,-74.00,1,1
+Text latitude,manholes,north,-74.00,1,1
+Negative age,manholes,40.70,-74.00,-3,1
+,MANHOLES,40.71,-74.01,,
+"""
+
+def test_csv_import_keeps_good_rows_and_reports_bad_ones(cursor):
+    result = import_points(cursor, 1, io.BytesIO(MIXED_CSV), 'csv')
+
+    assert (result.imported, result.rejected, result.rows) == (2, 6, 8)
+    reasons = dict(result.rejects)
+    assert reasons[2] == reasons[3] == "coordinates out of range"
+    assert reasons[4].startswith("type must be one of")
+    assert reasons[5] == reasons[6] == "missing or non-numeric coordinates"
+    assert reasons[7] == "age and maintenance days must be non-negative numbers"
+    assert _stored_points(cursor) == [
+        ('Good inlet', 'drainageInlets', 40.70, -74.00, 5, 30),
+        ('Imported 8', 'manholes', 40.71, -74.01, None, None)
+    ]
+
+def test_csv_rejects_are_numbered_across_chunks(cursor, monkeypatch):
+    monkeypatch.setattr(point_import, 'IMPORT_CHUNK_ROWS', 3)
+    result = import_points(cursor, 1, io.BytesIO(MIXED_CSV), 'csv')
+
+    assert (result.imported, result.rejected) == (2, 6)
+    assert sorted(row for row, _ in result.rejects) == [2, 3, 4, 5, 6, 7]
+    assert [name for name, *_ in _stored_points(cursor)] == ['Good inlet', 'Imported 8']
+
+def test_geojson_import_rejects_non_points_and_bad_coordinates(cursor):
+    def feature(geometry, **properties):
+        return {'type': 'Feature', 'geometry': geometry, 'properties': properties}
+    collection = {'type': 'FeatureCollection', 'features': [
+        feature({'type': 'Point', 'coordinates': [-74.0, 40.7]}, name='Outfall', type='outfalls', age=2),
+        feature({'type': 'Point', 'coordinates': [-74.0, 91.0]}, name='Pole', type='outfalls'),
+        feature({'type': 'Point', 'coordinates': [-74.0, 40.7]}, name='Hydrant', type='hydrant'),
+        feature({'type': 'LineString', 'coordinates': [[-74.0, 40.7], [-74.1, 40.8]]}, name='Pipe run', type='pipes'),
+        feature(None, name='Nowhere', type='pipes'),
+        feature({'type': 'Point', 'coordinates': [-74.2, 40.6]}, name='Culvert', type='Culverts')
+    ]}
+    result = import_points(cursor, 1, io.BytesIO(json.dumps(collection).encode()), 'geojson')
+
+    assert (result.imported, result.rejected) == (2, 4)
+    assert dict(result.rejects) == {
+        2: "coordinates out of range",
+        3: f"type must be one of {', '.join(POINT_TYPES)}",
+        4: "missing or non-numeric coordinates",
+        5: "missing or non-numeric coordinates"
+    }
+    assert _stored_points(cursor) == [
+        ('Outfall', 'outfalls', 40.7, -74.0, 2, None),
+        ('Culvert', 'culverts', 40.6, -74.2, None, None)
+    ]
+
+def test_failed_import_leaves_nothing_behind(project, monkeypatch):
+    project_id, _ = project
+    monkeypatch.setattr(point_import, 'IMPORT_CHUNK_ROWS', 1)
+    # The first chunk is written before the second one fails
+    insert_point_rows = point_import.insert_point_rows
+    written = []
+
+    def insert_then_fail(c, *args):
+        if written:
+            raise sqlite3.OperationalError("disk I/O error")
+        insert_point_rows(c, *args)
+        written.append(args)
+    monkeypatch.setattr(point_import, 'insert_point_rows', insert_then_fail)
+
+    assert db.import_infrastructure_points(project_id, io.BytesIO(INVENTORY_CSV), 'csv') is None
+    assert len(written) == 1
+    assert [point['name'] for point in db.get_infrastructure_points(project_id=project_id)] == ['Outfall C']
@@ -0,0 +1,122 @@
+import json
+from utils.scoring import cached_overall_score, content_hash, extract_domain_scores, WEIGHTS_VERSION
+from utils.telemetry import timed
+
+# Typed columns of assessment_metrics, in insert order
+METRIC_COLUMNS = [
+    'condition_score',
+    'functionality_score',
+    'time_score',
+    'cost_score',
+    'environmental_score',
+    'overall_score',
+    'infrastructure_point_count',
+    'content_hash',
+    'weights_version'
+]
+
+def compute_assessment_metrics(assessment_data, assessment_id=None, overall_score=None):
+    """Project the domain scores of one assessment into the typed metric columns.
+
+    ``overall_score`` may be passed in when it was already computed in a batch.
+    """
+    domain_scores = extract_domain_scores(assessment_data)
+    digest = content_hash(assessment_data)
+    if overall_score is None:
+        overall_score = cached_overall_score(assessment_data, assessment_id, digest)
+    return {
+        'condition_score': domain_scores['condition'],
+        'functionality_score': domain_scores['functionality'],
+        'time_score': domain_scores['time_effectiveness'],
+        'cost_score': domain_scores['cost_effectiveness'],
+        'environmental_score': domain_scores['environmental_social'],
+        'overall_score': overall_score,
+        'infrastructure_point_count': len(assessment_data.get('infrastructure_points') or []),
+        'content_hash': digest,
+        'weights_version': WEIGHTS_VERSION
+    }
+
+def upsert_assessment_metrics(c, assessment_id, project_id, user_id, timestamp, assessment_data, overall_score=None,
+                              columns=METRIC_COLUMNS):
+    """Write (or replace) the metrics row for an assessment using cursor ``c``.
+
+    ``columns`` limits the row to the metric columns an older schema has.
+    """
+    metrics = compute_assessment_metrics(assessment_data, assessment_id, overall_score)
+    c.execute(
+        "INSERT OR REPLACE INTO assessment_metrics "
+        "(assessment_id, project_id, user_id, timestamp, {}) VALUES (?, ?, ?, ?, {})".format(
+            ', '.join(columns), ', '.join('?' * len(columns))
+        ),
+        (assessment_id, project_id, user_id, timestamp) + tuple(metrics[col] for col in columns)
+    )
+    return metrics
+
+def _table_metric_columns(c):
+    c.execute("PRAGMA table_info(assessment_metrics)")
+    existing = {row['name'] if isinstance(row, dict) else row[1] for row in c.fetchall()}
+    return [col for col in METRIC_COLUMNS if col in existing]
+
+def _row_values(row, *keys):
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(row)
+
+def stale_assessment_ids(c, project_id=None):
+    """Ids of assessments with no metrics row or one scored under other weights"""
+    query = """
+        SELECT a.id FROM assessments a
+        LEFT JOIN assessment_metrics m ON m.assessment_id = a.id
+        WHERE (m.assessment_id IS NULL OR m.weights_version IS NOT ?)
+    """
+    params = [WEIGHTS_VERSION]
+    if project_id is not None:
+        query += " AND a.project_id = ?"
+        params.append(project_id)
+    c.execute(query + " ORDER BY a.id", tuple(params))
+    return [_row_values(row, 'id')[0] for row in c.fetchall()]
+
+@timed('scoring')
+def backfill_assessment_metrics(c, stale_only=True, project_id=None, batch_size=500):
+    """Compute metrics rows for existing assessments using cursor ``c``.
+
+    With ``stale_only`` only assessments that have no metrics row, or whose
+    row was scored under different domain weights, are processed; otherwise
+    every row (of ``project_id``, if given) is recomputed. Overall scores
+    come from the per-row scorer, which also fills the score cache. Only
+    the metric columns the table has are written, so the backfill in
+    migration 2 keeps working against its schema. The caller commits.
+    Returns the number of assessments written.
+    """
+    columns = _table_metric_columns(c)
+    if 'weights_version' not in columns:
+        # Migration 2 runs before scores are versioned: fill only the missing rows
+        c.execute("SELECT a.id FROM assessments a LEFT JOIN assessment_metrics m ON m.assessment_id = a.id"
+                  " WHERE m.assessment_id IS NULL ORDER BY a.id")
+        ids = [_row_values(row, 'id')[0] for row in c.fetchall()]
+    elif stale_only:
+        ids = stale_assessment_ids(c, project_id)
+    else:
+        query = "SELECT id FROM assessments"
+        params = ()
+        if project_id is not None:
+            query += " WHERE project_id = ?"
+            params = (project_id,)
+        c.execute(query + " ORDER BY id", params)
+        ids = [_row_values(row, 'id')[0] for row in c.fetchall()]
+
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        c.execute(
+            "SELECT id, project_id, user_id, timestamp, data FROM assessments WHERE id IN ({})".format(
+                ','.join('?' * len(batch))
+            ),
+            batch
+        )
+        for row in c.fetchall():
+            assessment_id, row_project_id, user_id, timestamp, data = _row_values(
+                row, 'id', 'project_id', 'user_id', 'timestamp', 'data'
+            )
+            upsert_assessment_metrics(c, assessment_id, row_project_id, user_id, timestamp, json.loads(data),
+                                      columns=columns)
+    return len(ids)
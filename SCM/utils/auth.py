@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.db import get_db
+from utils.db import read_connection, write_transaction
 import bcrypt
 
 def init_auth():
@@ -126,10 +126,10 @@ def check_auth():
             # Login button
             if st.button("Sign In", use_container_width=True):
                 try:
-                    db = get_db()
-                    c = db.cursor()
-                    c.execute("SELECT * FROM users WHERE username = ?", (username,))
-                    user = c.fetchone()
+                    with read_connection() as db:
+                        c = db.cursor()
+                        c.execute("SELECT * FROM users WHERE username = ?", (username,))
+                        user = c.fetchone()
 
                     if user and bcrypt.checkpw(password.encode('utf-8'), user['password']):
                         st.session_state.authenticated = True
@@ -158,21 +158,22 @@ def check_auth():
 def create_user(username, password, is_admin=False):
     """Create a new user"""
     try:
-        db = get_db()
-        c = db.cursor()
+        # Hash outside the write transaction so other writers are not held up
+        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
-        # Check if username exists
-        c.execute("SELECT id FROM users WHERE username = ?", (username,))
-        if c.fetchone():
-            raise ValueError("Username already exists")
+        with write_transaction() as db:
+            c = db.cursor()
 
-        # Create new user with bcrypt hashed password
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        c.execute(
-            "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
-            (username, hashed, is_admin)
-        )
-        db.commit()
+            # Check if username exists
+            c.execute("SELECT id FROM users WHERE username = ?", (username,))
+            if c.fetchone():
+                raise ValueError("Username already exists")
+
+            # Create new user with bcrypt hashed password
+            c.execute(
+                "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
+                (username, hashed, is_admin)
+            )
         return c.lastrowid
     except Exception as e:
         st.error(f"Failed to create user: {str(e)}")
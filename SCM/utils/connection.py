@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Milliseconds a connection waits on a locked database before raising
+BUSY_TIMEOUT_MS = 5000
+# Read connections shared by all script threads and feature service requests
+POOL_SIZE = int(os.environ.get('STORMWATER_DB_POOL_SIZE', 4))
+# Seconds a returned read connection may sit unused before it is closed
+IDLE_TIMEOUT = 300
+
+def dict_factory(cursor, row):
+    d = {}
+    for idx, col in enumerate(cursor.description):
+        d[col[0]] = row[idx]
+    return d
+
+class ConnectionManager:
+    """Bounded pool of SQLite connections in WAL mode: read-only readers and one serialized writer.
+
+    Connections are opened with ``check_same_thread=False`` and handed out
+    per call, so Streamlit reruns (each on a new script thread) and feature
+    service requests reuse the same few connections instead of opening
+    their own. ``read()`` lends a ``query_only`` connection; at most
+    ``max_readers`` exist and further readers wait for one to be returned.
+    Readers left idle for ``idle_timeout`` seconds are closed. In WAL mode
+    readers see the last committed snapshot and are not blocked while an
+    assessment is being saved. Writes go through ``transaction()``, which
+    serializes writers inside the process on the single write connection so
+    they queue on a lock instead of failing with SQLITE_BUSY.
+    """
+
+    def __init__(self, path, max_readers=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS, idle_timeout=IDLE_TIMEOUT):
+        self.path = path
+        self.max_readers = max_readers
+        self.busy_timeout_ms = busy_timeout_ms
+        self.idle_timeout = idle_timeout
+        # Returned readers with the time they were returned, oldest first
+        self._idle = deque()
+        self._open_readers = 0
+        self._available = threading.Condition()
+        self._writer = None
+        self._write_lock = threading.RLock()
+
+        # journal_mode is persistent in the database file, so set it once
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+
+    def _connect(self, query_only=False):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        conn.row_factory = dict_factory
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if query_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _close_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            self._idle.popleft()[0].close()
+            self._open_readers -= 1
+
+    def _acquire_reader(self):
+        with self._available:
+            while True:
+                self._close_idle()
+                if self._idle:
+                    # Most recently returned first, so surplus readers go idle and close
+                    return self._idle.pop()[0]
+                if self._open_readers < self.max_readers:
+                    self._open_readers += 1
+                    break
+                self._available.wait()
+        try:
+            return self._connect(query_only=True)
+        except Exception:
+            with self._available:
+                self._open_readers -= 1
+                self._available.notify()
+            raise
+
+    @contextmanager
+    def read(self):
+        """Lend a read-only connection from the pool for the duration of the block"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            with self._available:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+
+    @contextmanager
+    def transaction(self):
+        """Yield the write connection inside a transaction, committing on success"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def stats(self):
+        with self._available:
+            return {'readers': self._open_readers, 'idle': len(self._idle), 'max_readers': self.max_readers}
+
+    def close(self):
+        """Close the idle readers and the writer"""
+        with self._available:
+            while self._idle:
+                self._idle.popleft()[0].close()
+                self._open_readers -= 1
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
@@ -4,12 +4,12 @@ import json
 import streamlit as st
 import bcrypt
 from datetime import datetime, timedelta
-
-def dict_factory(cursor, row):
-    d = {}
-    for idx, col in enumerate(cursor.description):
-        d[col[0]] = row[idx]
-    return d
+from utils.connection import ConnectionManager, dict_factory
+from utils.db_migration import migrate, run_data_tasks
+from utils.assessment_metrics import upsert_assessment_metrics, stale_assessment_ids, backfill_assessment_metrics
+from utils.infrastructure_points import insert_points, query_points, points_extent, count_points, aggregate_points
+from utils.point_import import import_points
+from utils.telemetry import timed, timer, flush as flush_telemetry_metrics
 
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -17,368 +17,44 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
+DB_PATH = os.environ.get('STORMWATER_DB_PATH', 'stormwater_assessment.db')
+
 @st.cache_resource
 def init_database():
-    """Initialize SQLite database with required tables"""
-    try:
-        # Remove existing database to recreate schema
-        if os.path.exists('stormwater_assessment.db'):
-            os.remove('stormwater_assessment.db')
-
-        conn = sqlite3.connect('stormwater_assessment.db', check_same_thread=False)
-        conn.row_factory = dict_factory
-        c = conn.cursor()
-
-        # Create users table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            is_admin BOOLEAN NOT NULL DEFAULT 0
-        )
-        ''')
-
-        # Create projects table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            created_by INTEGER NOT NULL,
-            created_at DATETIME NOT NULL,
-            status TEXT DEFAULT 'active',
-            FOREIGN KEY (created_by) REFERENCES users (id)
-        )
-        ''')
-
-        # Create project_members table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS project_members (
-            project_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            role TEXT NOT NULL,
-            joined_at DATETIME NOT NULL,
-            PRIMARY KEY (project_id, user_id),
-            FOREIGN KEY (project_id) REFERENCES projects (id),
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        ''')
-
-        # Create activity log table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS activity_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            project_id INTEGER NOT NULL,
-            action_type TEXT NOT NULL,
-            action_details TEXT NOT NULL,
-            timestamp DATETIME NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-        ''')
-
-        # Create assessments table
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS assessments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            project_id INTEGER NOT NULL,
-            timestamp DATETIME NOT NULL,
-            data TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-        ''')
-
-        # Create demo users
-        demo_users = [
-            ("admin", "admin123", True),
-            ("john_engineer", "john123", False),
-            ("sarah_manager", "sarah123", False),
-            ("mike_analyst", "mike123", False),
-            ("lisa_inspector", "lisa123", False),
-            ("david_tech", "david123", False),
-            ("emma_planner", "emma123", False),
-            ("tom_supervisor", "tom123", False),
-            ("kate_coordinator", "kate123", False),
-            ("alex_specialist", "alex123", False)
-        ]
-
-        for username, password, is_admin in demo_users:
-            hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            c.execute(
-                "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
-                (username, hashed, is_admin)
-            )
-
-        # Create city-based projects
-        city_projects = [
-            ("New York City Flood Prevention", "Comprehensive stormwater management for NYC boroughs"),
-            ("Miami Coastal Protection", "Climate resilience and flood control systems"),
-            ("Seattle Green Infrastructure", "Sustainable urban drainage implementation"),
-            ("Chicago Downtown Upgrade", "Modern stormwater infrastructure deployment"),
-            ("Houston Flood Control", "Post-hurricane infrastructure enhancement"),
-            ("San Francisco Bay Protection", "Bay area stormwater management"),
-            ("Boston Harbor Resilience", "Coastal infrastructure modernization"),
-            ("Denver Urban Drainage", "Mountain region water management"),
-            ("Portland Green Solutions", "Eco-friendly stormwater systems"),
-            ("Austin Water Conservation", "Integrated water management program")
-        ]
-
-        for name, description in city_projects:
-            c.execute(
-                "INSERT INTO projects (name, description, created_by, created_at) VALUES (?, ?, ?, ?)",
-                (name, description, 1, datetime.utcnow().isoformat())
-            )
-
-        # Assign users to projects with different roles
-        project_assignments = []
-        for project_id in range(1, 11):  # 10 projects
-            for user_id in range(1, 11):  # 10 users
-                if user_id % 3 == 0:  # Make some users admins
-                    project_assignments.append((user_id, project_id, "admin"))
-                else:
-                    project_assignments.append((user_id, project_id, "member"))
+    """Open the SQLite database and bring its schema up to date.
 
-        for user_id, project_id, role in project_assignments:
-            c.execute(
-                "INSERT INTO project_members (project_id, user_id, role, joined_at) VALUES (?, ?, ?, ?)",
-                (project_id, user_id, role, datetime.utcnow().isoformat())
-            )
-
-        def create_city_specific_assessment(base_template, city_name):
-            """Create city-specific assessment data"""
-            assessment = dict(base_template)
-
-            city_specifics = {
-                "San Francisco Bay Protection": {
-                    "condition": {
-                        "stormwaterHydraulicAssetCondition": {
-                            "damageLevels": {
-                                "pipes": "moderate",
-                                "culverts": "high",  # Due to seismic activity
-                                "manholes": "moderate",
-                                "drainageInlets": "high",  # Heavy rain seasons
-                                "channels": "moderate"
-                            }
-                        }
-                    },
-                    "functionality": {
-                        "hydraulicPerformance": {
-                            "flowAttenuation": 85,  # Enhanced for coastal conditions
-                            "volumeReduction": 75,
-                            "csoFrequency": 3,
-                            "drainageDurationFrequency": 18
-                        }
-                    },
-                    "environmental_social": {
-                        "pollutantConcentrationReduction": 90,  # High environmental standards
-                        "customerSatisfaction": 8.5,
-                        "pollutionRetention": 85
-                    }
-                },
-                "Denver Urban Drainage": {
-                    "condition": {
-                        "stormwaterHydraulicAssetCondition": {
-                            "damageLevels": {
-                                "pipes": "low",  # Newer infrastructure
-                                "culverts": "moderate",
-                                "manholes": "low",
-                                "drainageInlets": "moderate",  # Snow melt challenges
-                                "channels": "low"
-                            }
-                        }
-                    },
-                    "functionality": {
-                        "hydraulicPerformance": {
-                            "flowAttenuation": 80,
-                            "volumeReduction": 70,
-                            "csoFrequency": 2,
-                            "drainageDurationFrequency": 20
-                        }
-                    },
-                    "environmental_social": {
-                        "pollutantConcentrationReduction": 85,
-                        "customerSatisfaction": 8.0,
-                        "pollutionRetention": 80
-                    }
-                },
-                "Boston Harbor Resilience": {
-                    "condition": {
-                        "stormwaterHydraulicAssetCondition": {
-                            "damageLevels": {
-                                "pipes": "high",  # Aging infrastructure
-                                "culverts": "moderate",
-                                "manholes": "high",
-                                "drainageInlets": "moderate",
-                                "channels": "high"
-                            }
-                        }
-                    },
-                    "functionality": {
-                        "hydraulicPerformance": {
-                            "flowAttenuation": 70,
-                            "volumeReduction": 65,
-                            "csoFrequency": 6,
-                            "drainageDurationFrequency": 28
-                        }
-                    },
-                    "environmental_social": {
-                        "pollutantConcentrationReduction": 75,
-                        "customerSatisfaction": 7.0,
-                        "pollutionRetention": 70
-                    }
-                },
-                "Portland Green Solutions": {
-                    "condition": {
-                        "stormwaterHydraulicAssetCondition": {
-                            "damageLevels": {
-                                "pipes": "low",  # Modern green infrastructure
-                                "culverts": "low",
-                                "manholes": "moderate",
-                                "drainageInlets": "low",
-                                "channels": "low"
-                            }
-                        }
-                    },
-                    "functionality": {
-                        "hydraulicPerformance": {
-                            "flowAttenuation": 90,  # Advanced green solutions
-                            "volumeReduction": 85,
-                            "csoFrequency": 1,
-                            "drainageDurationFrequency": 16
-                        }
-                    },
-                    "environmental_social": {
-                        "pollutantConcentrationReduction": 95,  # Leading in environmental metrics
-                        "customerSatisfaction": 9.0,
-                        "pollutionRetention": 90
-                    }
-                }
-            }
-
-            if city_name in city_specifics:
-                assessment.update(city_specifics[city_name])
-
-            return assessment
-
-        # Generate sample assessment data for each project
-        sample_assessment_template = {
-            "condition": {
-                "stormwaterHydraulicAssetCondition": {
-                    "damageLevels": {
-                        "pipes": "moderate",
-                        "culverts": "low",
-                        "manholes": "high",
-                        "drainageInlets": "moderate",
-                        "channels": "low"
-                    }
-                }
-            },
-            "functionality": {
-                "hydraulicPerformance": {
-                    "flowAttenuation": 75,
-                    "volumeReduction": 65,
-                    "csoFrequency": 5,
-                    "drainageDurationFrequency": 24
-                }
-            },
-            "time_effectiveness": {
-                "lifespan": 35,
-                "maintenanceLagTime": 7,
-                "floodDuration": 12
-            },
-            "cost_effectiveness": {
-                "operationalCosts": 25000,
-                "roi": 15,
-                "constructionCosts": 150000,
-                "preliminaryCosts": 50000
-            },
-            "environmental_social": {
-                "pollutantConcentrationReduction": 80,
-                "customerSatisfaction": 8,
-                "pollutionRetention": 70
-            }
-        }
-
-        # Generate 20 assessments per project with varying data
-        for project_id in range(1, 11):
-            # Get project name for city-specific data
-            c.execute("SELECT name FROM projects WHERE id = ?", (project_id,))
-            project = c.fetchone()
-            project_name = project['name']
-
-            for i in range(20):
-                date = datetime.now() - timedelta(days=i*3)
-
-                # Create variations in the assessment data
-                assessment_data = create_city_specific_assessment(sample_assessment_template, project_name)
-
-                # Add infrastructure points with city-specific locations
-                city_coordinates = {
-                    "San Francisco Bay Protection": (37.7749, -122.4194),
-                    "Denver Urban Drainage": (39.7392, -104.9903),
-                    "Boston Harbor Resilience": (42.3601, -71.0589),
-                    "Portland Green Solutions": (45.5155, -122.6789)
-                }
-
-                base_lat, base_lon = city_coordinates.get(project_name, (40.7128, -74.0060))
-
-                assessment_data["infrastructure_points"] = [
-                    {
-                        "name": f"Location {j+1}",
-                        "type": ["pipes", "culverts", "drainageInlets", "manholes", "channels"][j % 5],
-                        "latitude": base_lat + (j * 0.01),
-                        "longitude": base_lon + (j * 0.01),
-                        "age": 5 + j + (i % 5),  # Vary age based on assessment iteration
-                        "last_maintenance_days": 30 + (j * 10) + (i % 30)  # Vary maintenance schedule
-                    } for j in range(5)
-                ]
-
-                # Save assessment
-                c.execute(
-                    "INSERT INTO assessments (user_id, project_id, timestamp, data) VALUES (?, ?, ?, ?)",
-                    (1 + (i % 10), project_id, date.isoformat(), json.dumps(assessment_data))
-                )
-
-                # Add activity log entry
-                activity_types = ["assessment", "update", "maintenance", "report"]
-                activity_details = [
-                    "Completed infrastructure assessment",
-                    "Updated risk assessment data",
-                    "Performed scheduled maintenance",
-                    "Generated detailed report"
-                ]
-                activity_index = i % 4
-
-                c.execute(
-                    "INSERT INTO activity_log (user_id, project_id, action_type, action_details, timestamp) VALUES (?, ?, ?, ?, ?)",
-                    (1 + (i % 10), project_id, activity_types[activity_index], activity_details[activity_index], date.isoformat())
-                )
-
-        conn.commit()
-        return conn
+    Existing data is kept; only pending migrations are applied, so a restart
+    against a current schema is a no-op. Missing or stale assessment scores
+    are then recomputed. Demo data is loaded separately with
+    ``python manage.py seed``. Returns the process-wide ConnectionManager.
+    """
+    try:
+        manager = ConnectionManager(DB_PATH)
+        with manager.transaction() as conn:
+            migrate(conn)
+            run_data_tasks(conn)
+        return manager
     except Exception as e:
         st.error(f"Failed to initialize database: {str(e)}")
         raise e
 
-def get_db():
-    if 'db' not in st.session_state:
-        st.session_state.db = init_database()
-    return st.session_state.db
+def read_connection():
+    """Context manager lending a read-only connection from the pool"""
+    return init_database().read()
+
+def write_transaction():
+    """Context manager yielding the write connection and committing on exit"""
+    return init_database().transaction()
 
 def create_project(name, description, created_by):
     """Create a new project"""
     try:
-        db = get_db()
-        c = db.cursor()
-        c.execute(
-            "INSERT INTO projects (name, description, created_by, created_at) VALUES (?, ?, ?, ?)",
-            (name, description, created_by, datetime.utcnow().isoformat())
-        )
-        db.commit()
+        with write_transaction() as db:
+            c = db.cursor()
+            c.execute(
+                "INSERT INTO projects (name, description, created_by, created_at) VALUES (?, ?, ?, ?)",
+                (name, description, created_by, datetime.utcnow().isoformat())
+            )
         return c.lastrowid
     except Exception as e:
         st.error(f"Failed to create project: {str(e)}")
@@ -387,110 +63,334 @@ def create_project(name, description, created_by):
 def add_project_member(project_id, user_id, role='member'):
     """Add a user to a project"""
     try:
-        db = get_db()
-        c = db.cursor()
-        c.execute(
-            "INSERT INTO project_members (project_id, user_id, role, joined_at) VALUES (?, ?, ?, ?)",
-            (project_id, user_id, role, datetime.utcnow().isoformat())
-        )
-        db.commit()
+        with write_transaction() as db:
+            db.execute(
+                "INSERT INTO project_members (project_id, user_id, role, joined_at) VALUES (?, ?, ?, ?)",
+                (project_id, user_id, role, datetime.utcnow().isoformat())
+            )
     except Exception as e:
         st.error(f"Failed to add project member: {str(e)}")
         raise e
 
+@timed('db')
 def get_user_projects(user_id):
     """Get all projects a user is a member of"""
     try:
-        db = get_db()
-        c = db.cursor()
-        c.execute("""
-            SELECT DISTINCT p.*, pm.role
-            FROM projects p
-            JOIN project_members pm ON p.id = pm.project_id
-            WHERE pm.user_id = ? AND p.status = 'active'
-            ORDER BY p.created_at DESC
-        """, (user_id,))
-        return c.fetchall()
+        with read_connection() as db:
+            c = db.cursor()
+            c.execute("""
+                SELECT DISTINCT p.*, pm.role
+                FROM projects p
+                JOIN project_members pm ON p.id = pm.project_id
+                WHERE pm.user_id = ? AND p.status = 'active'
+                ORDER BY p.created_at DESC
+            """, (user_id,))
+            return c.fetchall()
     except Exception as e:
         st.error(f"Failed to get user projects: {str(e)}")
         return []
 
+@timed('db')
 def save_assessment(data):
     """Save assessment data"""
     try:
-        db = get_db()
-        c = db.cursor()
-
         if isinstance(data['timestamp'], datetime):
             timestamp = data['timestamp'].isoformat()
         else:
             timestamp = data['timestamp']
 
-        c.execute(
-            "INSERT INTO assessments (user_id, project_id, timestamp, data) VALUES (?, ?, ?, ?)",
-            (
-                int(data['user_id']),
-                int(data['project_id']),
-                timestamp,
-                json.dumps(data, cls=DateTimeEncoder)
+        # Serialize and score before taking the write lock
+        payload = json.dumps(data, cls=DateTimeEncoder)
+
+        with write_transaction() as db:
+            c = db.cursor()
+            c.execute(
+                "INSERT INTO assessments (user_id, project_id, timestamp, data) VALUES (?, ?, ?, ?)",
+                (
+                    int(data['user_id']),
+                    int(data['project_id']),
+                    timestamp,
+                    payload
+                )
             )
-        )
-        db.commit()
-        return c.lastrowid
+            assessment_id = c.lastrowid
+            upsert_assessment_metrics(c, assessment_id, int(data['project_id']), int(data['user_id']), timestamp, data)
+            insert_points(c, int(data['project_id']), assessment_id, data.get('infrastructure_points') or [])
+        return assessment_id
     except Exception as e:
         st.error(f"Failed to save assessment: {str(e)}")
         raise e
 
-def get_assessments(user_id=None, project_id=None):
-    """Get assessments filtered by user and/or project"""
-    try:
-        db = get_db()
-        c = db.cursor()
+ASSESSMENT_COLUMNS = ('id', 'user_id', 'project_id', 'timestamp', 'data')
+
+def _assessment_filters(user_id=None, project_id=None, since=None, until=None):
+    query = " WHERE 1=1"
+    params = []
+
+    if user_id:
+        query += " AND user_id = ?"
+        params.append(user_id)
+
+    if project_id:
+        query += " AND project_id = ?"
+        params.append(project_id)
+
+    if since:
+        query += " AND timestamp > ?"
+        params.append(since.isoformat() if isinstance(since, datetime) else since)
 
-        query = "SELECT * FROM assessments WHERE 1=1"
-        params = []
+    if until:
+        query += " AND timestamp < ?"
+        params.append(until.isoformat() if isinstance(until, datetime) else until)
 
-        if user_id:
-            query += " AND user_id = ?"
-            params.append(user_id)
+    return query, params
 
-        if project_id:
-            query += " AND project_id = ?"
-            params.append(project_id)
+@timed('db')
+def get_assessments(user_id=None, project_id=None, columns=None, limit=None, offset=None,
+                    before=None, latest_only=False, since=None, until=None):
+    """Get assessments filtered by user, project and/or timestamp range, newest first.
 
-        query += " ORDER BY timestamp DESC"
-        c.execute(query, tuple(params))
-        rows = c.fetchall()
+    ``columns`` selects a subset of ASSESSMENT_COLUMNS (all by default); the
+    JSON ``data`` column is only read and parsed when requested. Pages are
+    fetched with ``limit``/``offset`` or, for deep history, with ``before`` set
+    to the ``(timestamp, id)`` of the last row already shown. With
+    ``latest_only`` the newest matching row is returned (or None) instead of a list.
+    ``since``/``until`` keep rows with timestamps strictly after/before them.
+    """
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+
+            columns = list(columns) if columns else list(ASSESSMENT_COLUMNS)
+            unknown = set(columns) - set(ASSESSMENT_COLUMNS)
+            if unknown:
+                raise ValueError(f"Unknown assessment columns: {', '.join(sorted(unknown))}")
+
+            where, params = _assessment_filters(user_id, project_id, since, until)
+            query = f"SELECT {', '.join(columns)} FROM assessments" + where
+
+            if before:
+                query += " AND (timestamp, id) < (?, ?)"
+                params.extend(before)
+
+            query += " ORDER BY timestamp DESC, id DESC"
+            if latest_only:
+                limit, offset = 1, None
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(int(limit))
+                if offset:
+                    query += " OFFSET ?"
+                    params.append(int(offset))
+
+            c.execute(query, tuple(params))
+            rows = c.fetchall()
 
         # Parse JSON data
-        for row in rows:
-            if isinstance(row['data'], str):
-                row['data'] = json.loads(row['data'])
+        with timer('json', 'utils.db.get_assessments'):
+            for row in rows:
+                if isinstance(row.get('data'), str):
+                    row['data'] = json.loads(row['data'])
 
+        if latest_only:
+            return rows[0] if rows else None
         return rows
     except Exception as e:
         st.error(f"Failed to retrieve assessments: {str(e)}")
+        return None if latest_only else []
+
+@timed('db')
+def count_assessments(user_id=None, project_id=None, since=None):
+    """Count assessments filtered by user, project and/or a minimum timestamp"""
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+            where, params = _assessment_filters(user_id, project_id, since)
+            c.execute("SELECT COUNT(*) AS count FROM assessments" + where, tuple(params))
+            return c.fetchone()['count']
+    except Exception as e:
+        st.error(f"Failed to count assessments: {str(e)}")
+        return 0
+
+@timed('db')
+def get_infrastructure_points(assessment_id=None, project_id=None, bbox=None, limit=None):
+    """Get infrastructure points, optionally restricted to a (south, west, north, east) box"""
+    try:
+        with read_connection() as db:
+            return query_points(db.cursor(), assessment_id=assessment_id, project_id=project_id, bbox=bbox, limit=limit)
+    except Exception as e:
+        st.error(f"Failed to retrieve infrastructure points: {str(e)}")
+        return []
+
+@timed('db')
+def import_infrastructure_points(project_id, source, fmt, assessment_id=None):
+    """Bulk import an inventory file into a project's infrastructure points in one transaction"""
+    try:
+        with write_transaction() as db:
+            return import_points(db.cursor(), project_id, source, fmt, assessment_id=assessment_id)
+    except Exception as e:
+        st.error(f"Failed to import infrastructure points: {str(e)}")
+        return None
+
+@timed('db')
+def count_infrastructure_points(assessment_id, bbox):
+    """Count an assessment's infrastructure points inside a (south, west, north, east) box"""
+    try:
+        with read_connection() as db:
+            return count_points(db.cursor(), assessment_id, bbox)
+    except Exception as e:
+        st.error(f"Failed to count infrastructure points: {str(e)}")
+        return 0
+
+@timed('db')
+def get_infrastructure_grid(assessment_id, bbox, cell_size):
+    """Get per-grid-cell point counts and status totals for an assessment inside a box"""
+    try:
+        with read_connection() as db:
+            return aggregate_points(db.cursor(), assessment_id, bbox, cell_size)
+    except Exception as e:
+        st.error(f"Failed to aggregate infrastructure points: {str(e)}")
+        return []
+
+@timed('db')
+def get_infrastructure_extent(assessment_id):
+    """Get the bounding box and point count of an assessment's infrastructure points"""
+    try:
+        with read_connection() as db:
+            south, west, north, east, count, last_id = points_extent(db.cursor(), assessment_id)
+            return {'south': south, 'west': west, 'north': north, 'east': east, 'count': count, 'last_id': last_id}
+    except Exception as e:
+        st.error(f"Failed to retrieve infrastructure extent: {str(e)}")
+        return {'south': None, 'west': None, 'north': None, 'east': None, 'count': 0, 'last_id': None}
+
+@timed('db')
+def refresh_project_scores(project_id):
+    """Recompute persisted scores for a project's assessments that are missing or stale.
+
+    A no-op read when every row was scored under the current domain weights.
+    Returns the number of assessments rescored.
+    """
+    try:
+        with read_connection() as db:
+            if not stale_assessment_ids(db.cursor(), project_id):
+                return 0
+        with write_transaction() as db:
+            return backfill_assessment_metrics(db.cursor(), project_id=project_id)
+    except Exception as e:
+        st.error(f"Failed to refresh assessment scores: {str(e)}")
+        return 0
+
+@timed('db')
+def get_historical_metrics(project_id):
+    """Get the per-assessment score projection for a project, oldest first"""
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+            c.execute("""
+                SELECT assessment_id, timestamp, condition_score, functionality_score,
+                       time_score, cost_score, environmental_score, overall_score
+                FROM assessment_metrics
+                WHERE project_id = ?
+                ORDER BY timestamp ASC
+            """, (project_id,))
+            return c.fetchall()
+    except Exception as e:
+        st.error(f"Failed to retrieve assessment metrics: {str(e)}")
+        return []
+
+@timed('db')
+def get_project_kpis(project_id, recent_days=30):
+    """Get assessment totals for a project's dashboard cards in a single query"""
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+            since = (datetime.now() - timedelta(days=recent_days)).isoformat()
+            c.execute("""
+                SELECT COUNT(*) AS total_assessments,
+                       COALESCE(SUM(timestamp > ?), 0) AS recent_assessments,
+                       MAX(timestamp) AS latest_timestamp
+                FROM assessment_metrics
+                WHERE project_id = ?
+            """, (since, project_id))
+            return c.fetchone()
+    except Exception as e:
+        st.error(f"Failed to retrieve project statistics: {str(e)}")
+        return {'total_assessments': 0, 'recent_assessments': 0, 'latest_timestamp': None}
+
+def flush_telemetry(force=False):
+    """Write aggregated function timings to telemetry_metrics (at most every FLUSH_INTERVAL seconds)"""
+    try:
+        return flush_telemetry_metrics(init_database(), force=force)
+    except Exception as e:
+        st.error(f"Failed to record telemetry: {str(e)}")
+        return 0
+
+def get_telemetry_metrics():
+    """Get recorded function timings, slowest average first"""
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+            c.execute("""
+                SELECT category, name, samples, sample_rate,
+                       ROUND(samples / sample_rate) AS estimated_calls,
+                       total_ms / samples AS mean_ms, max_ms, total_ms, updated_at
+                FROM telemetry_metrics
+                WHERE samples > 0
+                ORDER BY mean_ms DESC
+            """)
+            return c.fetchall()
+    except Exception as e:
+        st.error(f"Failed to retrieve telemetry metrics: {str(e)}")
+        return []
+
+def reset_telemetry_metrics():
+    """Clear recorded function timings"""
+    try:
+        with write_transaction() as db:
+            db.execute("DELETE FROM telemetry_metrics")
+    except Exception as e:
+        st.error(f"Failed to reset telemetry metrics: {str(e)}")
+        raise e
+
+@timed('db')
+def get_page_render_timings(page=None, since=None):
+    """Get recorded page renders with their phase breakdown, oldest first"""
+    try:
+        with read_connection() as db:
+            c = db.cursor()
+            query = "SELECT * FROM page_render_timings WHERE 1=1"
+            params = []
+            if page:
+                query += " AND page = ?"
+                params.append(page)
+            if since:
+                query += " AND recorded_at > ?"
+                params.append(since.isoformat() if isinstance(since, datetime) else since)
+            c.execute(query + " ORDER BY recorded_at ASC", tuple(params))
+            return c.fetchall()
+    except Exception as e:
+        st.error(f"Failed to retrieve page render timings: {str(e)}")
         return []
 
 def init_admin():
     """Initialize admin user if not exists"""
     try:
-        db = get_db()
-        c = db.cursor()
+        with read_connection() as db:
+            c = db.cursor()
 
-        c.execute("SELECT id FROM users WHERE username = ?", ("admin",))
-        admin = c.fetchone()
+            c.execute("SELECT id FROM users WHERE username = ?", ("admin",))
+            admin = c.fetchone()
 
         if not admin:
             password = "admin123"
             hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
             try:
-                c.execute(
-                    "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
-                    ("admin", hashed, True)
-                )
-                db.commit()
+                with write_transaction() as writer:
+                    writer.execute(
+                        "INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)",
+                        ("admin", hashed, True)
+                    )
                 st.success("Admin user created successfully!")
                 st.info("Username: admin, Password: admin123")
             except sqlite3.IntegrityError:
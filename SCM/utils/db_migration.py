@@ -0,0 +1,291 @@
+import sqlite3
+from datetime import datetime
+from utils.assessment_metrics import backfill_assessment_metrics
+from utils.infrastructure_points import backfill_infrastructure_points
+
+def _create_core_tables(c):
+    """Create the users, projects, membership, activity and assessment tables"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        is_admin BOOLEAN NOT NULL DEFAULT 0
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS projects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        created_by INTEGER NOT NULL,
+        created_at DATETIME NOT NULL,
+        status TEXT DEFAULT 'active',
+        FOREIGN KEY (created_by) REFERENCES users (id)
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS project_members (
+        project_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        joined_at DATETIME NOT NULL,
+        PRIMARY KEY (project_id, user_id),
+        FOREIGN KEY (project_id) REFERENCES projects (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS activity_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL,
+        action_details TEXT NOT NULL,
+        timestamp DATETIME NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''')
+
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS assessments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        project_id INTEGER NOT NULL,
+        timestamp DATETIME NOT NULL,
+        data TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''')
+
+def _create_assessment_metrics(c):
+    """Typed projection of each assessment's domain scores, indexed for dashboard queries"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS assessment_metrics (
+        assessment_id INTEGER PRIMARY KEY,
+        project_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        timestamp DATETIME NOT NULL,
+        condition_score REAL,
+        functionality_score REAL,
+        time_score REAL,
+        cost_score REAL,
+        environmental_score REAL,
+        overall_score REAL NOT NULL,
+        infrastructure_point_count INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (assessment_id) REFERENCES assessments (id),
+        FOREIGN KEY (project_id) REFERENCES projects (id)
+    )
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_assessment_metrics_project_timestamp
+    ON assessment_metrics (project_id, timestamp)
+    ''')
+    backfill_assessment_metrics(c)
+
+def _create_infrastructure_points(c):
+    """Infrastructure points table with an R*Tree index on latitude/longitude"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS infrastructure_points (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project_id INTEGER NOT NULL,
+        assessment_id INTEGER,
+        name TEXT,
+        type TEXT,
+        latitude REAL NOT NULL,
+        longitude REAL NOT NULL,
+        age INTEGER,
+        last_maintenance_days INTEGER,
+        FOREIGN KEY (project_id) REFERENCES projects (id),
+        FOREIGN KEY (assessment_id) REFERENCES assessments (id)
+    )
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_infrastructure_points_assessment
+    ON infrastructure_points (assessment_id)
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_infrastructure_points_project
+    ON infrastructure_points (project_id)
+    ''')
+    c.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS infrastructure_points_rtree
+    USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    ''')
+
+    # Keep the spatial index in step with the points table
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS infrastructure_points_rtree_insert
+    AFTER INSERT ON infrastructure_points
+    BEGIN
+        INSERT INTO infrastructure_points_rtree
+        VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS infrastructure_points_rtree_update
+    AFTER UPDATE OF latitude, longitude ON infrastructure_points
+    BEGIN
+        UPDATE infrastructure_points_rtree
+        SET min_lat = new.latitude, max_lat = new.latitude,
+            min_lon = new.longitude, max_lon = new.longitude
+        WHERE id = new.id;
+    END
+    ''')
+    c.execute('''
+    CREATE TRIGGER IF NOT EXISTS infrastructure_points_rtree_delete
+    AFTER DELETE ON infrastructure_points
+    BEGIN
+        DELETE FROM infrastructure_points_rtree WHERE id = old.id;
+    END
+    ''')
+    backfill_infrastructure_points(c)
+
+def _index_assessments_by_project(c):
+    """Serve per-project, newest-first assessment pages from an index"""
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_assessments_project_timestamp
+    ON assessments (project_id, timestamp, id)
+    ''')
+
+def _add_metric_score_versions(c):
+    """Record which content and weights each persisted score was computed from.
+
+    Existing rows are left without a weights version, so the metrics data
+    task rescores them.
+    """
+    c.execute("ALTER TABLE assessment_metrics ADD COLUMN content_hash TEXT")
+    c.execute("ALTER TABLE assessment_metrics ADD COLUMN weights_version TEXT")
+
+def _create_telemetry_metrics(c):
+    """Aggregate sampled function timings recorded by utils.telemetry"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS telemetry_metrics (
+        category TEXT NOT NULL,
+        name TEXT NOT NULL,
+        samples INTEGER NOT NULL DEFAULT 0,
+        total_ms REAL NOT NULL DEFAULT 0,
+        max_ms REAL NOT NULL DEFAULT 0,
+        sample_rate REAL NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (category, name)
+    )
+    ''')
+
+def _create_page_render_timings(c):
+    """Per-rerun page durations broken down by phase, written by utils.telemetry"""
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS page_render_timings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        page TEXT NOT NULL,
+        recorded_at TEXT NOT NULL,
+        total_ms REAL NOT NULL,
+        db_ms REAL NOT NULL DEFAULT 0,
+        json_ms REAL NOT NULL DEFAULT 0,
+        scoring_ms REAL NOT NULL DEFAULT 0,
+        plotly_ms REAL NOT NULL DEFAULT 0,
+        folium_ms REAL NOT NULL DEFAULT 0,
+        pdf_ms REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_page_render_timings_page_recorded
+    ON page_render_timings (page, recorded_at)
+    ''')
+
+def _index_project_inventory(c):
+    """Find a project's inventory points (no assessment) from an index.
+
+    Replaces the project_id index, which the new one covers.
+    """
+    c.execute('''
+    CREATE INDEX IF NOT EXISTS idx_infrastructure_points_project_assessment
+    ON infrastructure_points (project_id, assessment_id)
+    ''')
+    c.execute("DROP INDEX IF EXISTS idx_infrastructure_points_project")
+
+# Ordered list of (version, description, step). Steps are only ever appended;
+# an applied step must never be edited, add a new one instead. New steps only
+# change the schema: scores come from live scoring code, so they are filled by
+# the metrics data task (run_data_tasks, ``manage.py backfill-metrics``)
+# after migrating. The rows migration 2 writes carry no weights version and
+# are rescored by that task.
+MIGRATIONS = [
+    (1, "Create core tables", _create_core_tables),
+    (2, "Add assessment_metrics projection", _create_assessment_metrics),
+    (3, "Add infrastructure_points with R*Tree index", _create_infrastructure_points),
+    (4, "Index assessments by project and timestamp", _index_assessments_by_project),
+    (5, "Track score content hash and weights version", _add_metric_score_versions),
+    (6, "Add telemetry_metrics timings table", _create_telemetry_metrics),
+    (7, "Add page_render_timings table", _create_page_render_timings),
+    (8, "Index inventory points by project and assessment", _index_project_inventory),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _ensure_version_table(conn):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at DATETIME NOT NULL
+    )
+    ''')
+
+def get_schema_version(conn):
+    """Return the highest applied migration version (0 for a new database)"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    if isinstance(row, dict):
+        row = list(row.values())
+    return row[0] or 0
+
+def run_data_tasks(conn):
+    """Rescore assessments whose metrics are missing or stale and return how many were written.
+
+    A no-op read when every row is current, so it is safe to run after every migrate.
+    """
+    try:
+        written = backfill_assessment_metrics(conn.cursor())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return written
+
+def migrate(conn):
+    """Apply any pending migrations and return the list of versions applied.
+
+    Each step runs in its own transaction together with its schema_version
+    row, so a failed step leaves the database at the previous version.
+    """
+    current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        return []
+
+    _ensure_version_table(conn)
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN")
+            step(c)
+            c.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.utcnow().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -2,19 +2,37 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-import io
 import base64
+import hashlib
+import logging
 from datetime import datetime
 import streamlit as st
 import os
+import tempfile
 import xml.etree.ElementTree as ET
 from svglib.svglib import svg2rlg
 from reportlab.graphics import renderPM
+from utils.telemetry import timed
+from utils.files import atomic_output, spooled_file
 
-def generate_user_manual():
-    """Generate a comprehensive user manual PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+logger = logging.getLogger(__name__)
+
+# Architecture diagram embedded in the manual
+MANUAL_SVG_PATH = "doc_assets/system_architecture.svg"
+
+# Prebuilt manuals are written here, one file per source key
+MANUAL_BUILD_DIR = os.environ.get('STORMWATER_MANUAL_DIR', os.path.join('temp', 'manual'))
+
+# The manual text lives in this module, so its bytes stand in for the text sources
+with open(__file__, 'rb') as _source:
+    _SOURCE_DIGEST = hashlib.sha1(_source.read()).hexdigest()
+
+@timed('pdf')
+def generate_user_manual(output=None):
+    """Write the user manual PDF to ``output`` (a spooled temp file by default); returns it rewound"""
+    if output is None:
+        output = spooled_file()
+    doc = SimpleDocTemplate(output, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
 
@@ -340,7 +358,7 @@ def generate_user_manual():
     # Add architectural diagram
     try:
         # Convert SVG to ReportLab drawing
-        svg_path = "doc_assets/system_architecture.svg"
+        svg_path = MANUAL_SVG_PATH
         if os.path.exists(svg_path):
             story.append(Paragraph("System Architecture Diagram:", styles["Heading2"]))
             drawing = svg2rlg(svg_path)
@@ -398,8 +416,37 @@ def generate_user_manual():
 
     # Build the PDF
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    output.seek(0)
+    return output
+
+def manual_source_key():
+    """Hash of the manual text and the architecture SVG's modification time and size"""
+    digest = hashlib.sha1(_SOURCE_DIGEST.encode('utf-8'))
+    if os.path.exists(MANUAL_SVG_PATH):
+        stat = os.stat(MANUAL_SVG_PATH)
+        digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def manual_artifact_path(source_key=None):
+    """Path of the prebuilt manual PDF for a source key (the current sources by default)"""
+    return os.path.join(MANUAL_BUILD_DIR, f"user_manual_{source_key or manual_source_key()}.pdf")
+
+def build_user_manual(force=False, path=None):
+    """Write the manual PDF for the current sources unless it already exists; returns its path"""
+    path = path or manual_artifact_path()
+    if force or not os.path.exists(path):
+        with atomic_output(path) as f:
+            generate_user_manual(output=f)
+    return path
+
+def get_user_manual():
+    """Return the path of the user manual PDF, built at most once per version of its sources"""
+    try:
+        return build_user_manual()
+    except OSError as e:
+        # Fall back to the system temp directory when the build directory is read-only
+        logger.warning("Could not write prebuilt user manual to %s: %s", MANUAL_BUILD_DIR, e)
+        return build_user_manual(path=os.path.join(tempfile.gettempdir(), os.path.basename(manual_artifact_path())))
 
 def add_documentation_download():
     """Add a download button for the user manual in the documentation view"""
@@ -407,10 +454,11 @@ def add_documentation_download():
         st.markdown("---")
         st.subheader("Documentation")
         
-        user_manual = generate_user_manual()
-        st.download_button(
+        # Imported here so utils modules do not load components at import time
+        from components.downloads import show_file_download
+        show_file_download(
+            get_user_manual(),
             label="📚 Download User Manual (PDF)",
-            data=user_manual,
             file_name=f"stormwater_assessment_manual_{datetime.now().strftime('%Y%m%d')}.pdf",
             mime="application/pdf",
             help="Download a comprehensive user manual with detailed instructions and technical documentation",
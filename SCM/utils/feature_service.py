@@ -0,0 +1,328 @@
+"""Local HTTP service answering map layers as bounding-box filtered GeoJSON.
+
+Maps that use it fetch only the features inside the current viewport
+instead of embedding every point in the page:
+
+    GET /assessments/<id>/infrastructure.geojson?bbox=<west>,<south>,<east>,<north>
+
+Viewports holding more than FEATURE_LIMIT points are answered with one
+feature per occupied grid cell, as the dashboard viewport map does. Every
+response carries a strong ETag so browsers revalidate cached layers with
+If-None-Match and get an empty 304 when nothing changed.
+
+Run it next to Streamlit with ``python manage.py serve-features`` and point
+the app at it with STORMWATER_FEATURE_SERVICE_URL.
+
+The service has no login of its own. Layer requests must carry a token
+that the app signs for one assessment with STORMWATER_FEATURE_SERVICE_SECRET
+(shared by the app and the service) and that expires after a few hours.
+Only the app's origin (STORMWATER_FEATURE_SERVICE_ORIGIN) is allowed by
+CORS. The server refuses to start without a secret; do not expose it
+through a proxy that strips the token check or widens the allowed origin.
+
+The same server streams finished reports, exports and the user manual from
+disk under ``/files/<area>/<name>``, with tokens signed for one file, so
+large downloads never pass through Streamlit's in-memory media store.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import math
+import mimetypes
+import os
+import re
+import shutil
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+
+from utils.connection import ConnectionManager
+from utils.infrastructure_points import (
+    aggregate_points,
+    cell_status,
+    count_points,
+    point_status,
+    points_extent,
+    query_points
+)
+
+logger = logging.getLogger(__name__)
+
+# Base URL browsers use to reach the service; maps embed layers inline when unset
+FEATURE_SERVICE_URL = os.environ.get('STORMWATER_FEATURE_SERVICE_URL')
+FEATURE_SERVICE_HOST = os.environ.get('STORMWATER_FEATURE_SERVICE_HOST', '127.0.0.1')
+FEATURE_SERVICE_PORT = int(os.environ.get('STORMWATER_FEATURE_SERVICE_PORT', 8502))
+# Key the app signs layer tokens with; the service does not start without it
+FEATURE_SERVICE_SECRET = os.environ.get('STORMWATER_FEATURE_SERVICE_SECRET')
+# Origin of the Streamlit app, the only one allowed to read layers cross-origin
+FEATURE_SERVICE_ORIGIN = os.environ.get('STORMWATER_FEATURE_SERVICE_ORIGIN', 'http://localhost:8501')
+# Seconds a layer token stays valid; tokens are issued per window so reruns reuse the same URL
+FEATURE_TOKEN_TTL = 4 * 3600
+
+# Viewports with more points than this are answered with aggregated grid cells
+FEATURE_LIMIT = 500
+# Grid cells per side of the requested box when points are aggregated
+GRID_CELLS_PER_SIDE = 16
+
+_LAYER_PATH = re.compile(r'^/assessments/(\d+)/infrastructure(?:\.geojson)?$')
+_FILE_PATH = re.compile(r'^/files/(\w+)/([\w.-]+)$')
+
+# Bytes copied per write when streaming a file download
+FILE_CHUNK_SIZE = 1024 * 1024
+
+def _token_signature(subject, expires, secret):
+    message = f"{subject}:{int(expires)}".encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+def _sign_token(subject, secret, ttl, now):
+    secret = secret or FEATURE_SERVICE_SECRET
+    if not secret:
+        raise ValueError("STORMWATER_FEATURE_SERVICE_SECRET is not set")
+    now = time.time() if now is None else now
+    expires = (int(now) // ttl + 2) * ttl
+    return f"{expires}.{_token_signature(subject, expires, secret)}"
+
+def _verify_token(token, subject, secret, now):
+    try:
+        expires, signature = token.split('.', 1)
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return False
+    if expires < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(signature, _token_signature(subject, expires, secret))
+
+def _file_subject(area, name):
+    # Layer subjects are bare assessment ids, so file tokens can never pass as layer tokens
+    return f"file:{area}/{name}"
+
+def sign_layer_token(assessment_id, secret=None, ttl=FEATURE_TOKEN_TTL, now=None):
+    """Token granting read access to one assessment's layer for between ``ttl`` and ``2 * ttl`` seconds"""
+    return _sign_token(int(assessment_id), secret, ttl, now)
+
+def verify_layer_token(token, assessment_id, secret, now=None):
+    """Whether ``token`` was signed with ``secret`` for ``assessment_id`` and has not expired"""
+    return _verify_token(token, int(assessment_id), secret, now)
+
+def sign_file_token(area, name, secret=None, ttl=FEATURE_TOKEN_TTL, now=None):
+    """Token granting download of one file of a download area, like sign_layer_token"""
+    return _sign_token(_file_subject(area, name), secret, ttl, now)
+
+def verify_file_token(token, area, name, secret, now=None):
+    """Whether ``token`` was signed with ``secret`` for file ``name`` of ``area`` and has not expired"""
+    return _verify_token(token, _file_subject(area, name), secret, now)
+
+def feature_layer_url(assessment_id, base_url=None, secret=None):
+    """Signed URL of an assessment's infrastructure layer on the feature service"""
+    token = sign_layer_token(assessment_id, secret)
+    base_url = (base_url or FEATURE_SERVICE_URL).rstrip('/')
+    return f"{base_url}/assessments/{int(assessment_id)}/infrastructure.geojson?token={token}"
+
+def download_dirs():
+    """Directories the server streams files from, by the area name used in file URLs"""
+    from utils.documentation_generator import MANUAL_BUILD_DIR
+    from utils.report import REPORT_CACHE_DIR
+    from utils.report_export import EXPORT_DIR
+    return {'reports': REPORT_CACHE_DIR, 'exports': EXPORT_DIR, 'manual': MANUAL_BUILD_DIR}
+
+def file_download_url(path, download_name, base_url=None, secret=None, dirs=None):
+    """Signed URL streaming ``path`` from the feature service as ``download_name``.
+
+    Returns None when the service is not configured or ``path`` is not
+    directly inside one of the download directories.
+    """
+    base_url = base_url or FEATURE_SERVICE_URL
+    if not base_url or not (secret or FEATURE_SERVICE_SECRET):
+        return None
+    directory, name = os.path.split(os.path.realpath(path))
+    for area, area_dir in (dirs or download_dirs()).items():
+        if os.path.realpath(area_dir) == directory and _FILE_PATH.match(f"/files/{area}/{name}"):
+            token = sign_file_token(area, name, secret)
+            return (f"{base_url.rstrip('/')}/files/{area}/{name}"
+                    f"?token={token}&filename={quote(download_name)}")
+    return None
+
+def parse_bbox(value):
+    """Parse a GeoJSON-order ``west,south,east,north`` string into (south, west, north, east)"""
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be four numbers: west,south,east,north")
+    if not all(math.isfinite(v) for v in (west, south, east, north)):
+        raise ValueError("bbox must be four numbers: west,south,east,north")
+    if south > north or west > east:
+        raise ValueError("bbox must have west <= east and south <= north")
+    return south, west, north, east
+
+def _point_feature(point):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [point['longitude'], point['latitude']]},
+        'properties': {
+            'id': point['id'],
+            'name': point['name'],
+            'type': point['type'],
+            'age': point['age'],
+            'last_maintenance_days': point['last_maintenance_days'],
+            'status': point_status(point['age'], point['last_maintenance_days'])
+        }
+    }
+
+def _cell_feature(cell):
+    count, critical, warning = cell['count'], cell['critical'] or 0, cell['warning'] or 0
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [cell['longitude'], cell['latitude']]},
+        'properties': {
+            'count': count,
+            'critical': critical,
+            'warning': warning,
+            'status': cell_status(count, critical, warning)
+        }
+    }
+
+def feature_collection(c, assessment_id, bbox=None):
+    """GeoJSON FeatureCollection of an assessment's points inside ``bbox`` (south, west, north, east).
+
+    Without a box the assessment's whole extent is used. Above FEATURE_LIMIT
+    points the features are grid cells with ``count``, ``critical`` and
+    ``warning`` properties instead of individual points.
+    """
+    if bbox is None:
+        south, west, north, east, count, _ = points_extent(c, assessment_id)
+        if not count:
+            return {'type': 'FeatureCollection', 'features': [], 'properties': {'count': 0, 'aggregated': False}}
+        bbox = (south, west, north, east)
+
+    count = count_points(c, assessment_id, bbox)
+    aggregated = count > FEATURE_LIMIT
+    if aggregated:
+        cell_size = max(bbox[2] - bbox[0], bbox[3] - bbox[1]) / GRID_CELLS_PER_SIDE or 1e-9
+        features = [_cell_feature(cell) for cell in aggregate_points(c, assessment_id, bbox, cell_size)]
+    else:
+        features = [_point_feature(point) for point in query_points(c, assessment_id=assessment_id, bbox=bbox)]
+    return {'type': 'FeatureCollection', 'features': features, 'properties': {'count': count, 'aggregated': aggregated}}
+
+def encode_layer(collection):
+    """Serialize a FeatureCollection and return ``(body, etag)``"""
+    body = json.dumps(collection, separators=(',', ':')).encode('utf-8')
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+class FeatureRequestHandler(BaseHTTPRequestHandler):
+    """Answer layer requests with connections from the server's ConnectionManager pool"""
+
+    server_version = "StormwaterFeatures/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+            return
+
+        match = _LAYER_PATH.match(url.path)
+        if not match:
+            file_match = _FILE_PATH.match(url.path)
+            if file_match:
+                self._send_file(file_match.group(1), file_match.group(2), parse_qs(url.query))
+            else:
+                self._send_json(404, {'error': 'Not found'})
+            return
+
+        query = parse_qs(url.query)
+        assessment_id = int(match.group(1))
+        if not verify_layer_token(query.get('token', [None])[0], assessment_id, self.server.secret):
+            self._send_json(403, {'error': 'Missing, invalid or expired layer token'})
+            return
+
+        try:
+            bbox = parse_bbox(query['bbox'][0]) if 'bbox' in query else None
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            with self.server.connections.read() as conn:
+                collection = feature_collection(conn.cursor(), assessment_id, bbox)
+            body, etag = encode_layer(collection)
+        except Exception as e:
+            logger.exception("Failed to build layer for %s", self.path)
+            self._send_json(500, {'error': f"Failed to build layer: {str(e)}"})
+            return
+
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/geo+json')
+        self.send_header('Content-Length', str(len(body)))
+        self._send_cache_headers(etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, area, name, query):
+        if not verify_file_token(query.get('token', [None])[0], area, name, self.server.secret):
+            self._send_json(403, {'error': 'Missing, invalid or expired file token'})
+            return
+        directory = self.server.download_dirs.get(area)
+        path = os.path.join(directory, name) if directory else None
+        if path is None or not os.path.isfile(path):
+            self._send_json(404, {'error': 'File not found or expired'})
+            return
+
+        # Only the name is used from the query; anything that could split the header is dropped
+        download_name = re.sub(r'[^\w. ()-]', '_', query.get('filename', [name])[0]) or name
+        with open(path, 'rb') as f:
+            self.send_response(200)
+            self.send_header('Content-Type', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            self.send_header('Content-Disposition', f'attachment; filename="{download_name}"')
+            self.send_header('Cache-Control', 'private, no-store')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, FILE_CHUNK_SIZE)
+
+    def _send_cache_headers(self, etag):
+        # Browsers keep the layer but revalidate it with If-None-Match before reuse
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors_headers()
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+    def _send_cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', self.server.origin)
+        self.send_header('Vary', 'Origin')
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+def create_server(db_path, host=FEATURE_SERVICE_HOST, port=FEATURE_SERVICE_PORT, secret=None, origin=None,
+                  dirs=None):
+    """Create a threaded feature server reading from the SQLite database at ``db_path``.
+
+    Layer and file requests must carry a token signed with ``secret``
+    (default FEATURE_SERVICE_SECRET), and CORS only admits ``origin``
+    (default FEATURE_SERVICE_ORIGIN). Files are served from ``dirs``
+    (default download_dirs()).
+    """
+    secret = secret or FEATURE_SERVICE_SECRET
+    if not secret:
+        raise ValueError("Set STORMWATER_FEATURE_SERVICE_SECRET before serving map layers")
+    server = ThreadingHTTPServer((host, port), FeatureRequestHandler)
+    server.daemon_threads = True
+    server.secret = secret
+    server.origin = origin or FEATURE_SERVICE_ORIGIN
+    server.download_dirs = dirs if dirs is not None else download_dirs()
+    server.connections = ConnectionManager(db_path)
+    return server
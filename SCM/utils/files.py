@@ -0,0 +1,58 @@
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+# Generated files are spooled here once they outgrow SPOOL_MAX_MEMORY bytes
+SPOOL_DIR = os.environ.get('STORMWATER_SPOOL_DIR', os.path.join('temp', 'spool'))
+SPOOL_MAX_MEMORY = int(os.environ.get('STORMWATER_SPOOL_MAX_BYTES', 4 * 1024 * 1024))
+
+def spooled_file():
+    """Binary temp file kept in memory up to SPOOL_MAX_MEMORY bytes, then moved to SPOOL_DIR"""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode='w+b', dir=SPOOL_DIR)
+
+@contextmanager
+def atomic_output(path):
+    """Yield a binary file that replaces ``path`` on success, so readers never see a partial file"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@contextmanager
+def atomic_path(path):
+    """Yield a temporary path next to ``path`` that replaces it on success, for writers that need a file name.
+
+    The temporary name keeps the extension of ``path``, which some writers
+    (e.g. GDAL drivers) use to decide the output layout.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_bytes(path, data):
+    """Write ``data`` to ``path`` via a temporary file so readers never see a partial file"""
+    with atomic_output(path) as f:
+        f.write(data)
+
+def slugify(text, default='file'):
+    """Lower-case ``text`` with runs of other characters replaced by underscores, for file names"""
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_').lower() or default
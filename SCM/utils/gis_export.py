@@ -0,0 +1,88 @@
+"""Export infrastructure point layers as GeoJSON, GeoParquet or FlatGeobuf files.
+
+GeoJSON is streamed to disk a chunk of features at a time instead of being
+serialized to one string. GeoParquet and FlatGeobuf are binary, several
+times smaller and load much faster in GIS tools; FlatGeobuf files include a
+spatial index. Exports are written atomically under EXPORT_DIR and removed
+with the report exports after EXPORT_RETENTION seconds.
+"""
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from utils.files import atomic_output, atomic_path, slugify
+from utils.gis_layers import points_to_geodataframe
+from utils.report_export import EXPORT_DIR, remove_expired_exports
+
+logger = logging.getLogger(__name__)
+
+# Format -> (file extension, MIME type, label)
+LAYER_EXPORT_FORMATS = {
+    'geojson': ('.geojson', 'application/geo+json', 'GeoJSON'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet', 'GeoParquet'),
+    'fgb': ('.fgb', 'application/octet-stream', 'FlatGeobuf')
+}
+
+# Features serialized per write when streaming GeoJSON
+GEOJSON_CHUNK_ROWS = 5000
+
+def _geojson_chunks(gdf, chunk_rows=GEOJSON_CHUNK_ROWS):
+    """Yield encoded GeoJSON Point features of ``gdf``, ``chunk_rows`` at a time"""
+    columns = [col for col in gdf.columns if col != gdf.geometry.name]
+    for start in range(0, len(gdf), chunk_rows):
+        chunk = gdf.iloc[start:start + chunk_rows]
+        properties = chunk[columns]
+        properties = properties.astype(object).where(properties.notna(), None).to_dict('records')
+        coordinates = np.column_stack([chunk.geometry.x, chunk.geometry.y]).tolist()
+        features = [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': xy}, 'properties': props}
+            for xy, props in zip(coordinates, properties)
+        ]
+        # One dumps call per chunk; strip the list brackets to splice chunks together
+        yield json.dumps(features)[1:-1].encode('utf-8')
+
+def write_geojson(gdf, f, chunk_rows=GEOJSON_CHUNK_ROWS):
+    """Stream a point GeoDataFrame to the binary file ``f`` as a GeoJSON FeatureCollection"""
+    f.write(b'{"type": "FeatureCollection", "features": [\n')
+    first = True
+    for chunk in _geojson_chunks(gdf, chunk_rows):
+        if not first:
+            f.write(b',\n')
+        f.write(chunk)
+        first = False
+    f.write(b'\n]}\n')
+
+def write_layer(gdf, path, fmt='geojson'):
+    """Write a point GeoDataFrame to ``path`` in ``fmt``, replacing any existing file atomically"""
+    if fmt not in LAYER_EXPORT_FORMATS:
+        raise ValueError(f"Unknown layer export format: {fmt}")
+    if fmt == 'geojson':
+        with atomic_output(path) as f:
+            write_geojson(gdf, f)
+    else:
+        with atomic_path(path) as tmp_path:
+            if fmt == 'parquet':
+                gdf.to_parquet(tmp_path)
+            else:
+                gdf.to_file(tmp_path, driver='FlatGeobuf', engine='pyogrio')
+    return path
+
+def export_path(name, fmt):
+    """New path under EXPORT_DIR for an export of ``name`` in ``fmt``"""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(EXPORT_DIR, f"{slugify(name, 'layer')}_{stamp}_{uuid.uuid4().hex[:8]}{LAYER_EXPORT_FORMATS[fmt][0]}")
+
+def export_layer(gdf, name, fmt='geojson'):
+    """Export a point GeoDataFrame to a new file under EXPORT_DIR and return its path"""
+    remove_expired_exports()
+    path = write_layer(gdf, export_path(name, fmt), fmt)
+    logger.info("Exported %s features of %s as %s", len(gdf), name, fmt)
+    return path
+
+def export_points(points, name, fmt='geojson'):
+    """Export point dicts (e.g. every layer of a project, with their assessment_id) as one file"""
+    return export_layer(points_to_geodataframe(points), name, fmt)
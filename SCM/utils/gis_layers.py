@@ -0,0 +1,169 @@
+"""Process-wide cache of infrastructure point layers as GeoDataFrames.
+
+Layers are keyed by assessment id and a hash of their points, so reruns and
+other sessions viewing the same assessment reuse one GeoDataFrame instead of
+rebuilding geometries. Each cached layer is in GIS_CRS with its spatial
+index built; a projected copy in metres for distance and area math is built
+on first use. The cache is an LRU bounded by the estimated size of its layers.
+Cached GeoDataFrames are shared, so callers must not modify them in place.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely import STRtree
+
+logger = logging.getLogger(__name__)
+
+# Coordinates of stored points are WGS 84 longitude/latitude
+GIS_CRS = "EPSG:4326"
+
+# Estimated size of cached layers; least recently used layers are evicted first
+LAYER_CACHE_MAX_BYTES = int(os.environ.get('STORMWATER_GIS_LAYER_CACHE_BYTES', 256 * 1024 * 1024))
+# GEOS allocations are invisible to pandas memory_usage; approximate bytes per
+# point geometry including its spatial index entry
+GEOMETRY_BYTES = 160
+
+def points_digest(points):
+    """Hash of a list of point dicts; a different key order only costs a cache miss"""
+    return hashlib.sha1(pickle.dumps(points, protocol=4)).hexdigest()
+
+def points_to_geodataframe(points):
+    """Build a GIS_CRS GeoDataFrame from point dicts, skipping points without coordinates"""
+    df = pd.DataFrame(points)
+    if df.empty or 'latitude' not in df or 'longitude' not in df:
+        return gpd.GeoDataFrame(df.iloc[0:0], geometry=gpd.GeoSeries([], crs=GIS_CRS))
+    df = df[df['latitude'].notna() & df['longitude'].notna()].reset_index(drop=True)
+    return gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df['longitude'], df['latitude']), crs=GIS_CRS)
+
+def _frame_bytes(gdf):
+    return int(gdf.drop(columns=gdf.geometry.name).memory_usage(deep=True).sum()) + len(gdf) * GEOMETRY_BYTES
+
+class GisLayer:
+    """A point layer in GIS_CRS with its spatial index, and a lazily built projected copy"""
+
+    def __init__(self, gdf):
+        self.gdf = gdf
+        # Build the STRtree now so every reader shares it
+        self.gdf.sindex
+        self._projected = None
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def projected(self):
+        """Copy of the layer in its local UTM zone (metres), with its spatial index built"""
+        with self._lock:
+            if self._projected is None:
+                crs = self.gdf.estimate_utm_crs() if len(self.gdf) else "EPSG:3857"
+                projected = self.gdf.to_crs(crs)
+                projected.sindex
+                self._projected = projected
+            return self._projected
+
+    def projected_index(self, types=None):
+        """``(positions, STRtree)`` over the projected points of ``types``, or of every point when None.
+
+        ``positions`` maps tree indices back to rows of ``gdf``. Trees are
+        built once per set of types and kept with the layer.
+        """
+        key = tuple(sorted(types)) if types else None
+        with self._lock:
+            cached = self._trees.get(key)
+        if cached is None:
+            geometries = self.projected().geometry.values
+            if key is None:
+                positions = np.arange(len(geometries))
+            elif 'type' in self.gdf:
+                positions = np.flatnonzero(self.gdf['type'].isin(key).to_numpy())
+            else:
+                positions = np.arange(0)
+            cached = (positions, STRtree(np.asarray(geometries[positions])))
+            with self._lock:
+                self._trees[key] = cached
+        return cached
+
+    @property
+    def has_projected(self):
+        return self._projected is not None
+
+    @property
+    def nbytes(self):
+        size = _frame_bytes(self.gdf)
+        if self._projected is not None:
+            size += len(self._projected) * GEOMETRY_BYTES
+        return size
+
+class LayerCache:
+    """Thread-safe LRU of GisLayers bounded by their estimated size in bytes"""
+
+    def __init__(self, max_bytes=LAYER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, layer):
+        """Store ``layer`` under ``key``, or re-account its size if it is already stored"""
+        size = layer.nbytes
+        if size > self.max_bytes:
+            logger.info("GIS layer %s (%s bytes) exceeds the layer cache budget", key, size)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (layer, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.size, 'hits': self.hits, 'misses': self.misses}
+
+layer_cache = LayerCache()
+
+def get_layer(points, assessment_id=None, projected=False, digest=None):
+    """Return the cached GisLayer for ``points``, building it on a miss.
+
+    Keyed by ``(assessment_id, digest)``; the digest of ``points`` is
+    computed when not given. With ``projected`` the projected copy is built
+    too and counted against the cache budget.
+    """
+    if digest is None:
+        digest = points_digest(points)
+    key = (assessment_id, digest)
+    layer = layer_cache.get(key)
+    if layer is None:
+        layer = GisLayer(points_to_geodataframe(points))
+        if projected:
+            layer.projected()
+        layer_cache.put(key, layer)
+    elif projected and not layer.has_projected:
+        layer.projected()
+        layer_cache.put(key, layer)
+    return layer
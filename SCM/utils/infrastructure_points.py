@@ -0,0 +1,183 @@
+import json
+
+# Columns of infrastructure_points copied from each point dict, in insert order
+POINT_COLUMNS = ['name', 'type', 'latitude', 'longitude', 'age', 'last_maintenance_days']
+
+# Infrastructure types offered by the assessment form and accepted by imports
+POINT_TYPES = [
+    "pipes", "culverts", "drainageInlets", "manholes",
+    "channels", "outfalls", "bioRetentionBasins"
+]
+
+# Status thresholds: a point is critical (red) past either critical limit and
+# needs attention (orange) past either warning limit
+CRITICAL_AGE = 20
+CRITICAL_MAINTENANCE_DAYS = 365
+WARNING_AGE = 10
+WARNING_MAINTENANCE_DAYS = 180
+
+_CRITICAL_SQL = f"(COALESCE(p.age, 0) > {CRITICAL_AGE} OR COALESCE(p.last_maintenance_days, 0) > {CRITICAL_MAINTENANCE_DAYS})"
+_WARNING_SQL = f"(COALESCE(p.age, 0) > {WARNING_AGE} OR COALESCE(p.last_maintenance_days, 0) > {WARNING_MAINTENANCE_DAYS})"
+
+def point_status(age, maintenance_days):
+    """Status colour of a point: 'red', 'orange' or 'green'"""
+    age = age or 0
+    maintenance_days = maintenance_days or 0
+    if age > CRITICAL_AGE or maintenance_days > CRITICAL_MAINTENANCE_DAYS:
+        return 'red'
+    if age > WARNING_AGE or maintenance_days > WARNING_MAINTENANCE_DAYS:
+        return 'orange'
+    return 'green'
+
+def cell_status(count, critical, warning):
+    """Colour of a grid cell: red when most of its points are critical, orange when most need attention"""
+    if 2 * critical >= count:
+        return 'red'
+    if 2 * (critical + warning) >= count:
+        return 'orange'
+    return 'green'
+
+def _point_row(project_id, assessment_id, point):
+    return (project_id, assessment_id) + tuple(point.get(col) for col in POINT_COLUMNS)
+
+_INSERT_POINT_SQL = "INSERT INTO infrastructure_points (project_id, assessment_id, {}) VALUES (?, ?, {})".format(
+    ', '.join(POINT_COLUMNS), ', '.join('?' * len(POINT_COLUMNS))
+)
+
+def insert_points(c, project_id, assessment_id, points):
+    """Insert point dicts for a project (and optionally an assessment) using cursor ``c``.
+
+    The R*Tree index is maintained by triggers on infrastructure_points.
+    """
+    c.executemany(
+        _INSERT_POINT_SQL,
+        [_point_row(project_id, assessment_id, point) for point in points
+         if point.get('latitude') is not None and point.get('longitude') is not None]
+    )
+
+def insert_point_rows(c, project_id, assessment_id, rows):
+    """Insert tuples of POINT_COLUMNS values for a project (and optionally an assessment) using cursor ``c``"""
+    c.executemany(_INSERT_POINT_SQL, ((project_id, assessment_id) + tuple(row) for row in rows))
+
+def backfill_infrastructure_points(c):
+    """Copy points out of assessment JSON for assessments that have none in the table.
+
+    The caller commits. Returns the number of assessments processed.
+    """
+    c.execute("""
+        SELECT a.id, a.project_id, a.data
+        FROM assessments a
+        WHERE NOT EXISTS (SELECT 1 FROM infrastructure_points p WHERE p.assessment_id = a.id)
+        ORDER BY a.id
+    """)
+    rows = c.fetchall()
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row['id'], row['project_id'], row['data'])
+        assessment_id, project_id, data = row
+        points = json.loads(data).get('infrastructure_points') or []
+        insert_points(c, project_id, assessment_id, points)
+    return len(rows)
+
+# An assessment's points are its own plus its project's inventory: points
+# imported for the project as a whole, with no assessment. Both branches are
+# answered by an index (assessment_id, and project_id + assessment_id).
+_ASSESSMENT_SCOPE_SQL = "(p.assessment_id = ? OR (p.project_id = ? AND p.assessment_id IS NULL))"
+
+def _scope_params(c, assessment_id):
+    c.execute("SELECT project_id FROM assessments WHERE id = ?", (assessment_id,))
+    row = c.fetchone()
+    project_id = None if row is None else (row['project_id'] if isinstance(row, dict) else row[0])
+    return [assessment_id, project_id]
+
+# The R*Tree keeps float32 bounds rounded outwards, so strict containment
+# can drop points lying on the box edge. Select index boxes that overlap the
+# query, then apply the exact test to the stored coordinates.
+_BBOX_SQL = """
+    FROM infrastructure_points_rtree r
+    CROSS JOIN infrastructure_points p ON p.id = r.id
+    WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+      AND p.latitude BETWEEN ? AND ? AND p.longitude BETWEEN ? AND ?
+"""
+
+def _bbox_params(bbox):
+    south, west, north, east = bbox
+    return [south, north, west, east] * 2
+
+def _bbox_filter(c, assessment_id, bbox):
+    return _BBOX_SQL + f"  AND {_ASSESSMENT_SCOPE_SQL}\n", _bbox_params(bbox) + _scope_params(c, assessment_id)
+
+def count_points(c, assessment_id, bbox):
+    """Number of an assessment's points inside ``bbox``"""
+    where, params = _bbox_filter(c, assessment_id, bbox)
+    c.execute("SELECT COUNT(*) " + where, tuple(params))
+    row = c.fetchone()
+    return tuple(row.values())[0] if isinstance(row, dict) else row[0]
+
+def aggregate_points(c, assessment_id, bbox, cell_size):
+    """Group an assessment's points inside ``bbox`` into square grid cells of ``cell_size`` degrees.
+
+    Returns one row per occupied cell with its point count, mean latitude and
+    longitude, and the number of critical and warning points (see point_status).
+    """
+    where, params = _bbox_filter(c, assessment_id, bbox)
+    south, west = bbox[0], bbox[1]
+    c.execute(f"""
+        SELECT CAST((p.latitude - ?) / ? AS INTEGER) AS cell_row,
+               CAST((p.longitude - ?) / ? AS INTEGER) AS cell_col,
+               COUNT(*) AS count,
+               AVG(p.latitude) AS latitude,
+               AVG(p.longitude) AS longitude,
+               SUM({_CRITICAL_SQL}) AS critical,
+               SUM(NOT {_CRITICAL_SQL} AND {_WARNING_SQL}) AS warning
+        {where}
+        GROUP BY cell_row, cell_col
+    """, tuple([south, cell_size, west, cell_size] + params))
+    return c.fetchall()
+
+def query_points(c, assessment_id=None, project_id=None, bbox=None, limit=None):
+    """Select points by assessment and/or project, optionally inside a bounding box.
+
+    An assessment's points include its project's inventory (see
+    _ASSESSMENT_SCOPE_SQL). ``bbox`` is ``(south, west, north, east)`` in degrees and is answered by
+    the infrastructure_points_rtree index.
+    """
+    columns = ', '.join(f'p.{col}' for col in ['id', 'project_id', 'assessment_id'] + POINT_COLUMNS)
+    params = []
+    if bbox is not None:
+        query = f"SELECT {columns}" + _BBOX_SQL
+        params.extend(_bbox_params(bbox))
+    else:
+        query = f"SELECT {columns} FROM infrastructure_points p WHERE 1=1"
+
+    if assessment_id is not None:
+        query += f" AND {_ASSESSMENT_SCOPE_SQL}"
+        params.extend(_scope_params(c, assessment_id))
+    if project_id is not None:
+        query += " AND p.project_id = ?"
+        params.append(project_id)
+
+    query += " ORDER BY p.id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+
+    c.execute(query, tuple(params))
+    return c.fetchall()
+
+def points_extent(c, assessment_id):
+    """Return ``(south, west, north, east, count, last_id)`` for an assessment's points, inventory included.
+
+    Point ids are never reused, so ``(count, last_id)`` changes whenever
+    points are added or replaced.
+    """
+    params = tuple(_scope_params(c, assessment_id))
+    c.execute(f"""
+        SELECT MIN(p.latitude), MIN(p.longitude), MAX(p.latitude), MAX(p.longitude), COUNT(*), MAX(p.id)
+        FROM infrastructure_points p
+        WHERE {_ASSESSMENT_SCOPE_SQL}
+    """, params)
+    row = c.fetchone()
+    if isinstance(row, dict):
+        row = tuple(row.values())
+    return row
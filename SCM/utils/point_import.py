@@ -0,0 +1,214 @@
+"""Bulk import of infrastructure inventories from CSV, GeoJSON or zipped Shapefiles.
+
+Sources are read IMPORT_CHUNK_ROWS rows at a time (pandas chunks for CSV,
+Arrow record batches from pyogrio for vector formats) and each chunk is
+validated in vectorized form. Valid rows are written with executemany;
+invalid rows are counted and reported with their row number and reason
+instead of aborting the import.
+
+CSV files need latitude and longitude columns (``lat``/``lon``/``lng``/``x``/
+``y`` are accepted too). Vector formats take coordinates from their point
+geometries and are reprojected to WGS 84 when needed.
+"""
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyogrio
+import shapely
+from pyproj import CRS, Transformer
+
+from utils.infrastructure_points import POINT_COLUMNS, POINT_TYPES, insert_point_rows
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = {'csv': 'CSV', 'geojson': 'GeoJSON', 'shapefile': 'Zipped Shapefile'}
+
+# Rows read, validated and written per chunk
+IMPORT_CHUNK_ROWS = 5000
+# Rejected rows listed in an ImportResult; the rest are only counted
+MAX_REPORTED_REJECTS = 100
+
+# Source column names accepted for each point column, after lower-casing
+COLUMN_ALIASES = {
+    'lat': 'latitude',
+    'y': 'latitude',
+    'lon': 'longitude',
+    'lng': 'longitude',
+    'long': 'longitude',
+    'x': 'longitude',
+    'asset_type': 'type',
+    'structure_type': 'type',
+    'age_years': 'age',
+    'maintenance_days': 'last_maintenance_days',
+    'days_since_maintenance': 'last_maintenance_days',
+    # Shapefile field names are truncated to 10 characters
+    'last_maint': 'last_maintenance_days',
+    'maint_days': 'last_maintenance_days'
+}
+
+_TYPE_LOOKUP = {point_type.lower(): point_type for point_type in POINT_TYPES}
+
+class ImportResult:
+    """Counts, rejected rows and throughput of one import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []
+        self.seconds = 0.0
+
+    @property
+    def rows(self):
+        return self.imported + self.rejected
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def reject(self, row_numbers, reason):
+        self.rejected += len(row_numbers)
+        room = MAX_REPORTED_REJECTS - len(self.rejects)
+        self.rejects.extend((int(row), reason) for row in row_numbers[:max(room, 0)])
+
+def detect_format(file_name):
+    """Import format for a file name, or None if the extension is not supported"""
+    extension = os.path.splitext(file_name)[1].lower()
+    return {'.csv': 'csv', '.geojson': 'geojson', '.json': 'geojson', '.zip': 'shapefile'}.get(extension)
+
+def _normalize_columns(df):
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    return df.rename(columns={col: COLUMN_ALIASES[col] for col in df.columns
+                              if col in COLUMN_ALIASES and COLUMN_ALIASES[col] not in df.columns})
+
+def _csv_chunks(source):
+    for chunk in pd.read_csv(source, chunksize=IMPORT_CHUNK_ROWS, skipinitialspace=True):
+        yield _normalize_columns(chunk)
+
+def _vector_chunks(source):
+    with pyogrio.open_arrow(source, batch_size=IMPORT_CHUNK_ROWS, use_pyarrow=True) as (meta, reader):
+        geometry_name = meta['geometry_name'] or 'wkb_geometry'
+        transformer = None
+        if meta['crs'] and not CRS.from_user_input(meta['crs']).equals(CRS.from_epsg(4326)):
+            transformer = Transformer.from_crs(meta['crs'], 4326, always_xy=True)
+        for batch in reader:
+            chunk = batch.to_pandas()
+            geometries = shapely.from_wkb(chunk.pop(geometry_name).to_numpy())
+            is_point = shapely.get_type_id(geometries) == shapely.GeometryType.POINT
+            x = np.where(is_point, shapely.get_x(geometries), np.nan)
+            y = np.where(is_point, shapely.get_y(geometries), np.nan)
+            if transformer is not None:
+                # Missing coordinates of non-point geometries come back as inf
+                x, y = (np.where(np.isfinite(v), v, np.nan) for v in transformer.transform(x, y))
+            chunk = _normalize_columns(chunk)
+            chunk['longitude'], chunk['latitude'] = x, y
+            yield chunk
+
+def _numeric(chunk, col):
+    if col not in chunk:
+        return pd.Series(np.nan, index=chunk.index)
+    return pd.to_numeric(chunk[col], errors='coerce')
+
+def _validate(chunk, first_row, result):
+    """Return the valid rows of ``chunk`` as POINT_COLUMNS tuples, recording rejects in ``result``"""
+    rows = np.arange(first_row, first_row + len(chunk))
+    latitude = _numeric(chunk, 'latitude')
+    longitude = _numeric(chunk, 'longitude')
+    if 'type' in chunk:
+        types = chunk['type'].astype(str).str.strip().str.lower().map(_TYPE_LOOKUP)
+    else:
+        types = pd.Series(None, index=chunk.index, dtype=object)
+
+    # Age and maintenance days are optional, but must be non-negative numbers when given
+    numbers = {col: _numeric(chunk, col) for col in ('age', 'last_maintenance_days')}
+    invalid_numbers = pd.Series(False, index=chunk.index)
+    for col, values in numbers.items():
+        if col in chunk:
+            invalid_numbers |= chunk[col].notna() & (values.isna() | (values < 0))
+
+    checks = [
+        (latitude.isna() | longitude.isna(), "missing or non-numeric coordinates"),
+        ((latitude.abs() > 90) | (longitude.abs() > 180), "coordinates out of range"),
+        (types.isna(), f"type must be one of {', '.join(POINT_TYPES)}"),
+        (invalid_numbers, "age and maintenance days must be non-negative numbers")
+    ]
+    rejected = pd.Series(False, index=chunk.index)
+    for failed, reason in checks:
+        # Report each row under the first check it fails
+        failed = failed & ~rejected
+        if failed.any():
+            result.reject(rows[failed.to_numpy()], reason)
+            rejected |= failed
+
+    valid = ~rejected.to_numpy()
+    if 'name' in chunk:
+        names = chunk['name'].where(chunk['name'].notna(), None)
+        names = names.where(names.astype(str).str.strip() != '', None)
+    else:
+        names = pd.Series(None, index=chunk.index, dtype=object)
+    names = names.fillna(pd.Series([f"Imported {row}" for row in rows], index=chunk.index))
+
+    for col, values in numbers.items():
+        # Keep whole numbers as ints, as the assessment form enters them
+        valid_values = values[valid].dropna()
+        if (valid_values % 1 == 0).all():
+            numbers[col] = values.where(values % 1 == 0).astype('Int64')
+
+    columns = {
+        'name': names.astype(str),
+        'type': types,
+        'latitude': latitude,
+        'longitude': longitude,
+        'age': numbers['age'],
+        'last_maintenance_days': numbers['last_maintenance_days']
+    }
+    frame = pd.DataFrame({col: columns[col] for col in POINT_COLUMNS})[valid]
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+def read_points(source, fmt, result=None):
+    """Yield lists of validated POINT_COLUMNS tuples from ``source``, one per chunk.
+
+    ``source`` is a path or binary file object. Rejected rows are recorded in
+    ``result``; row numbers count data rows from 1.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    result = result if result is not None else ImportResult()
+    chunks = _csv_chunks(source) if fmt == 'csv' else _vector_chunks(source)
+    first_row = 1
+    for chunk in chunks:
+        yield _validate(chunk.reset_index(drop=True), first_row, result)
+        first_row += len(chunk)
+
+def import_points(c, project_id, source, fmt, assessment_id=None):
+    """Import an inventory into infrastructure_points using cursor ``c`` and return an ImportResult.
+
+    Points belong to the project, and to ``assessment_id`` when given. The
+    caller owns the transaction, so a failed read leaves nothing behind.
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+    for rows in read_points(source, fmt, result):
+        insert_point_rows(c, project_id, assessment_id, rows)
+        result.imported += len(rows)
+    result.seconds = time.perf_counter() - start
+    logger.info("Imported %s points (%s rejected) into project %s at %.0f rows/s",
+                result.imported, result.rejected, project_id, result.rows_per_second)
+    return result
+
+def load_points(source, fmt):
+    """Read and validate an inventory into point dicts, e.g. for an unsaved assessment.
+
+    Returns ``(points, result)``.
+    """
+    result = ImportResult()
+    start = time.perf_counter()
+    points = []
+    for rows in read_points(source, fmt, result):
+        points.extend(dict(zip(POINT_COLUMNS, row)) for row in rows)
+    result.imported = len(points)
+    result.seconds = time.perf_counter() - start
+    return points, result
@@ -1,231 +1,373 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, Flowable
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, PageBreak
+from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.graphics.shapes import Drawing, Rect
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
-import io
-import datetime
+import functools
+import glob
+import hashlib
 import json
+import os
+import datetime
+from utils.telemetry import timed
+from utils.files import atomic_output, spooled_file
 
-class ScoreIndicator(Flowable):
-    """A custom flowable that shows a score as a colored box with text"""
-    def __init__(self, score, width=1*inch, height=0.3*inch):
-        Flowable.__init__(self)
-        self.score = score
-        self.width = width
-        self.height = height
-        
-    def draw(self):
-        """Draw the score indicator"""
-        # Determine color based on score
-        if self.score < 4:
-            color = colors.red
-        elif self.score < 7:
-            color = colors.orange
-        else:
-            color = colors.green
-            
-        # Draw rectangle
-        self.canv.setFillColor(color)
-        self.canv.rect(0, 0, self.width, self.height, fill=1)
-        
-        # Draw score text
-        self.canv.setFillColor(colors.white)
-        self.canv.setFont("Helvetica-Bold", 14)
-        self.canv.drawCentredString(self.width/2, self.height/4, f"{self.score}/10")
-
-def create_score_chart(scores, title):
-    """Create a simple bar chart for multiple scores"""
-    drawing = Drawing(400, 200)
-    
-    chart = VerticalBarChart()
-    chart.x = 50
-    chart.y = 50
-    chart.height = 125
-    chart.width = 350
-    chart.data = [scores]
-    chart.valueAxis.valueMin = 0
-    chart.valueAxis.valueMax = 10
-    chart.valueAxis.valueStep = 1
-    
-    # Set colors based on scores
-    colors_list = []
-    for score in scores:
-        if score < 4:
-            colors_list.append(colors.red)
-        elif score < 7:
-            colors_list.append(colors.orange)
-        else:
-            colors_list.append(colors.green)
-    
-    chart.bars[0].fillColor = colors_list[0]  # Use the first color for all bars
-    
-    chart.categoryAxis.labels.boxAnchor = 'ne'
-    chart.categoryAxis.labels.dx = -8
-    chart.categoryAxis.labels.dy = -2
-    chart.categoryAxis.labels.angle = 30
-    
-    # Add title
-    from reportlab.graphics.shapes import String
-    title_element = String(200, 180, title, fontSize=12, textAnchor='middle')
-    drawing.add(title_element)
-    
-    drawing.add(chart)
-    return drawing
-
-def generate_report(assessment_data, project_name=""):
-    """Generate a simplified PDF report that works reliably"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.5*inch, rightMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Ensure assessment_data is a dict
-    if not isinstance(assessment_data, dict):
-        assessment_data = {}
-
-    # Simple title styling
-    title_style = styles['Heading1']
-    subtitle_style = styles['Heading2']
-    section_style = styles['Heading3']
-    normal_style = styles['Normal']
-    
-    # Title and Date
-    current_date = datetime.datetime.now().strftime("%B %d, %Y")
-    title = Paragraph("Stormwater Infrastructure Assessment Report", title_style)
-    story.append(title)
-    project_heading = Paragraph(project_name, subtitle_style)
-    story.append(project_heading)
-    story.append(Paragraph("Generated: " + current_date, normal_style))
-    story.append(Spacer(1, 20))
-
-    # Executive Summary
-    story.append(Paragraph("Executive Summary", subtitle_style))
-    
-    # Simplified score collection
-    condition_score = 5
-    if 'condition' in assessment_data and 'OSAC' in assessment_data['condition']:
-        condition_score = assessment_data['condition']['OSAC'].get('score', 5)
-    
-    functionality_score = 5
-    if 'functionality' in assessment_data and 'overallFunctionality' in assessment_data['functionality']:
-        functionality_score = assessment_data['functionality']['overallFunctionality'].get('score', 5)
-    
-    time_score = 5
-    if 'time_effectiveness' in assessment_data:
-        time_score = assessment_data['time_effectiveness'].get('overallTimeScore', 5)
-    
-    cost_score = 5
-    if 'cost_effectiveness' in assessment_data:
-        cost_score = assessment_data['cost_effectiveness'].get('overallCostScore', 5)
-    
-    env_score = 5
-    if 'environmental_social' in assessment_data:
-        env_score = assessment_data['environmental_social'].get('overallScore', 5)
-    
-    # Calculate final score
-    scores = [condition_score, functionality_score, time_score, cost_score, env_score]
-    final_score = sum(scores) // len(scores)
-    
-    # Rating text based on score
-    rating = "Good" if final_score >= 7 else "Fair" if final_score >= 4 else "Poor"
-    
-    # Add overall assessment info
-    summary_text = "This report provides a comprehensive assessment of stormwater infrastructure"
-    if project_name:
-        summary_text += " for " + project_name
-    summary_text += "."
-    
-    story.append(Paragraph(summary_text, normal_style))
-    story.append(Spacer(1, 10))
-    story.append(Paragraph("Overall Rating: " + rating, subtitle_style))
-    story.append(Paragraph("Overall Score: " + str(final_score) + "/10", normal_style))
-    story.append(Spacer(1, 15))
-    
-    # Domain Scores Table
-    story.append(Paragraph("Domain Score Breakdown", section_style))
-    domain_data = [
-        ['Domain', 'Score', 'Rating'],
-        ['Condition', str(condition_score), "Good" if condition_score >= 7 else "Fair" if condition_score >= 4 else "Poor"],
-        ['Functionality', str(functionality_score), "Good" if functionality_score >= 7 else "Fair" if functionality_score >= 4 else "Poor"],
-        ['Time Effectiveness', str(time_score), "Good" if time_score >= 7 else "Fair" if time_score >= 4 else "Poor"],
-        ['Cost Effectiveness', str(cost_score), "Good" if cost_score >= 7 else "Fair" if cost_score >= 4 else "Poor"],
-        ['Environmental & Social', str(env_score), "Good" if env_score >= 7 else "Fair" if env_score >= 4 else "Poor"]
-    ]
-    
-    # Create domain score table
-    domain_table = Table(domain_data, colWidths=[2*inch, 1*inch, 1*inch])
-    domain_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.navy),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    story.append(domain_table)
-    story.append(Spacer(1, 20))
-    
-    # Infrastructure Points Analysis 
-    story.append(Paragraph("Infrastructure Analysis", subtitle_style))
-    if 'infrastructure_points' in assessment_data and assessment_data['infrastructure_points']:
-        # Simple table of infrastructure points
-        data = [['Location', 'Type', 'Age', 'Last Maintenance']]
-        
-        for point in assessment_data['infrastructure_points']:
-            data.append([
-                str(point.get('name', 'N/A')),
-                str(point.get('type', 'N/A')).replace('_', ' ').title(),
-                str(point.get('age', 'N/A')),
-                str(point.get('last_maintenance_days', 'N/A')) + " days ago"
-            ])
-            
-        # Create a simple table
-        infra_table = Table(data)
-        infra_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.navy),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        story.append(infra_table)
-    else:
-        story.append(Paragraph("No infrastructure points available.", normal_style))
-    
-    story.append(Spacer(1, 20))
-    
-    # Recommendations section
-    story.append(Paragraph("Recommendations", subtitle_style))
-    
-    # Generic recommendations
-    recommendations = """
+# Bump whenever generate_report's layout or content changes so cached PDFs are rebuilt
+REPORT_TEMPLATE_VERSION = 2
+
+# Generated reports are cached here, one file per assessment, template version and content
+REPORT_CACHE_DIR = os.environ.get('STORMWATER_REPORT_CACHE_DIR', os.path.join('temp', 'reports'))
+
+# Assessments with more infrastructure points than this get a per-type summary instead of every row
+POINT_DETAIL_LIMIT = 2000
+
+# Rows per LongTable chunk of the point listing; every chunk repeats the header row
+POINT_TABLE_CHUNK_ROWS = 100
+
+POINT_TABLE_HEADER = ['Location', 'Type', 'Age', 'Last Maintenance']
+POINT_SUMMARY_HEADER = ['Type', 'Count', 'Mean Age', 'Mean Days Since Maintenance']
+
+RECOMMENDATIONS = """
     • Implement regular inspection and maintenance schedules
     • Consider climate change impacts in future designs
     • Engage community stakeholders in planning processes
     • Update emergency response protocols for extreme weather events
     • Evaluate opportunities for green infrastructure integration
     """
-    story.append(Paragraph(recommendations, normal_style))
-    
-    # Footer with page numbers
-    def add_page_number(canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica', 9)
-        page_num = canvas.getPageNumber()
-        text = "Page " + str(page_num)
-        canvas.drawRightString(doc.width + doc.rightMargin - 10, doc.bottomMargin - 20, text)
-        
+
+def _rating(score):
+    return "Good" if score >= 7 else "Fair" if score >= 4 else "Poor"
+
+def _type_label(point_type):
+    return str(point_type).replace('_', ' ').title()
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def summarize_points(points):
+    """Per-type ``[type, count, mean age, mean days since maintenance]`` rows, most common type first.
+
+    Means skip missing or non-numeric values and are 'N/A' when a type has none.
+    """
+    totals = {}
+    for point in points:
+        entry = totals.setdefault(_type_label(point.get('type', 'N/A')), [0, 0.0, 0, 0.0, 0])
+        entry[0] += 1
+        age = _number(point.get('age'))
+        if age is not None:
+            entry[1] += age
+            entry[2] += 1
+        days = _number(point.get('last_maintenance_days'))
+        if days is not None:
+            entry[3] += days
+            entry[4] += 1
+    return [
+        [label, str(count),
+         f"{age_total / age_count:.1f}" if age_count else 'N/A',
+         f"{days_total / days_count:.0f}" if days_count else 'N/A']
+        for label, (count, age_total, age_count, days_total, days_count)
+        in sorted(totals.items(), key=lambda item: (-item[1][0], item[0]))
+    ]
+
+class ReportTemplate:
+    """Paragraph styles, table styles and page decoration shared by every report.
+
+    Built once per process by ``report_template()``; generating a report then
+    only lays out the assessment's data. Style objects are read-only during
+    layout, so one template is safe to share between concurrent builds.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.document_title_style = styles['Title']
+        self.title_style = styles['Heading1']
+        self.subtitle_style = styles['Heading2']
+        self.section_style = styles['Heading3']
+        self.normal_style = styles['Normal']
+        self.entry_style = ParagraphStyle('ReportEntry', parent=styles['Heading1'], textColor=colors.navy)
+        self.toc_level_styles = [
+            ParagraphStyle('TOCLevel0', parent=styles['Normal'], fontSize=10, leftIndent=10, leading=14)
+        ]
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.navy),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ])
+        self.domain_col_widths = [2*inch, 1*inch, 1*inch]
+        # Fixed widths keep the columns of consecutive point table chunks aligned
+        self.point_col_widths = [2.6*inch, 1.9*inch, 1*inch, 1.5*inch]
+        self.summary_col_widths = [2*inch, 1*inch, 1.2*inch, 2.3*inch]
+        self.doc_kwargs = dict(pagesize=letter, leftMargin=0.5*inch, rightMargin=0.5*inch)
+
+    def page_decorator(self, project_name):
+        """onPage callback drawing the footer and page number for ``project_name``"""
         footer_text = "Stormwater Infrastructure Assessment"
         if project_name:
             footer_text += " - " + project_name
+        return functools.partial(self._draw_footer, footer_text)
+
+    @staticmethod
+    def _draw_footer(footer_text, canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 9)
+        canvas.drawRightString(doc.width + doc.rightMargin - 10, doc.bottomMargin - 20, "Page " + str(canvas.getPageNumber()))
         canvas.drawString(doc.leftMargin, doc.bottomMargin - 20, footer_text)
-        
         canvas.restoreState()
-    
+
+    def point_tables(self, points):
+        """Every point as rows of LongTable chunks that repeat the header across pages"""
+        rows = [
+            [
+                str(point.get('name', 'N/A')),
+                _type_label(point.get('type', 'N/A')),
+                str(point.get('age', 'N/A')),
+                str(point.get('last_maintenance_days', 'N/A')) + " days ago"
+            ]
+            for point in points
+        ]
+        return [
+            LongTable([POINT_TABLE_HEADER] + rows[start:start + POINT_TABLE_CHUNK_ROWS],
+                      colWidths=self.point_col_widths, repeatRows=1, style=self.table_style)
+            for start in range(0, len(rows), POINT_TABLE_CHUNK_ROWS)
+        ]
+
+    def point_summary(self, points):
+        """One row per infrastructure type with its count, mean age and mean days since maintenance"""
+        return LongTable([POINT_SUMMARY_HEADER] + summarize_points(points),
+                         colWidths=self.summary_col_widths, repeatRows=1, style=self.table_style)
+
+    def story(self, assessment_data, project_name, point_detail=None):
+        """Flowables for one assessment report.
+
+        ``point_detail`` is ``'rows'`` to list every infrastructure point or
+        ``'summary'`` for the per-type summary; by default rows are listed up
+        to POINT_DETAIL_LIMIT points.
+        """
+        # Ensure assessment_data is a dict
+        if not isinstance(assessment_data, dict):
+            assessment_data = {}
+
+        normal_style = self.normal_style
+        subtitle_style = self.subtitle_style
+
+        # Title and Date
+        current_date = datetime.datetime.now().strftime("%B %d, %Y")
+        story = [
+            Paragraph("Stormwater Infrastructure Assessment Report", self.title_style),
+            Paragraph(project_name, subtitle_style),
+            Paragraph("Generated: " + current_date, normal_style),
+            Spacer(1, 20),
+            # Executive Summary
+            Paragraph("Executive Summary", subtitle_style)
+        ]
+
+        # Simplified score collection
+        condition_score = 5
+        if 'condition' in assessment_data and 'OSAC' in assessment_data['condition']:
+            condition_score = assessment_data['condition']['OSAC'].get('score', 5)
+
+        functionality_score = 5
+        if 'functionality' in assessment_data and 'overallFunctionality' in assessment_data['functionality']:
+            functionality_score = assessment_data['functionality']['overallFunctionality'].get('score', 5)
+
+        time_score = 5
+        if 'time_effectiveness' in assessment_data:
+            time_score = assessment_data['time_effectiveness'].get('overallTimeScore', 5)
+
+        cost_score = 5
+        if 'cost_effectiveness' in assessment_data:
+            cost_score = assessment_data['cost_effectiveness'].get('overallCostScore', 5)
+
+        env_score = 5
+        if 'environmental_social' in assessment_data:
+            env_score = assessment_data['environmental_social'].get('overallScore', 5)
+
+        # Calculate final score
+        scores = [condition_score, functionality_score, time_score, cost_score, env_score]
+        final_score = sum(scores) // len(scores)
+
+        # Add overall assessment info
+        summary_text = "This report provides a comprehensive assessment of stormwater infrastructure"
+        if project_name:
+            summary_text += " for " + project_name
+        summary_text += "."
+
+        story.append(Paragraph(summary_text, normal_style))
+        story.append(Spacer(1, 10))
+        story.append(Paragraph("Overall Rating: " + _rating(final_score), subtitle_style))
+        story.append(Paragraph("Overall Score: " + str(final_score) + "/10", normal_style))
+        story.append(Spacer(1, 15))
+
+        # Domain Scores Table
+        story.append(Paragraph("Domain Score Breakdown", self.section_style))
+        domain_data = [['Domain', 'Score', 'Rating']] + [
+            [domain, str(score), _rating(score)]
+            for domain, score in (
+                ('Condition', condition_score),
+                ('Functionality', functionality_score),
+                ('Time Effectiveness', time_score),
+                ('Cost Effectiveness', cost_score),
+                ('Environmental & Social', env_score)
+            )
+        ]
+        story.append(Table(domain_data, colWidths=self.domain_col_widths, style=self.table_style))
+        story.append(Spacer(1, 20))
+
+        # Infrastructure Points Analysis
+        story.append(Paragraph("Infrastructure Analysis", subtitle_style))
+        points = assessment_data.get('infrastructure_points')
+        if points:
+            if point_detail is None:
+                point_detail = 'rows' if len(points) <= POINT_DETAIL_LIMIT else 'summary'
+            if point_detail == 'summary':
+                story.append(Paragraph(
+                    f"{len(points):,} infrastructure points, summarized by type.", normal_style
+                ))
+                story.append(Spacer(1, 10))
+                story.append(self.point_summary(points))
+            else:
+                story.extend(self.point_tables(points))
+        else:
+            story.append(Paragraph("No infrastructure points available.", normal_style))
+
+        story.append(Spacer(1, 20))
+
+        # Recommendations section
+        story.append(Paragraph("Recommendations", subtitle_style))
+        story.append(Paragraph(RECOMMENDATIONS, normal_style))
+        return story
+
+@functools.lru_cache(maxsize=None)
+def report_template():
+    """The process-wide ReportTemplate"""
+    return ReportTemplate()
+
+@timed('pdf')
+def generate_report(assessment_data, project_name="", output=None, point_detail=None):
+    """Write the PDF report to ``output``, a binary file.
+
+    Without ``output`` a spooled temp file is used, which moves to disk once
+    it outgrows SPOOL_MAX_MEMORY. ``point_detail`` is passed to
+    ReportTemplate.story. Returns the file, rewound.
+    """
+    template = report_template()
+    if output is None:
+        output = spooled_file()
+    doc = SimpleDocTemplate(output, **template.doc_kwargs)
+    story = template.story(assessment_data, project_name, point_detail)
+
     # Build the document with page numbers
+    add_page_number = template.page_decorator(project_name)
     doc.build(story, onFirstPage=add_page_number, onLaterPages=add_page_number)
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    output.seek(0)
+    return output
+
+class _MergedReportDocTemplate(SimpleDocTemplate):
+    """Document that registers each report entry heading in the outline and table of contents"""
+
+    def __init__(self, *args, progress=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._progress = progress
+        self._pass = 0
+        self._entries = 0
+
+    def beforeDocument(self):
+        self._pass += 1
+        self._entries = 0
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, Paragraph) and flowable.style.name == 'ReportEntry':
+            text = flowable.getPlainText()
+            key = f"report_{self._entries}"
+            self._entries += 1
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(text, key, level=0)
+            self.notify('TOCEntry', (0, text, self.page, key))
+            if self._progress:
+                self._progress(self._pass, self._entries)
+
+@timed('pdf')
+def generate_merged_report(entries, project_name="", progress=None, output=None):
+    """Write one PDF holding a report per entry, preceded by a table of contents.
+
+    ``entries`` is a list of ``(heading, assessment_data)``. ``progress`` is
+    called with ``(layout_pass, entries_laid_out)``; the table of contents
+    needs two layout passes. ``output`` works as for generate_report.
+    Returns the file, rewound.
+    """
+    template = report_template()
+    if output is None:
+        output = spooled_file()
+    doc = _MergedReportDocTemplate(output, progress=progress, **template.doc_kwargs)
+
+    toc = TableOfContents()
+    toc.levelStyles = template.toc_level_styles
+    story = [
+        Paragraph("Stormwater Infrastructure Assessment Reports", template.document_title_style),
+        Paragraph(project_name, template.subtitle_style),
+        Paragraph(f"{len(entries)} assessments", template.normal_style),
+        Spacer(1, 20),
+        Paragraph("Contents", template.subtitle_style),
+        toc
+    ]
+    for heading, assessment_data in entries:
+        story.append(PageBreak())
+        story.append(Paragraph(heading, template.entry_style))
+        story.extend(template.story(assessment_data, project_name))
+
+    add_page_number = template.page_decorator(project_name)
+    doc.multiBuild(story, onFirstPage=add_page_number, onLaterPages=add_page_number)
+    output.seek(0)
+    return output
+
+def report_digest(assessment_data, project_name=""):
+    """Hash of everything a report is rendered from, so edited or replaced assessments get a new file"""
+    content = json.dumps({'data': assessment_data, 'project': project_name}, sort_keys=True, default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+def report_cache_path(assessment_id, assessment_data, project_name=""):
+    """Path of the cached PDF for an assessment's current content under the current template version"""
+    digest = report_digest(assessment_data, project_name)
+    return os.path.join(REPORT_CACHE_DIR, f"assessment_{int(assessment_id)}_v{REPORT_TEMPLATE_VERSION}_{digest}.pdf")
+
+def get_cached_report(assessment_id, assessment_data, project_name=""):
+    """Return the path of the cached PDF for an assessment, or None if it has not been generated"""
+    path = report_cache_path(assessment_id, assessment_data, project_name)
+    return path if os.path.exists(path) else None
+
+def remove_cached_reports(assessment_id=None, keep=None):
+    """Delete cached PDFs of one assessment (all when None), except the path ``keep``"""
+    pattern = f"assessment_{int(assessment_id)}_*.pdf" if assessment_id is not None else "assessment_*.pdf"
+    for path in glob.glob(os.path.join(REPORT_CACHE_DIR, pattern)):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def write_report(path, assessment_data, project_name=""):
+    """Generate a report straight into ``path``, replacing it atomically"""
+    with atomic_output(path) as f:
+        generate_report(assessment_data, project_name=project_name, output=f)
+    return path
+
+def get_or_generate_report(assessment_id, assessment_data, project_name=""):
+    """Return the path of the PDF for an assessment, generating and caching it on first request.
+
+    Older PDFs of the assessment are removed once the new one is written.
+    """
+    path = get_cached_report(assessment_id, assessment_data, project_name)
+    if path is None:
+        path = write_report(report_cache_path(assessment_id, assessment_data, project_name), assessment_data, project_name)
+        remove_cached_reports(assessment_id, keep=path)
+    return path
@@ -0,0 +1,233 @@
+"""Bulk PDF export of a project's assessment reports as a background job.
+
+``start_export`` returns immediately with an ExportJob; a background thread
+renders the reports in a pool of worker processes (so layout work does not
+hold the server's GIL) and writes one file under EXPORT_DIR:
+
+* ``zip`` - one PDF per assessment. Reports already in the report cache are
+  reused; workers write new ones into the cache and the archive is filled
+  from those files.
+* ``pdf`` - a single merged PDF with a table of contents and bookmarks.
+
+The UI polls ``get_export_job`` for progress on each rerun.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from utils.files import atomic_output, slugify
+from utils.report import generate_merged_report, get_cached_report, report_cache_path, write_report
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('zip', 'pdf')
+
+# Finished exports are written here and removed after EXPORT_RETENTION seconds
+EXPORT_DIR = os.environ.get('STORMWATER_EXPORT_DIR', os.path.join('temp', 'exports'))
+EXPORT_RETENTION = 24 * 3600
+
+# Worker processes per export; one core is left for the Streamlit server
+EXPORT_WORKERS = int(os.environ.get('STORMWATER_EXPORT_WORKERS', max(1, (os.cpu_count() or 2) - 1)))
+
+# Jobs remembered for progress polling; the oldest finished jobs are forgotten first
+MAX_EXPORT_JOBS = 50
+
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def _render_merged(entries, project_name, path):
+    def progress(layout_pass, laid_out):
+        _progress_queue.put((layout_pass, laid_out))
+    with atomic_output(path) as f:
+        generate_merged_report(entries, project_name=project_name, progress=progress, output=f)
+
+def _report_heading(assessment):
+    date = datetime.fromisoformat(assessment['timestamp']).strftime('%B %d, %Y')
+    return f"Assessment #{assessment['id']} - {date}"
+
+class ExportJob:
+    """Status and progress of one bulk export, shared between the job thread and reruns"""
+
+    def __init__(self, project_id, project_name, fmt, total):
+        self.id = uuid.uuid4().hex
+        self.project_id = project_id
+        self.project_name = project_name
+        self.format = fmt
+        self.report_count = total
+        self.total = total
+        self.completed = 0
+        self.status = 'queued'
+        self.message = 'Waiting for another export to finish'
+        self.error = None
+        self.output_path = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    @property
+    def progress(self):
+        if self.status == 'done':
+            return 1.0
+        return min(self.completed / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.output_path) if self.output_path else None
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# Exports run one at a time so concurrent requests do not oversubscribe the CPU
+_export_slot = threading.Semaphore(1)
+
+def get_export_job(job_id):
+    """Return the ExportJob with ``job_id``, or None if it is unknown or was forgotten"""
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def _remember(job):
+    with _jobs_lock:
+        _jobs[job.id] = job
+        finished = sorted((j for j in _jobs.values() if j.done), key=lambda j: j.created_at)
+        for old in finished[:max(0, len(_jobs) - MAX_EXPORT_JOBS)]:
+            del _jobs[old.id]
+
+def remove_expired_exports():
+    """Delete files in EXPORT_DIR older than EXPORT_RETENTION seconds"""
+    cutoff = time.time() - EXPORT_RETENTION
+    try:
+        for name in os.listdir(EXPORT_DIR):
+            path = os.path.join(EXPORT_DIR, name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def start_export(project_id, project_name, assessments, fmt='zip'):
+    """Start exporting the reports of ``assessments`` in the background.
+
+    ``assessments`` are rows with ``id``, ``timestamp`` and parsed ``data``.
+    Returns the ExportJob to poll.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if not assessments:
+        raise ValueError("No assessments to export")
+
+    job = ExportJob(project_id, project_name, fmt, len(assessments))
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    job.output_path = os.path.join(EXPORT_DIR, f"{slugify(project_name, 'project')}_reports_{stamp}_{job.id[:8]}.{fmt}")
+    _remember(job)
+    thread = threading.Thread(target=_run_export, args=(job, list(assessments)), name=f"report-export-{job.id[:8]}", daemon=True)
+    thread.start()
+    return job
+
+def _run_export(job, assessments):
+    with _export_slot:
+        job.status = 'running'
+        job.message = 'Starting report workers'
+        started = time.perf_counter()
+        try:
+            remove_expired_exports()
+            if job.format == 'zip':
+                _export_zip(job, assessments)
+            else:
+                _export_merged(job, assessments)
+            job.status = 'done'
+            job.message = f"Exported {job.report_count} reports"
+            logger.info("Exported %s reports for project %s as %s in %.1f s",
+                        job.report_count, job.project_id, job.format, time.perf_counter() - started)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.message = f"Export failed: {str(e)}"
+            logger.exception("Report export %s failed", job.id)
+        finally:
+            job.finished_at = time.time()
+
+def _executor(progress_queue=None, workers=EXPORT_WORKERS):
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(progress_queue,)
+    )
+
+def _export_zip(job, assessments):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as archive:
+            pending = []
+            for assessment in assessments:
+                path = get_cached_report(assessment['id'], assessment['data'], job.project_name)
+                if path is None:
+                    pending.append(assessment)
+                    continue
+                archive.write(path, _entry_name(assessment))
+                job.completed += 1
+
+            if pending:
+                job.message = f"Rendering {len(pending)} reports"
+                with _executor() as pool:
+                    futures = {
+                        pool.submit(
+                            write_report,
+                            report_cache_path(assessment['id'], assessment['data'], job.project_name),
+                            assessment['data'],
+                            job.project_name
+                        ): assessment
+                        for assessment in pending
+                    }
+                    for future in as_completed(futures):
+                        assessment = futures[future]
+                        archive.write(future.result(), _entry_name(assessment))
+                        job.completed += 1
+                        job.message = f"Rendered {job.completed} of {job.report_count} reports"
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, job.output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _entry_name(assessment):
+    date = datetime.fromisoformat(assessment['timestamp']).strftime('%Y%m%d')
+    return f"assessment_{assessment['id']}_{date}.pdf"
+
+def _export_merged(job, assessments):
+    # Oldest first reads naturally in a combined document
+    entries = [(_report_heading(a), a['data']) for a in sorted(assessments, key=lambda a: (a['timestamp'], a['id']))]
+    # The table of contents needs two layout passes over every report
+    job.total = 2 * len(entries)
+    progress_queue = multiprocessing.get_context('spawn').Queue()
+    # One document with one table of contents is a single task; more workers would only sit idle
+    with _executor(progress_queue, workers=1) as pool:
+        future = pool.submit(_render_merged, entries, job.project_name, job.output_path)
+        while True:
+            try:
+                layout_pass, laid_out = progress_queue.get(timeout=0.25)
+            except queue.Empty:
+                if future.done():
+                    break
+                continue
+            job.completed = min((layout_pass - 1) * len(entries) + laid_out, job.total)
+            job.message = f"Laying out report {laid_out} of {len(entries)} (pass {layout_pass})"
+        future.result()
+    job.completed = job.total
@@ -0,0 +1,134 @@
+"""Vectorized infrastructure risk scoring for the risk heat map.
+
+A point's risk combines the damage level recorded for its asset type with
+its age and days since maintenance::
+
+    risk = min((damage + 2 * min(age / 50, 1) + 2 * min(days / 365, 1)) / 1.2, 10)
+
+rounded to one decimal. Damage levels are read in both stored formats: the
+older bare strings (``'low'``, ``'moderate'``, ``'high'``) and the form's
+``{'condition': 'Fair (4-6)', 'score': 5}`` dicts, whose 0-10 condition
+score is mapped linearly onto the same 2-8 damage scale.
+"""
+import numpy as np
+import pandas as pd
+
+# Base risk of each damage level; also used for unknown levels and asset types ('low')
+DAMAGE_RISK = {'low': 2, 'moderate': 5, 'high': 8}
+DEFAULT_DAMAGE_RISK = DAMAGE_RISK['low']
+
+# Form condition labels start with these words
+CONDITION_LEVELS = {'poor': 'high', 'fair': 'moderate', 'good': 'low'}
+
+# Assumed when a point has no age or maintenance record
+DEFAULT_AGE = 0
+DEFAULT_MAINTENANCE_DAYS = 365
+
+# (minimum risk, status) from most to least severe
+RISK_STATUSES = [
+    (8, "Critical - Immediate Action Required"),
+    (6, "High Risk - Priority Maintenance"),
+    (4, "Moderate Risk - Regular Monitoring")
+]
+LOW_RISK_STATUS = "Low Risk - Routine Maintenance"
+
+def round_like_python(values, ndigits=1):
+    """np.round, except near-ties are settled by round() so binary halves match exactly"""
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9)
+    for i in ties:
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+def damage_risk(level):
+    """Base risk (2-8) of one damage level in either stored format"""
+    if isinstance(level, dict):
+        score = level.get('score')
+        if isinstance(score, (int, float)) and not isinstance(score, bool) and not np.isnan(score):
+            return DAMAGE_RISK['high'] - 0.6 * min(max(score, 0), 10)
+        level = level.get('condition')
+    if isinstance(level, str):
+        text = level.strip().lower()
+        if text in DAMAGE_RISK:
+            return DAMAGE_RISK[text]
+        for prefix, damage in CONDITION_LEVELS.items():
+            if text.startswith(prefix):
+                return DAMAGE_RISK[damage]
+    return DEFAULT_DAMAGE_RISK
+
+def damage_risk_by_type(assessment_data):
+    """Base risk per asset type from the assessment's hydraulic asset damage levels"""
+    condition = (assessment_data or {}).get('condition') or {}
+    levels = (condition.get('stormwaterHydraulicAssetCondition') or {}).get('damageLevels') or {}
+    return {asset_type: damage_risk(level) for asset_type, level in levels.items()}
+
+def _numeric(values, default):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(default).to_numpy(dtype=float)
+
+def score_point_risk(types, ages, maintenance_days, type_risk):
+    """Risk levels (0-10, one decimal) for arrays of asset type, age and days since maintenance.
+
+    ``type_risk`` maps asset types to base risk (see damage_risk_by_type);
+    other types get DEFAULT_DAMAGE_RISK. Missing or non-numeric ages and
+    maintenance days fall back to DEFAULT_AGE / DEFAULT_MAINTENANCE_DAYS.
+    """
+    base = pd.Series(types, dtype=object).map(type_risk).fillna(DEFAULT_DAMAGE_RISK).to_numpy(dtype=float)
+    age_factor = np.minimum(_numeric(ages, DEFAULT_AGE) / 50, 1) * 2
+    maintenance_factor = np.minimum(_numeric(maintenance_days, DEFAULT_MAINTENANCE_DAYS) / 365, 1) * 2
+    return round_like_python(np.minimum((base + age_factor + maintenance_factor) / 1.2, 10))
+
+def risk_status(risk):
+    """Status text for each risk level in an array"""
+    risk = np.asarray(risk, dtype=float)
+    return np.select(
+        [risk >= threshold for threshold, _ in RISK_STATUSES],
+        [status for _, status in RISK_STATUSES],
+        default=LOW_RISK_STATUS
+    )
+
+def score_points(points, assessment_data):
+    """Risk of each infrastructure point dict as a DataFrame.
+
+    Columns: ``lat``, ``lng``, ``name``, ``risk_level`` and ``status``.
+    """
+    frame = pd.DataFrame.from_records(
+        points, columns=['latitude', 'longitude', 'name', 'type', 'age', 'last_maintenance_days']
+    )
+    risk = score_point_risk(frame['type'], frame['age'], frame['last_maintenance_days'], damage_risk_by_type(assessment_data))
+    return pd.DataFrame({
+        'lat': frame['latitude'],
+        'lng': frame['longitude'],
+        'name': frame['name'].fillna('Unknown'),
+        'risk_level': risk,
+        'status': risk_status(risk)
+    })
+
+def risk_density_grid(latitudes, longitudes, risk, cells_per_side):
+    """Aggregate point risk onto a square grid over the points' extent.
+
+    Returns an ``(n, 3)`` array of ``[latitude, longitude, weight]`` per
+    occupied cell: the cell's mean point position and the sum of its points'
+    risk divided by 10, so dense clusters of risky assets weigh the most.
+    Points without coordinates are skipped.
+    """
+    lat = np.asarray(latitudes, dtype=float)
+    lng = np.asarray(longitudes, dtype=float)
+    risk = np.asarray(risk, dtype=float)
+    valid = ~(np.isnan(lat) | np.isnan(lng))
+    lat, lng, risk = lat[valid], lng[valid], risk[valid]
+    if not len(lat):
+        return np.empty((0, 3))
+
+    south, west = lat.min(), lng.min()
+    cell_size = max(lat.max() - south, lng.max() - west) / cells_per_side or 1e-6
+    rows = np.minimum(((lat - south) / cell_size).astype(np.int64), cells_per_side - 1)
+    cols = np.minimum(((lng - west) / cell_size).astype(np.int64), cells_per_side - 1)
+    cells, index = np.unique(rows * cells_per_side + cols, return_inverse=True)
+
+    counts = np.bincount(index, minlength=len(cells))
+    return np.column_stack([
+        np.bincount(index, weights=lat, minlength=len(cells)) / counts,
+        np.bincount(index, weights=lng, minlength=len(cells)) / counts,
+        np.bincount(index, weights=risk, minlength=len(cells)) / 10
+    ])
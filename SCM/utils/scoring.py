@@ -0,0 +1,279 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from utils.telemetry import timer
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_WEIGHTS = {
+    'condition': 0.30,         # 30% weight for condition
+    'functionality': 0.25,     # 25% weight for functionality
+    'time_effectiveness': 0.15, # 15% weight for time effectiveness
+    'cost_effectiveness': 0.15, # 15% weight for cost effectiveness
+    'environmental_social': 0.15 # 15% weight for environmental/social
+}
+
+# Assessment sections that feed calculate_overall_score
+SCORED_SECTIONS = ('condition', 'functionality', 'time_effectiveness', 'cost_effectiveness', 'environmental_social')
+
+# Bump when the scoring rules change without a change to DOMAIN_WEIGHTS
+SCORING_RULES_VERSION = 1
+
+def _digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+# Identifies the weights and rules in effect; scores persisted under another
+# version are treated as stale and recomputed
+WEIGHTS_VERSION = _digest({'weights': DOMAIN_WEIGHTS, 'rules': SCORING_RULES_VERSION})[:12]
+
+def content_hash(assessment_data):
+    """Hash of the assessment sections that determine its overall score"""
+    return _digest({section: assessment_data.get(section) for section in SCORED_SECTIONS})
+
+class ScoreCache:
+    """Thread-safe LRU of overall scores keyed by (assessment id, content hash, weights version)"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, score):
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+score_cache = ScoreCache()
+
+def cached_overall_score(assessment_data, assessment_id=None, digest=None):
+    """Memoized calculate_overall_score.
+
+    Results are keyed by assessment id plus a hash of the scored sections, so
+    an edited assessment misses the cache, and by WEIGHTS_VERSION so changing
+    the domain weights invalidates every entry.
+    """
+    if digest is None:
+        digest = content_hash(assessment_data)
+    key = (assessment_id, digest, WEIGHTS_VERSION)
+    score = score_cache.get(key)
+    if score is None:
+        # Only misses are timed; calculate_overall_score is too hot to wrap
+        with timer('scoring', 'utils.scoring.calculate_overall_score'):
+            score = calculate_overall_score(assessment_data)
+        score_cache.put(key, score)
+    return score
+
+def extract_domain_scores(assessment_data):
+    """Return the scores recorded by the assessment forms for each domain (None if absent)"""
+    return {
+        'condition': assessment_data.get('condition', {}).get('OSAC', {}).get('score', None),
+        'functionality': assessment_data.get('functionality', {}).get('overallFunctionality', {}).get('score', None),
+        'time_effectiveness': assessment_data.get('time_effectiveness', {}).get('overallTimeScore', None),
+        'cost_effectiveness': assessment_data.get('cost_effectiveness', {}).get('overallCostScore', None),
+        'environmental_social': assessment_data.get('environmental_social', {}).get('overallScore', None)
+    }
+
+def calculate_domain_scores(assessment_data):
+    """Return ``(domain, score, weight)`` for each of the five scoring domains"""
+    # Initialize domain scores
+    domain_scores = []
+    domain_weights = DOMAIN_WEIGHTS
+    
+    # 1. Get Condition Score - from OSAC rating if available
+    try:
+        condition_score = assessment_data.get('condition', {}).get('OSAC', {}).get('score')
+        if condition_score is None:
+            # Fall back to calculating from damage levels if OSAC not available
+            damage_levels = assessment_data.get('condition', {}).get('stormwaterHydraulicAssetCondition', {}).get('damageLevels', {})
+            if damage_levels:
+                # Calculate based on damage levels (old method)
+                damage_score = sum(1 if (v == "low" or v.get('condition', '') == "low") 
+                                else 2 if (v == "moderate" or v.get('condition', '') == "moderate") 
+                                else 3 for v in damage_levels.values())
+                max_score = 3 * len(damage_levels) if len(damage_levels) > 0 else 1
+                condition_score = int(10 - (damage_score / max_score * 10))
+            else:
+                condition_score = 5  # Default if no data
+        domain_scores.append(('condition', condition_score, domain_weights['condition']))
+    except Exception as e:
+        logger.error("Error calculating condition score: %s", e)
+        domain_scores.append(('condition', 5, domain_weights['condition']))
+    
+    # 2. Get Functionality Score
+    try:
+        functionality_score = assessment_data.get('functionality', {}).get('overallFunctionality', {}).get('score')
+        if functionality_score is None:
+            # Calculate from hydraulic and hydrological performance if available
+            hp_data = assessment_data.get('functionality', {}).get('hydraulicPerformance', {})
+            dp_data = assessment_data.get('functionality', {}).get('hydrologicalPerformance', {})
+            
+            if hp_data and 'flowAttenuation' in hp_data and 'volumeReduction' in hp_data:
+                hp_score = (hp_data['flowAttenuation'] + hp_data['volumeReduction']) / 20
+                dp_score = 5  # Default hydrological score
+                
+                if dp_data and 'runoffFrequency' in dp_data and 'baseFlowPerformance' in dp_data:
+                    dp_score = (dp_data['runoffFrequency'] + dp_data['baseFlowPerformance']) / 20
+                    
+                functionality_score = int((hp_score + dp_score) / 2)
+            else:
+                functionality_score = 5  # Default if no data
+        domain_scores.append(('functionality', functionality_score, domain_weights['functionality']))
+    except Exception as e:
+        logger.error("Error calculating functionality score: %s", e)
+        domain_scores.append(('functionality', 5, domain_weights['functionality']))
+    
+    # 3. Get Time Effectiveness Score
+    try:
+        time_score = assessment_data.get('time_effectiveness', {}).get('overallTimeScore')
+        if time_score is None:
+            # Calculate from time metrics if available
+            time_data = assessment_data.get('time_effectiveness', {})
+            
+            if 'longTermFunctionality' in time_data and 'lagTimePerformance' in time_data:
+                long_term_score = time_data['longTermFunctionality'] / 10
+                lag_time_score = time_data['lagTimePerformance'] / 10
+                
+                if 'monitoringFrequency' in time_data:
+                    monitoring_scores = {
+                        "Continuous (real-time)": 10,
+                        "Daily": 8,
+                        "Weekly": 7,
+                        "Monthly": 5,
+                        "Quarterly": 3,
+                        "Annually": 1
+                    }
+                    monitoring_score = monitoring_scores.get(time_data['monitoringFrequency'], 5) / 10
+                    time_score = int((long_term_score * 0.4) + (lag_time_score * 0.4) + (monitoring_score * 0.2) * 10)
+                else:
+                    time_score = int((long_term_score + lag_time_score) / 2 * 10)
+            else:
+                # Old calculation
+                lifespan = time_data.get('lifespan', 25)
+                maintenance_lag = time_data.get('maintenanceLagTime', 30)
+                
+                # Normalize lifespan (0-50 years scale)
+                lifespan_score = min(lifespan / 50, 1.0) 
+                
+                # Normalize maintenance lag (0-365 days scale, lower is better)
+                maintenance_score = max(0, 1 - (maintenance_lag / 365))
+                
+                time_score = int((lifespan_score * 0.7 + maintenance_score * 0.3) * 10)
+        domain_scores.append(('time_effectiveness', time_score, domain_weights['time_effectiveness']))
+    except Exception as e:
+        logger.error("Error calculating time score: %s", e)
+        domain_scores.append(('time_effectiveness', 5, domain_weights['time_effectiveness']))
+    
+    # 4. Get Cost Effectiveness Score
+    try:
+        cost_score = assessment_data.get('cost_effectiveness', {}).get('overallCostScore')
+        if cost_score is None:
+            # Calculate from cost metrics if available
+            cost_data = assessment_data.get('cost_effectiveness', {})
+            
+            if 'benefitCostRatio' in cost_data and 'roi' in cost_data:
+                bcr = cost_data['benefitCostRatio']
+                roi = cost_data['roi']
+                
+                # Normalize BCR (1.0 is break-even, 3.0 is excellent)
+                bcr_score = min(bcr / 3, 1.0)
+                
+                # Normalize ROI (-100% to 200% scale)
+                roi_score = min(max((roi + 100) / 300, 0), 1.0)
+                
+                cost_score = int((bcr_score * 0.6 + roi_score * 0.4) * 10)
+            else:
+                # Old calculation
+                roi = cost_data.get('roi', 10)
+                # Normalize ROI (-100% to 100% scale)
+                cost_score = int(min((roi + 100) / 200, 1.0) * 10)
+        domain_scores.append(('cost_effectiveness', cost_score, domain_weights['cost_effectiveness']))
+    except Exception as e:
+        logger.error("Error calculating cost score: %s", e)
+        domain_scores.append(('cost_effectiveness', 5, domain_weights['cost_effectiveness']))
+    
+    # 5. Get Environmental/Social Score
+    try:
+        env_score = assessment_data.get('environmental_social', {}).get('overallScore')
+        if env_score is None:
+            # Calculate from environmental metrics if available
+            env_data = assessment_data.get('environmental_social', {})
+            
+            if 'pollutantConcentrationAttenuation' in env_data and 'eventBasedPollutantRemoval' in env_data:
+                # New format with updated field names
+                env_performance = (env_data['pollutantConcentrationAttenuation'] + 
+                                 env_data.get('eventBasedPollutantRemoval', 0) + 
+                                 env_data.get('pollutionRetentionPerformance', 0)) / 30
+                
+                # Social components
+                social_components = []
+                if 'customerSatisfaction' in env_data:
+                    social_components.append(env_data['customerSatisfaction'] / 10)
+                
+                if 'communityEngagement' in env_data:
+                    engagement_scores = {
+                        "None": 0, "Minimal": 3, "Moderate": 5, 
+                        "Extensive": 8, "Comprehensive": 10
+                    }
+                    social_components.append(engagement_scores.get(env_data['communityEngagement'], 5) / 10)
+                
+                if social_components:
+                    social_score = sum(social_components) / len(social_components)
+                    env_score = int((env_performance * 0.7 + social_score * 0.3) * 10)
+                else:
+                    env_score = int(env_performance * 10)
+            else:
+                # Old format
+                pollution_reduction = env_data.get('pollutantConcentrationReduction', 50)
+                satisfaction = env_data.get('customerSatisfaction', 5)
+                retention = env_data.get('pollutionRetention', 60)
+                
+                env_score = int((pollution_reduction + retention) / 20 + satisfaction)
+        domain_scores.append(('environmental_social', env_score, domain_weights['environmental_social']))
+    except Exception as e:
+        logger.error("Error calculating environmental score: %s", e)
+        domain_scores.append(('environmental_social', 5, domain_weights['environmental_social']))
+    
+    return domain_scores
+
+def calculate_overall_score(assessment_data):
+    """Calculate overall infrastructure score (0-10)"""
+    try:
+        domain_scores = calculate_domain_scores(assessment_data)
+        
+        # Calculate weighted average of domain scores
+        total_weight = sum(weight for _, _, weight in domain_scores)
+        if total_weight > 0:
+            weighted_sum = sum(score * weight for _, score, weight in domain_scores)
+            overall_score = weighted_sum / total_weight
+        else:
+            # Default if no weights
+            overall_score = sum(score for _, score, _ in domain_scores) / len(domain_scores) if domain_scores else 5.0
+            
+        # Log the score calculation for debugging
+        logger.debug("Domain scores: %s", domain_scores)
+        logger.debug("Overall score: %s", overall_score)
+        
+        return round(overall_score, 1)
+    except Exception as e:
+        logger.error("Error calculating overall score: %s", e, exc_info=True)
+        return 5.0  # Default score if calculation fails
@@ -0,0 +1,124 @@
+"""Batch spatial queries over cached infrastructure point layers.
+
+Distance queries run in the layer's projected CRS (metres) against STRtrees
+over the target points, built once per layer and set of target types:
+
+* ``points_within`` - targets within a distance of each source
+  ("manholes within 200 m of each flooded inlet")
+* ``nearest_points`` - the k nearest targets to each source
+  ("nearest outfall to each inlet")
+* ``points_in_polygons`` - targets inside each polygon
+
+Sources and polygons are GeoSeries in any CRS (WGS 84 when given as plain
+shapely geometries) and are reprojected with pyproj. Results are DataFrames
+whose ``source``/``polygon`` column holds the query's index labels and whose
+``target`` column holds row positions in ``layer.gdf``.
+"""
+import math
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.gis_layers import GIS_CRS
+
+def _geoseries(geometries):
+    if not isinstance(geometries, gpd.GeoSeries):
+        return gpd.GeoSeries(geometries, crs=GIS_CRS)
+    return geometries.set_crs(GIS_CRS) if geometries.crs is None else geometries
+
+def _projected(layer, geometries):
+    geometries = _geoseries(geometries)
+    return geometries.index.to_numpy(), np.asarray(geometries.to_crs(layer.projected().crs).values)
+
+def _pairs_frame(labels, source_idx, positions, target_idx, distances, source_column='source'):
+    frame = pd.DataFrame({
+        source_column: labels[source_idx],
+        'target': positions[target_idx],
+        'distance_m': distances
+    })
+    return frame.sort_values([source_column, 'distance_m'], kind='stable').reset_index(drop=True)
+
+def points_within(layer, sources, distance_m, target_types=None):
+    """Targets within ``distance_m`` metres of each source, nearest first"""
+    labels, geometries = _projected(layer, sources)
+    positions, tree = layer.projected_index(target_types)
+    source_idx, target_idx = tree.query(geometries, predicate='dwithin', distance=distance_m)
+    distances = shapely.distance(geometries[source_idx], tree.geometries[target_idx])
+    return _pairs_frame(labels, source_idx, positions, target_idx, distances)
+
+def _k_nearest(tree, geometries, k, max_distance):
+    """Source and tree indices of every target within the k-nearest radius of each source.
+
+    Each source is queried with a radius that starts around the distance
+    holding k targets at the average density and doubles until it holds
+    at least k targets, reaches ``max_distance`` or spans every target.
+    """
+    targets = tree.geometries
+    bounds = shapely.total_bounds(np.concatenate([targets, geometries]))
+    span = math.hypot(bounds[2] - bounds[0], bounds[3] - bounds[1]) or 1.0
+    target_bounds = shapely.total_bounds(targets)
+    area = max((target_bounds[2] - target_bounds[0]) * (target_bounds[3] - target_bounds[1]), 1.0)
+    radius = 2 * math.sqrt(k * area / (math.pi * len(targets)))
+    limit = span if max_distance is None else min(max_distance, span)
+
+    pending = np.arange(len(geometries))
+    found_sources, found_targets = [], []
+    while len(pending):
+        radius = min(radius, limit)
+        source_idx, target_idx = tree.query(geometries[pending], predicate='dwithin', distance=radius)
+        done = np.bincount(source_idx, minlength=len(pending)) >= k
+        if radius >= limit:
+            done[:] = True
+        keep = done[source_idx]
+        found_sources.append(pending[source_idx[keep]])
+        found_targets.append(target_idx[keep])
+        pending = pending[~done]
+        radius *= 2
+    return np.concatenate(found_sources), np.concatenate(found_targets)
+
+def nearest_points(layer, sources, k=1, target_types=None, max_distance_m=None):
+    """The ``k`` nearest targets to each source with their ``rank`` (1 = nearest).
+
+    Sources with no target within ``max_distance_m`` metres are left out.
+    """
+    labels, geometries = _projected(layer, sources)
+    positions, tree = layer.projected_index(target_types)
+    if not len(positions) or not len(geometries):
+        return pd.DataFrame({'source': [], 'target': [], 'distance_m': [], 'rank': []})
+
+    if k == 1:
+        (source_idx, target_idx), distances = tree.query_nearest(
+            geometries, max_distance=max_distance_m, return_distance=True, all_matches=False
+        )
+    else:
+        source_idx, target_idx = _k_nearest(tree, geometries, k, max_distance_m)
+        distances = shapely.distance(geometries[source_idx], tree.geometries[target_idx])
+
+    frame = _pairs_frame(labels, source_idx, positions, target_idx, distances)
+    frame['rank'] = frame.groupby('source', sort=False).cumcount() + 1
+    return frame[frame['rank'] <= k].reset_index(drop=True)
+
+def points_in_polygons(layer, polygons, target_types=None):
+    """Targets inside (or on the boundary of) each polygon.
+
+    Containment is tested in GIS_CRS against the layer's own spatial index,
+    so large polygons are not distorted by the projection.
+    """
+    polygons = _geoseries(polygons)
+    labels = polygons.index.to_numpy()
+    polygon_idx, target_idx = layer.gdf.sindex.query(polygons.to_crs(GIS_CRS).values, predicate='intersects')
+    if target_types:
+        keep = layer.gdf['type'].to_numpy()[target_idx] if 'type' in layer.gdf else np.full(len(target_idx), None)
+        keep = np.isin(keep, list(target_types))
+        polygon_idx, target_idx = polygon_idx[keep], target_idx[keep]
+    frame = pd.DataFrame({'polygon': labels[polygon_idx], 'target': target_idx})
+    return frame.sort_values(['polygon', 'target'], kind='stable').reset_index(drop=True)
+
+def layer_points(layer, types=None):
+    """Geometries of a layer's points of ``types`` (all when None), indexed by row position, for use as sources"""
+    gdf = layer.gdf
+    if types:
+        gdf = gdf[gdf['type'].isin(types)]
+    return gdf.geometry
@@ -0,0 +1,270 @@
+"""Logging configuration and sampled timing instrumentation.
+
+Configured from environment variables:
+
+* ``STORMWATER_LOG_LEVEL`` - root log level (default ``INFO``)
+* ``STORMWATER_LOG_FILE`` - rotating log file (default ``app.log``, empty to disable)
+* ``STORMWATER_LOG_MAX_BYTES`` / ``STORMWATER_LOG_BACKUPS`` - rotation size and count
+* ``STORMWATER_LOG_SAMPLE_RATE`` - share of DEBUG/INFO records kept from hot-path loggers
+* ``STORMWATER_TELEMETRY`` - set to ``0`` to turn timing collection off
+* ``STORMWATER_TELEMETRY_SAMPLE_RATE`` - share of calls timed (default 1.0)
+* ``STORMWATER_TELEMETRY_HOT_SAMPLE_RATE`` - share of calls timed in hot-path categories
+
+Functions are timed with the ``timed`` decorator or the ``timer`` context
+manager under a category (``scoring``, ``db``, ``json``, ``chart``, ``map``,
+``pdf``). Timings are aggregated in memory and written to the
+telemetry_metrics table by ``flush``.
+
+Page reruns are wrapped in ``page_timer``. While one is active every timed
+call on that thread is measured (not just sampled ones) and its exclusive
+time is added to the page's phase breakdown. Finished renders wait in a
+bounded ring buffer until ``flush`` writes them to page_render_timings.
+"""
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# Loggers whose DEBUG/INFO records are sampled rather than all written
+HOT_PATH_LOGGERS = ('utils.scoring', 'components.sunburst', 'views.dashboard')
+
+# Categories timed at the hot-path sample rate (called many times per rerun)
+HOT_PATH_CATEGORIES = ('scoring',)
+
+# Seconds between writes of aggregated timings to the database
+FLUSH_INTERVAL = 30
+
+# Page render phase columns of page_render_timings, by timing category
+PHASE_COLUMNS = {
+    'db': 'db_ms',
+    'json': 'json_ms',
+    'scoring': 'scoring_ms',
+    'chart': 'plotly_ms',
+    'map': 'folium_ms',
+    'pdf': 'pdf_ms'
+}
+
+# Unflushed page renders kept in memory; the oldest are dropped first
+RENDER_BUFFER_SIZE = 1000
+
+# Rows kept in page_render_timings; older renders are pruned on flush
+RENDER_HISTORY_LIMIT = 10000
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+class SamplingFilter(logging.Filter):
+    """Keep a random share of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+def configure_logging():
+    """Set up root logging once per process; safe to call on every Streamlit rerun"""
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        level = getattr(logging, os.environ.get('STORMWATER_LOG_LEVEL', 'INFO').upper(), logging.INFO)
+        root = logging.getLogger()
+        root.setLevel(level)
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        root.addHandler(console)
+
+        log_file = os.environ.get('STORMWATER_LOG_FILE', 'app.log')
+        if log_file:
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=int(_env_float('STORMWATER_LOG_MAX_BYTES', 1_000_000)),
+                backupCount=int(_env_float('STORMWATER_LOG_BACKUPS', 3)),
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+            root.addHandler(file_handler)
+
+        sampler = SamplingFilter(_env_float('STORMWATER_LOG_SAMPLE_RATE', 0.1))
+        for name in HOT_PATH_LOGGERS:
+            logging.getLogger(name).addFilter(sampler)
+        _logging_configured = True
+
+class Telemetry:
+    """Thread-safe in-memory aggregate of sampled timings keyed by (category, name)"""
+
+    def __init__(self):
+        self.enabled = os.environ.get('STORMWATER_TELEMETRY', '1') != '0'
+        self.sample_rate = _env_float('STORMWATER_TELEMETRY_SAMPLE_RATE', 1.0)
+        self.hot_sample_rate = _env_float('STORMWATER_TELEMETRY_HOT_SAMPLE_RATE', 0.1)
+        self._stats = {}
+        self._renders = deque(maxlen=RENDER_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def rate_for(self, category):
+        return self.hot_sample_rate if category in HOT_PATH_CATEGORIES else self.sample_rate
+
+    def should_sample(self, category):
+        return self.enabled and random.random() < self.rate_for(category)
+
+    def record(self, category, name, elapsed_ms):
+        with self._lock:
+            stats = self._stats.get((category, name))
+            if stats is None:
+                self._stats[(category, name)] = [1, elapsed_ms, elapsed_ms]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed_ms
+                stats[2] = max(stats[2], elapsed_ms)
+
+    def record_render(self, page, total_ms, phase_ms):
+        with self._lock:
+            self._renders.append((page, datetime.utcnow().isoformat(), total_ms, phase_ms))
+
+    def drain(self):
+        """Return and reset the aggregates as (category, name, samples, total_ms, max_ms, sample_rate) rows"""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+            self._last_flush = time.monotonic()
+        return [
+            (category, name, samples, total_ms, max_ms, self.rate_for(category))
+            for (category, name), (samples, total_ms, max_ms) in stats.items()
+        ]
+
+    def drain_renders(self):
+        """Return and clear the buffered (page, recorded_at, total_ms, phase_ms) renders"""
+        with self._lock:
+            renders = list(self._renders)
+            self._renders.clear()
+        return renders
+
+    def due(self):
+        return time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+
+telemetry = Telemetry()
+
+class RenderTrace:
+    """Exclusive time per phase for one page rerun; nested timers are not double counted"""
+
+    def __init__(self, page):
+        self.page = page
+        self.phase_ms = dict.fromkeys(PHASE_COLUMNS, 0.0)
+        self._child_ms = []
+
+    def enter(self):
+        self._child_ms.append(0.0)
+
+    def exit(self, category, elapsed_ms):
+        child_ms = self._child_ms.pop()
+        if category in self.phase_ms:
+            self.phase_ms[category] += elapsed_ms - child_ms
+        if self._child_ms:
+            self._child_ms[-1] += elapsed_ms
+
+_local = threading.local()
+
+@contextmanager
+def page_timer(page):
+    """Record the duration and phase breakdown of one page rerun"""
+    trace = RenderTrace(page) if telemetry.enabled else None
+    previous, _local.trace = getattr(_local, 'trace', None), trace
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+        if trace is not None:
+            telemetry.record_render(page, (time.perf_counter() - start) * 1000, trace.phase_ms)
+
+@contextmanager
+def timer(category, name):
+    """Time the enclosed block when this call is sampled or a page render is being traced"""
+    trace = getattr(_local, 'trace', None)
+    sampled = telemetry.should_sample(category)
+    if not sampled and trace is None:
+        yield
+        return
+    if trace is not None:
+        trace.enter()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if sampled:
+            telemetry.record(category, name, elapsed_ms)
+        if trace is not None:
+            trace.exit(category, elapsed_ms)
+
+def timed(category, name=None):
+    """Decorator timing calls of a function under ``category`` (see ``timer``)"""
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(category, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def flush(manager, force=False):
+    """Write aggregated timings and buffered page renders if the flush interval has passed.
+
+    Timings are added to telemetry_metrics; renders are appended to
+    page_render_timings, which is pruned to RENDER_HISTORY_LIMIT rows.
+    Returns the number of rows written.
+    """
+    if not force and not telemetry.due():
+        return 0
+    rows = telemetry.drain()
+    renders = telemetry.drain_renders()
+    if not rows and not renders:
+        return 0
+    updated_at = datetime.utcnow().isoformat()
+    phase_columns = list(PHASE_COLUMNS.values())
+    with manager.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO telemetry_metrics (category, name, samples, total_ms, max_ms, sample_rate, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (category, name) DO UPDATE SET
+                samples = samples + excluded.samples,
+                total_ms = total_ms + excluded.total_ms,
+                max_ms = MAX(max_ms, excluded.max_ms),
+                sample_rate = excluded.sample_rate,
+                updated_at = excluded.updated_at
+        """, [row + (updated_at,) for row in rows])
+        if renders:
+            conn.executemany(
+                "INSERT INTO page_render_timings (page, recorded_at, total_ms, {}) VALUES (?, ?, ?, {})".format(
+                    ', '.join(phase_columns), ', '.join('?' * len(phase_columns))
+                ),
+                [
+                    (page, recorded_at, total_ms) + tuple(phase_ms[category] for category in PHASE_COLUMNS)
+                    for page, recorded_at, total_ms, phase_ms in renders
+                ]
+            )
+            conn.execute("""
+                DELETE FROM page_render_timings
+                WHERE id <= (SELECT id FROM page_render_timings ORDER BY id DESC LIMIT 1 OFFSET ?)
+            """, (RENDER_HISTORY_LIMIT,))
+    return len(rows) + len(renders)
@@ -1,10 +1,29 @@
 import streamlit as st
-from utils.db import get_db
+from utils.db import (
+    read_connection, get_telemetry_metrics, reset_telemetry_metrics, flush_telemetry, get_page_render_timings
+)
 from utils.auth import create_user
 import pandas as pd
 from datetime import datetime, timedelta
 from components.org_tree import show_org_tree
 
+PHASE_LABELS = {
+    'db_ms': 'DB query',
+    'json_ms': 'JSON parse',
+    'scoring_ms': 'Scoring',
+    'plotly_ms': 'Plotly build',
+    'folium_ms': 'Folium build',
+    'pdf_ms': 'PDF build',
+    'other_ms': 'Other'
+}
+
+PERFORMANCE_WINDOWS = {
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "All": None
+}
+
 def show():
     if not st.session_state.get("is_admin", False):
         st.error("Unauthorized access")
@@ -13,7 +32,7 @@ def show():
     st.title("Admin Panel")
 
     # Create tabs for different admin sections
-    tabs = st.tabs(["Organization Tree", "User Management", "Activity Timeline", "System Statistics"])
+    tabs = st.tabs(["Organization Tree", "User Management", "Activity Timeline", "System Statistics", "Performance", "Telemetry"])
 
     with tabs[0]:
         show_org_tree()
@@ -27,6 +46,12 @@ def show():
     with tabs[3]:
         show_system_statistics()
 
+    with tabs[4]:
+        show_performance()
+
+    with tabs[5]:
+        show_telemetry()
+
 def show_user_management():
     st.header("User Management")
 
@@ -45,23 +70,23 @@ def show_user_management():
 
     # View users
     st.subheader("Existing Users")
-    db = get_db()
-    c = db.cursor()
-
-    # Get users with their project count and last activity
-    c.execute("""
-        SELECT 
-            u.id,
-            u.username,
-            u.is_admin,
-            COUNT(DISTINCT pm.project_id) as project_count,
-            MAX(al.timestamp) as last_activity
-        FROM users u
-        LEFT JOIN project_members pm ON u.id = pm.user_id
-        LEFT JOIN activity_log al ON u.id = al.user_id
-        GROUP BY u.id, u.username, u.is_admin
-    """)
-    users = c.fetchall()
+    with read_connection() as db:
+        c = db.cursor()
+
+        # Get users with their project count and last activity
+        c.execute("""
+            SELECT 
+                u.id,
+                u.username,
+                u.is_admin,
+                COUNT(DISTINCT pm.project_id) as project_count,
+                MAX(al.timestamp) as last_activity
+            FROM users u
+            LEFT JOIN project_members pm ON u.id = pm.user_id
+            LEFT JOIN activity_log al ON u.id = al.user_id
+            GROUP BY u.id, u.username, u.is_admin
+        """)
+        users = c.fetchall()
 
     if users:
         user_data = []
@@ -96,25 +121,25 @@ def show_activity_timeline():
         )
 
     # Get filtered activities
-    db = get_db()
-    c = db.cursor()
-    c.execute("""
-        SELECT 
-            al.timestamp,
-            u.username,
-            p.name as project_name,
-            al.action_type,
-            al.action_details
-        FROM activity_log al
-        JOIN users u ON al.user_id = u.id
-        JOIN projects p ON al.project_id = p.id
-        WHERE al.timestamp > ?
-        AND al.action_type IN ({})
-        ORDER BY al.timestamp DESC
-    """.format(','.join(['?']*len(activity_type))),
-        [datetime.now() - timedelta(days=days)] + activity_type
-    )
-    activities = c.fetchall()
+    with read_connection() as db:
+        c = db.cursor()
+        c.execute("""
+            SELECT 
+                al.timestamp,
+                u.username,
+                p.name as project_name,
+                al.action_type,
+                al.action_details
+            FROM activity_log al
+            JOIN users u ON al.user_id = u.id
+            JOIN projects p ON al.project_id = p.id
+            WHERE al.timestamp > ?
+            AND al.action_type IN ({})
+            ORDER BY al.timestamp DESC
+        """.format(','.join(['?']*len(activity_type))),
+            [datetime.now() - timedelta(days=days)] + activity_type
+        )
+        activities = c.fetchall()
 
     if activities:
         for activity in activities:
@@ -128,39 +153,125 @@ def show_activity_timeline():
 def show_system_statistics():
     st.header("System Statistics")
 
-    db = get_db()
-    c = db.cursor()
+    with read_connection() as db:
+        c = db.cursor()
+
+        # Create a 3-column layout
+        col1, col2, col3 = st.columns(3)
 
-    # Create a 3-column layout
-    col1, col2, col3 = st.columns(3)
+        with col1:
+            c.execute("SELECT COUNT(*) as count FROM assessments")
+            assessment_count = c.fetchone()["count"]
+            st.metric("Total Assessments", assessment_count)
 
+        with col2:
+            c.execute("SELECT COUNT(*) as count FROM users")
+            user_count = c.fetchone()["count"]
+            st.metric("Total Users", user_count)
+
+        with col3:
+            c.execute("SELECT COUNT(*) as count FROM projects")
+            project_count = c.fetchone()["count"]
+            st.metric("Active Projects", project_count)
+
+        # Activity trends
+        st.subheader("Activity Trends")
+        c.execute("""
+            SELECT 
+                DATE(timestamp) as date,
+                COUNT(*) as count
+            FROM activity_log
+            GROUP BY DATE(timestamp)
+            ORDER BY date DESC
+            LIMIT 10
+        """)
+        activity_data = c.fetchall()
+        if activity_data:
+            chart_data = pd.DataFrame(activity_data)
+            st.line_chart(chart_data.set_index('date'))
+
+def show_performance():
+    st.header("Performance")
+    st.caption("Server-side time spent rendering each page per rerun, broken down by phase")
+
+    col1, col2 = st.columns(2)
     with col1:
-        c.execute("SELECT COUNT(*) as count FROM assessments")
-        assessment_count = c.fetchone()["count"]
-        st.metric("Total Assessments", assessment_count)
+        window = st.selectbox("Time window", list(PERFORMANCE_WINDOWS), index=1)
+    with col2:
+        bucket = st.selectbox("Group by", ["Hour", "Day"], index=1)
 
+    # Include renders still waiting in this process's buffer
+    flush_telemetry(force=True)
+    since = datetime.utcnow() - PERFORMANCE_WINDOWS[window] if PERFORMANCE_WINDOWS[window] else None
+    renders = get_page_render_timings(since=since)
+    if not renders:
+        st.info("No page renders recorded yet")
+        return
+
+    df = pd.DataFrame(renders)
+    df['recorded_at'] = pd.to_datetime(df['recorded_at'])
+    phase_columns = [col for col in PHASE_LABELS if col != 'other_ms']
+    df['other_ms'] = (df['total_ms'] - df[phase_columns].sum(axis=1)).clip(lower=0)
+
+    # p50/p95 of the total and of every phase, per page
+    st.subheader("Rerun Time by Page (ms)")
+    grouped = df.groupby('page')
+    summary = pd.DataFrame({'Reruns': grouped.size()})
+    for column, label in [('total_ms', 'Total')] + list(PHASE_LABELS.items()):
+        summary[f'{label} p50'] = grouped[column].quantile(0.5)
+        summary[f'{label} p95'] = grouped[column].quantile(0.95)
+    st.dataframe(summary.round(1), use_container_width=True)
+
+    st.subheader("Median Phase Breakdown")
+    breakdown = grouped[list(PHASE_LABELS)].median().rename(columns=PHASE_LABELS)
+    st.bar_chart(breakdown)
+
+    st.subheader("Rerun Time Over Time")
+    page = st.selectbox("Page", sorted(df['page'].unique()))
+    page_df = df[df['page'] == page].set_index('recorded_at')
+    resampled = page_df['total_ms'].resample('h' if bucket == "Hour" else 'D')
+    trend = pd.DataFrame({
+        'p50 (ms)': resampled.quantile(0.5),
+        'p95 (ms)': resampled.quantile(0.95)
+    }).dropna()
+    st.line_chart(trend)
+
+def show_telemetry():
+    st.header("Telemetry")
+    st.caption("Sampled per-function timings for scoring, database calls, charts, maps and PDF generation")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Flush pending timings"):
+            flush_telemetry(force=True)
     with col2:
-        c.execute("SELECT COUNT(*) as count FROM users")
-        user_count = c.fetchone()["count"]
-        st.metric("Total Users", user_count)
-
-    with col3:
-        c.execute("SELECT COUNT(*) as count FROM projects")
-        project_count = c.fetchone()["count"]
-        st.metric("Active Projects", project_count)
-
-    # Activity trends
-    st.subheader("Activity Trends")
-    c.execute("""
-        SELECT 
-            DATE(timestamp) as date,
-            COUNT(*) as count
-        FROM activity_log
-        GROUP BY DATE(timestamp)
-        ORDER BY date DESC
-        LIMIT 10
-    """)
-    activity_data = c.fetchall()
-    if activity_data:
-        chart_data = pd.DataFrame(activity_data)
-        st.line_chart(chart_data.set_index('date'))
\ No newline at end of file
+        if st.button("Reset timings"):
+            reset_telemetry_metrics()
+            st.success("Telemetry metrics cleared")
+
+    metrics = get_telemetry_metrics()
+    if not metrics:
+        st.info("No timings recorded yet")
+        return
+
+    df = pd.DataFrame(metrics)
+    categories = st.multiselect("Categories", sorted(df['category'].unique()), default=sorted(df['category'].unique()))
+    df = df[df['category'].isin(categories)]
+
+    st.dataframe(
+        df[['category', 'name', 'estimated_calls', 'samples', 'mean_ms', 'max_ms', 'total_ms', 'updated_at']].rename(columns={
+            'category': 'Category',
+            'name': 'Function',
+            'estimated_calls': 'Est. Calls',
+            'samples': 'Samples',
+            'mean_ms': 'Mean (ms)',
+            'max_ms': 'Max (ms)',
+            'total_ms': 'Sampled Total (ms)',
+            'updated_at': 'Last Updated'
+        }).round(2),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    by_category = df.groupby('category')['total_ms'].sum()
+    st.bar_chart(by_category)
@@ -7,11 +7,14 @@ from components.forms import (
     environmental_social_form,
     infrastructure_location_form
 )
-from components.heat_map import create_risk_heat_map
+from components.heat_map import create_risk_heat_map, risk_input_digest
+from components.map_cache import show_cached_map
+from components.map_view import MAP_TILES, MAP_ZOOM
+from components.downloads import show_file_download
 from utils.db import save_assessment, get_user_projects
-from utils.report import generate_report
+from utils.report import get_or_generate_report
 from datetime import datetime
-from streamlit_folium import folium_static
+from utils.telemetry import timer
 
 def show():
     st.title("Infrastructure Assessment")
@@ -68,8 +71,11 @@ def show():
             'environmental_social': env_social_data
         }
         if current_assessment['infrastructure_points']:
-            risk_map = create_risk_heat_map(current_assessment)
-            folium_static(risk_map)
+            with timer('map', 'views.assessment.risk_heat_map'):
+                # Unsaved drafts are keyed by their risk inputs, so tab switches
+                # and edits elsewhere in the form reuse the rendered map
+                digest = risk_input_digest(current_assessment, current_assessment['infrastructure_points'])
+                show_cached_map((digest, 'risk_heat', MAP_TILES, MAP_ZOOM), lambda: create_risk_heat_map(current_assessment))
         else:
             st.info("Add infrastructure points in the 'Infrastructure Points' tab to view the risk heat map")
 
@@ -90,11 +96,11 @@ def show():
             assessment_id = save_assessment(assessment_data)
             st.success("Assessment saved successfully!")
 
-            report_buffer = generate_report(assessment_data)
+            report_path = get_or_generate_report(assessment_id, assessment_data, project_name=selected_project['name'])
 
-            st.download_button(
+            show_file_download(
+                report_path,
                 label="Download Assessment Report",
-                data=report_buffer,
                 file_name=f"assessment_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                 mime="application/pdf"
             )
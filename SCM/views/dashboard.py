@@ -1,199 +1,17 @@
 import streamlit as st
-from utils.db import get_assessments, get_user_projects
-from datetime import datetime, timedelta
+from utils.db import get_assessments, get_user_projects, get_historical_metrics, get_project_kpis, refresh_project_scores
+from utils.scoring import cached_overall_score
+from components.downloads import show_file_download
+from datetime import datetime
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import logging
+from utils.telemetry import timed
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def calculate_overall_score(assessment_data):
-    """Calculate overall infrastructure score (0-10)"""
-    try:
-        # Initialize domain scores
-        domain_scores = []
-        domain_weights = {
-            'condition': 0.30,         # 30% weight for condition
-            'functionality': 0.25,     # 25% weight for functionality
-            'time_effectiveness': 0.15, # 15% weight for time effectiveness
-            'cost_effectiveness': 0.15, # 15% weight for cost effectiveness
-            'environmental_social': 0.15 # 15% weight for environmental/social
-        }
-        
-        # 1. Get Condition Score - from OSAC rating if available
-        try:
-            condition_score = assessment_data.get('condition', {}).get('OSAC', {}).get('score')
-            if condition_score is None:
-                # Fall back to calculating from damage levels if OSAC not available
-                damage_levels = assessment_data.get('condition', {}).get('stormwaterHydraulicAssetCondition', {}).get('damageLevels', {})
-                if damage_levels:
-                    # Calculate based on damage levels (old method)
-                    damage_score = sum(1 if (v == "low" or v.get('condition', '') == "low") 
-                                    else 2 if (v == "moderate" or v.get('condition', '') == "moderate") 
-                                    else 3 for v in damage_levels.values())
-                    max_score = 3 * len(damage_levels) if len(damage_levels) > 0 else 1
-                    condition_score = int(10 - (damage_score / max_score * 10))
-                else:
-                    condition_score = 5  # Default if no data
-            domain_scores.append(('condition', condition_score, domain_weights['condition']))
-        except Exception as e:
-            logger.error(f"Error calculating condition score: {e}")
-            domain_scores.append(('condition', 5, domain_weights['condition']))
-        
-        # 2. Get Functionality Score
-        try:
-            functionality_score = assessment_data.get('functionality', {}).get('overallFunctionality', {}).get('score')
-            if functionality_score is None:
-                # Calculate from hydraulic and hydrological performance if available
-                hp_data = assessment_data.get('functionality', {}).get('hydraulicPerformance', {})
-                dp_data = assessment_data.get('functionality', {}).get('hydrologicalPerformance', {})
-                
-                if hp_data and 'flowAttenuation' in hp_data and 'volumeReduction' in hp_data:
-                    hp_score = (hp_data['flowAttenuation'] + hp_data['volumeReduction']) / 20
-                    dp_score = 5  # Default hydrological score
-                    
-                    if dp_data and 'runoffFrequency' in dp_data and 'baseFlowPerformance' in dp_data:
-                        dp_score = (dp_data['runoffFrequency'] + dp_data['baseFlowPerformance']) / 20
-                        
-                    functionality_score = int((hp_score + dp_score) / 2)
-                else:
-                    functionality_score = 5  # Default if no data
-            domain_scores.append(('functionality', functionality_score, domain_weights['functionality']))
-        except Exception as e:
-            logger.error(f"Error calculating functionality score: {e}")
-            domain_scores.append(('functionality', 5, domain_weights['functionality']))
-        
-        # 3. Get Time Effectiveness Score
-        try:
-            time_score = assessment_data.get('time_effectiveness', {}).get('overallTimeScore')
-            if time_score is None:
-                # Calculate from time metrics if available
-                time_data = assessment_data.get('time_effectiveness', {})
-                
-                if 'longTermFunctionality' in time_data and 'lagTimePerformance' in time_data:
-                    long_term_score = time_data['longTermFunctionality'] / 10
-                    lag_time_score = time_data['lagTimePerformance'] / 10
-                    
-                    if 'monitoringFrequency' in time_data:
-                        monitoring_scores = {
-                            "Continuous (real-time)": 10,
-                            "Daily": 8,
-                            "Weekly": 7,
-                            "Monthly": 5,
-                            "Quarterly": 3,
-                            "Annually": 1
-                        }
-                        monitoring_score = monitoring_scores.get(time_data['monitoringFrequency'], 5) / 10
-                        time_score = int((long_term_score * 0.4) + (lag_time_score * 0.4) + (monitoring_score * 0.2) * 10)
-                    else:
-                        time_score = int((long_term_score + lag_time_score) / 2 * 10)
-                else:
-                    # Old calculation
-                    lifespan = time_data.get('lifespan', 25)
-                    maintenance_lag = time_data.get('maintenanceLagTime', 30)
-                    
-                    # Normalize lifespan (0-50 years scale)
-                    lifespan_score = min(lifespan / 50, 1.0) 
-                    
-                    # Normalize maintenance lag (0-365 days scale, lower is better)
-                    maintenance_score = max(0, 1 - (maintenance_lag / 365))
-                    
-                    time_score = int((lifespan_score * 0.7 + maintenance_score * 0.3) * 10)
-            domain_scores.append(('time_effectiveness', time_score, domain_weights['time_effectiveness']))
-        except Exception as e:
-            logger.error(f"Error calculating time score: {e}")
-            domain_scores.append(('time_effectiveness', 5, domain_weights['time_effectiveness']))
-        
-        # 4. Get Cost Effectiveness Score
-        try:
-            cost_score = assessment_data.get('cost_effectiveness', {}).get('overallCostScore')
-            if cost_score is None:
-                # Calculate from cost metrics if available
-                cost_data = assessment_data.get('cost_effectiveness', {})
-                
-                if 'benefitCostRatio' in cost_data and 'roi' in cost_data:
-                    bcr = cost_data['benefitCostRatio']
-                    roi = cost_data['roi']
-                    
-                    # Normalize BCR (1.0 is break-even, 3.0 is excellent)
-                    bcr_score = min(bcr / 3, 1.0)
-                    
-                    # Normalize ROI (-100% to 200% scale)
-                    roi_score = min(max((roi + 100) / 300, 0), 1.0)
-                    
-                    cost_score = int((bcr_score * 0.6 + roi_score * 0.4) * 10)
-                else:
-                    # Old calculation
-                    roi = cost_data.get('roi', 10)
-                    # Normalize ROI (-100% to 100% scale)
-                    cost_score = int(min((roi + 100) / 200, 1.0) * 10)
-            domain_scores.append(('cost_effectiveness', cost_score, domain_weights['cost_effectiveness']))
-        except Exception as e:
-            logger.error(f"Error calculating cost score: {e}")
-            domain_scores.append(('cost_effectiveness', 5, domain_weights['cost_effectiveness']))
-        
-        # 5. Get Environmental/Social Score
-        try:
-            env_score = assessment_data.get('environmental_social', {}).get('overallScore')
-            if env_score is None:
-                # Calculate from environmental metrics if available
-                env_data = assessment_data.get('environmental_social', {})
-                
-                if 'pollutantConcentrationAttenuation' in env_data and 'eventBasedPollutantRemoval' in env_data:
-                    # New format with updated field names
-                    env_performance = (env_data['pollutantConcentrationAttenuation'] + 
-                                     env_data.get('eventBasedPollutantRemoval', 0) + 
-                                     env_data.get('pollutionRetentionPerformance', 0)) / 30
-                    
-                    # Social components
-                    social_components = []
-                    if 'customerSatisfaction' in env_data:
-                        social_components.append(env_data['customerSatisfaction'] / 10)
-                    
-                    if 'communityEngagement' in env_data:
-                        engagement_scores = {
-                            "None": 0, "Minimal": 3, "Moderate": 5, 
-                            "Extensive": 8, "Comprehensive": 10
-                        }
-                        social_components.append(engagement_scores.get(env_data['communityEngagement'], 5) / 10)
-                    
-                    if social_components:
-                        social_score = sum(social_components) / len(social_components)
-                        env_score = int((env_performance * 0.7 + social_score * 0.3) * 10)
-                    else:
-                        env_score = int(env_performance * 10)
-                else:
-                    # Old format
-                    pollution_reduction = env_data.get('pollutantConcentrationReduction', 50)
-                    satisfaction = env_data.get('customerSatisfaction', 5)
-                    retention = env_data.get('pollutionRetention', 60)
-                    
-                    env_score = int((pollution_reduction + retention) / 20 + satisfaction)
-            domain_scores.append(('environmental_social', env_score, domain_weights['environmental_social']))
-        except Exception as e:
-            logger.error(f"Error calculating environmental score: {e}")
-            domain_scores.append(('environmental_social', 5, domain_weights['environmental_social']))
-        
-        # Calculate weighted average of domain scores
-        total_weight = sum(weight for _, _, weight in domain_scores)
-        if total_weight > 0:
-            weighted_sum = sum(score * weight for _, score, weight in domain_scores)
-            overall_score = weighted_sum / total_weight
-        else:
-            # Default if no weights
-            overall_score = sum(score for _, score, _ in domain_scores) / len(domain_scores) if domain_scores else 5.0
-            
-        # Log the score calculation for debugging
-        logger.debug(f"Domain scores: {domain_scores}")
-        logger.debug(f"Overall score: {overall_score}")
-        
-        return round(overall_score, 1)
-    except Exception as e:
-        logger.error(f"Error calculating overall score: {e}", exc_info=True)
-        return 5.0  # Default score if calculation fails
-
+@timed('chart')
 def create_condition_chart(assessment_data):
     """Create a bar chart showing infrastructure conditions"""
     try:
@@ -312,9 +130,10 @@ def create_condition_chart(assessment_data):
             
         return fig
     except Exception as e:
-        logger.error(f"Error creating condition chart: {e}", exc_info=True)
+        logger.error("Error creating condition chart: %s", e, exc_info=True)
         return None
 
+@timed('chart')
 def create_performance_chart(assessment_data):
     """Create a radar chart for performance metrics"""
     try:
@@ -437,9 +256,10 @@ def create_performance_chart(assessment_data):
         
         return fig
     except Exception as e:
-        logger.error(f"Error creating performance chart: {e}")
+        logger.error("Error creating performance chart: %s", e)
         return None
 
+@timed('chart')
 def create_environmental_chart(assessment_data):
     """Create a pie chart for environmental metrics"""
     try:
@@ -498,7 +318,7 @@ def create_environmental_chart(assessment_data):
         
         return fig
     except Exception as e:
-        logger.error(f"Error creating environmental chart: {e}")
+        logger.error("Error creating environmental chart: %s", e)
         return None
 
 def show():
@@ -556,9 +376,9 @@ def show():
             format_func=lambda x: x['name']
         )
 
-        # Get project's assessments
-        assessments = get_assessments(project_id=selected_project['id'])
-        if not assessments:
+        # Only the newest assessment is needed in full; totals and trends come from assessment_metrics
+        latest_row = get_assessments(project_id=selected_project['id'], latest_only=True)
+        if not latest_row:
             # Enhanced no assessments message
             st.markdown(f"""
             <div style="text-align: center; padding: 30px; background-color: #f8f9fa; border-radius: 10px; margin: 20px 0; border: 1px dashed #ddd;">
@@ -572,7 +392,7 @@ def show():
             """, unsafe_allow_html=True)
             return
 
-        latest_assessment = assessments[0]['data'] if assessments else None
+        latest_assessment = latest_row['data']
         if not latest_assessment:
             st.error("Could not load assessment data")
             return
@@ -585,7 +405,7 @@ def show():
         """, unsafe_allow_html=True)
         
         # Calculate the overall score and get rating
-        overall_score = calculate_overall_score(latest_assessment)
+        overall_score = cached_overall_score(latest_assessment, latest_row['id'])
         
         # Enhanced score color scale
         if overall_score >= 8:
@@ -679,8 +499,11 @@ def show():
             </div>
             """, unsafe_allow_html=True)
 
+        # Card totals come from the indexed metrics table rather than the JSON rows
+        kpis = get_project_kpis(selected_project['id'])
+
         with col2:
-            assessments_count = len(assessments)
+            assessments_count = kpis['total_assessments']
             
             st.markdown(f"""
             <div class="metric-card">
@@ -692,13 +515,7 @@ def show():
             """, unsafe_allow_html=True)
 
         with col3:
-            try:
-                recent = [a for a in assessments if 
-                        datetime.fromisoformat(a['timestamp']) > datetime.now() - timedelta(days=30)]
-                recent_count = len(recent)
-            except Exception as e:
-                logger.error(f"Error calculating recent assessments: {e}")
-                recent_count = "N/A"
+            recent_count = kpis['recent_assessments']
                 
             st.markdown(f"""
             <div class="metric-card">
@@ -710,7 +527,7 @@ def show():
             """, unsafe_allow_html=True)
 
         with col4:
-            latest_date = datetime.fromisoformat(assessments[0]['timestamp'])
+            latest_date = datetime.fromisoformat(kpis['latest_timestamp'] or latest_row['timestamp'])
             formatted_date = latest_date.strftime("%b %d")
             
             st.markdown(f"""
@@ -777,49 +594,31 @@ def show():
         # Infrastructure Map
         st.header("Infrastructure Locations")
         from components.map_view import show_infrastructure_map
-        if 'infrastructure_points' in latest_assessment:
-            show_infrastructure_map(latest_assessment)
+        show_infrastructure_map(latest_assessment, assessment_id=latest_row['id'])
 
         # Historical Trends
         st.header("Historical Assessment Trends")
         
-        # Prepare data for historical trends
-        trend_data = []
-        for assessment in assessments:
-            date = datetime.fromisoformat(assessment['timestamp'])
-            assessment_data = assessment['data']
-            
-            # Calculate overall score for this assessment
-            overall_score = calculate_overall_score(assessment_data)
-            
-            # Extract domain scores
-            domain_scores = {
-                'condition': assessment_data.get('condition', {}).get('OSAC', {}).get('score', None),
-                'functionality': assessment_data.get('functionality', {}).get('overallFunctionality', {}).get('score', None),
-                'time_effectiveness': assessment_data.get('time_effectiveness', {}).get('overallTimeScore', None),
-                'cost_effectiveness': assessment_data.get('cost_effectiveness', {}).get('overallCostScore', None),
-                'environmental_social': assessment_data.get('environmental_social', {}).get('overallScore', None)
-            }
-            
-            # Add record with all available scores
-            trend_record = {
-                'date': date,
-                'overall_score': overall_score
-            }
-            
-            # Add domain scores (if available)
-            for domain, score in domain_scores.items():
-                if score is not None:
-                    trend_record[domain.replace('_', ' ').title()] = score
-            
-            trend_data.append(trend_record)
-        
-        if trend_data:
-            # Sort by date
-            trend_data.sort(key=lambda x: x['date'])
-            
-            # Convert to DataFrame for Plotly
-            df = pd.DataFrame(trend_data)
+        # Prepare data for historical trends from the pre-computed score projection
+        refresh_project_scores(selected_project['id'])
+        trend_rows = get_historical_metrics(selected_project['id'])
+        trend_data = pd.DataFrame(trend_rows)
+        if not trend_data.empty:
+            trend_data = trend_data.rename(columns={
+                'timestamp': 'date',
+                'condition_score': 'Condition',
+                'functionality_score': 'Functionality',
+                'time_score': 'Time Effectiveness',
+                'cost_score': 'Cost Effectiveness',
+                'environmental_score': 'Environmental Social'
+            }).drop(columns=['assessment_id'])
+            trend_data['date'] = pd.to_datetime(trend_data['date'])
+            # Keep only the domain scores that were recorded for at least one assessment
+            trend_data = trend_data.dropna(axis=1, how='all')
+
+        if not trend_data.empty:
+            # Already sorted by date in SQL
+            df = trend_data
             
             # Check if we have multiple assessments for trends
             if len(df) > 1:
@@ -887,20 +686,20 @@ def show():
         st.header("Export Options")
         if st.button("Generate Assessment Report"):
             try:
-                from utils.report import generate_report
+                from utils.report import get_or_generate_report
                 with st.spinner("Generating comprehensive report..."):
-                    report_buffer = generate_report(latest_assessment, project_name=selected_project['name'])
+                    report_path = get_or_generate_report(latest_row['id'], latest_assessment, project_name=selected_project['name'])
                     st.success("Report generated successfully!")
-                    st.download_button(
+                    show_file_download(
+                        report_path,
                         label="📥 Download Assessment Report",
-                        data=report_buffer,
                         file_name=f"assessment_report_{selected_project['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
                         mime="application/pdf"
                     )
             except Exception as e:
-                logger.error(f"Error generating report: {e}")
+                logger.error("Error generating report: %s", e)
                 st.error("Failed to generate report. Please try again.")
 
     except Exception as e:
-        logger.error(f"Error in dashboard: {e}")
+        logger.error("Error in dashboard: %s", e)
         st.error("An error occurred while loading the dashboard. Please try again.")
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.documentation_generator import generate_user_manual
+from utils.documentation_generator import get_user_manual
+from components.downloads import show_file_download
 from datetime import datetime
 
 def show():
@@ -10,10 +11,9 @@ def show():
     
     with col2:
         st.markdown("### User Manual")
-        user_manual = generate_user_manual()
-        st.download_button(
+        show_file_download(
+            get_user_manual(),
             label="📚 Download Complete Manual",
-            data=user_manual,
             file_name=f"stormwater_assessment_manual_{datetime.now().strftime('%Y%m%d')}.pdf",
             mime="application/pdf",
             help="Download a comprehensive user manual with detailed instructions and technical documentation",
@@ -3,11 +3,24 @@ from utils.db import (
     create_project,
     add_project_member,
     get_user_projects,
-    get_db,
-    get_assessments
+    read_connection,
+    get_assessments,
+    count_assessments,
+    import_infrastructure_points
 )
-from datetime import datetime
-from utils.report import generate_report
+from datetime import datetime, timedelta
+from utils.report import get_cached_report, get_or_generate_report
+from utils.report_export import start_export, get_export_job
+from utils.point_import import IMPORT_FORMATS, detect_format
+from components.forms import show_import_result
+from components.downloads import show_file_download
+from components.gis_integration import show_gis_dashboard
+
+# Seconds between progress refreshes while a bulk export is running
+EXPORT_POLL_INTERVAL = 2
+
+# Assessments shown per page in each project tab
+ASSESSMENTS_PAGE_SIZE = 10
 
 def show():
     # Add a more attractive header with subtitle
@@ -65,10 +78,10 @@ def show():
                     # Project management options for admins
                     with st.expander("Manage Members"):
                         # Get all users
-                        db = get_db()
-                        c = db.cursor()
-                        c.execute("SELECT id, username FROM users")
-                        users = c.fetchall()
+                        with read_connection() as db:
+                            c = db.cursor()
+                            c.execute("SELECT id, username FROM users")
+                            users = c.fetchall()
 
                         # Add member form
                         new_member = st.selectbox(
@@ -86,6 +99,8 @@ def show():
                             except Exception as e:
                                 st.error(f"Failed to add member: {str(e)}")
 
+                    show_inventory_import(project)
+
             # Add a divider before assessments section
             st.markdown('<hr style="margin: 30px 0 20px 0; height: 1px; border: none; background-color: #ecf0f1;">', unsafe_allow_html=True)
             
@@ -97,17 +112,36 @@ def show():
             </div>
             """, unsafe_allow_html=True)
             
-            assessments = get_assessments(project_id=project['id'])
+            assessment_count = count_assessments(project_id=project['id'])
 
-            if assessments:
+            if assessment_count:
                 # Show assessment count
                 st.markdown(f"""
                 <div style="margin-bottom: 20px; padding: 8px 15px; background-color: #f8f9fa; border-radius: 5px; display: inline-block;">
                     <span style="color: #7f8c8d; font-weight: 500;">Total Assessments:</span> 
-                    <span style="color: #2c3e50; font-weight: 600; font-size: 1.1em; margin-left: 5px;">{len(assessments)}</span>
+                    <span style="color: #2c3e50; font-weight: 600; font-size: 1.1em; margin-left: 5px;">{assessment_count}</span>
                 </div>
                 """, unsafe_allow_html=True)
 
+                show_report_export(project)
+
+                # Only load the current page of assessments
+                page_count = (assessment_count + ASSESSMENTS_PAGE_SIZE - 1) // ASSESSMENTS_PAGE_SIZE
+                page = 1
+                if page_count > 1:
+                    page = st.number_input(
+                        f"Page (1-{page_count})",
+                        min_value=1,
+                        max_value=page_count,
+                        value=1,
+                        key=f"assessment_page_{project['id']}"
+                    )
+                assessments = get_assessments(
+                    project_id=project['id'],
+                    limit=ASSESSMENTS_PAGE_SIZE,
+                    offset=(page - 1) * ASSESSMENTS_PAGE_SIZE
+                )
+
                 # Create assessment table with more structured data
                 assessment_data = []
                 for assessment in assessments:
@@ -144,7 +178,7 @@ def show():
                             
                             try:
                                 # Create a tab system to view assessment details or download report
-                                view_tab, report_tab = st.tabs(["📊 View Assessment", "📄 Download Report"])
+                                view_tab, report_tab, gis_tab = st.tabs(["📊 View Assessment", "📄 Download Report", "🗺️ GIS"])
                                 
                                 with view_tab:
                                     # Get assessment data
@@ -245,24 +279,35 @@ def show():
                                     </div>
                                     """, unsafe_allow_html=True)
                                     
-                                    # Generate report
-                                    report_buffer = generate_report(
-                                        assessment["Download"]['data'],
-                                        project_name=project['name']
-                                    )
+                                    # Only build the PDF when asked for; later requests are served from disk
+                                    assessment_id = assessment["Download"]['id']
+                                    report_path = get_cached_report(assessment_id, assessment["Download"]['data'], project['name'])
                                     
                                     # Center the download button and make it more prominent
                                     col_left, col_middle, col_right = st.columns([1, 2, 1])
                                     
                                     with col_middle:
-                                        st.download_button(
-                                            label="📥 Download Full PDF Report",
-                                            data=report_buffer,
-                                            file_name="assessment_report.pdf",
-                                            mime="application/pdf",
-                                            key=f"download_{project['id']}_{idx}",
-                                            type="primary"
-                                        )
+                                        if report_path is None and st.button(
+                                            "⚙️ Prepare PDF Report",
+                                            key=f"prepare_report_{project['id']}_{assessment_id}",
+                                            use_container_width=True
+                                        ):
+                                            with st.spinner("Generating report..."):
+                                                report_path = get_or_generate_report(
+                                                    assessment_id,
+                                                    assessment["Download"]['data'],
+                                                    project_name=project['name']
+                                                )
+                                        
+                                        if report_path is not None:
+                                            show_file_download(
+                                                report_path,
+                                                label="📥 Download Full PDF Report",
+                                                file_name=f"assessment_report_{assessment_id}.pdf",
+                                                mime="application/pdf",
+                                                key=f"download_{project['id']}_{idx}",
+                                                type="primary"
+                                            )
                                     
                                     # Add feature highlights
                                     st.markdown("<h4 style='color:#2c3e50; margin:25px 0 15px 0;'>Report Features</h4>", unsafe_allow_html=True)
@@ -283,6 +328,18 @@ def show():
                                         - ✅ Infrastructure graphics
                                         - ✅ Maintenance recommendations
                                         """)
+
+                                with gis_tab:
+                                    # Maps and spatial indexes are only built when asked for
+                                    assessment_id = assessment["Download"]['id']
+                                    gis_key = f"gis_{project['id']}_{assessment_id}"
+                                    if st.toggle("Open GIS view", key=f"{gis_key}_open"):
+                                        show_gis_dashboard(
+                                            assessment["Download"]['data'],
+                                            assessment_id=assessment_id,
+                                            project_id=project['id'],
+                                            key=gis_key
+                                        )
                             except Exception as e:
                                 # Error handling with better styling
                                 st.markdown(f"""
@@ -331,4 +388,98 @@ def show():
                                     else:
                                         st.info("No environmental & social impact data available")
             else:
-                st.info("No assessments have been created for this project yet.")
\ No newline at end of file
+                st.info("No assessments have been created for this project yet.")
+
+def show_inventory_import(project):
+    """Bulk import an asset inventory file into the project's infrastructure points"""
+    with st.expander("Import Infrastructure Inventory"):
+        st.caption("Imported points belong to the project and appear on the map of each of its assessments")
+        uploaded = st.file_uploader(
+            "Inventory file",
+            type=['csv', 'geojson', 'json', 'zip'],
+            key=f"inventory_file_{project['id']}",
+            help="CSV with latitude/longitude columns, GeoJSON, or a zipped Shapefile of points"
+        )
+        if uploaded is not None and st.button("Import Points", key=f"import_points_{project['id']}"):
+            fmt = detect_format(uploaded.name)
+            if fmt is None:
+                st.error(f"Unsupported file type; use one of: {', '.join(IMPORT_FORMATS.values())}")
+            else:
+                result = import_infrastructure_points(project['id'], uploaded, fmt)
+                if result is not None:
+                    show_import_result(result)
+
+def show_report_export(project):
+    """Start a bulk report export for a project and show the progress of the last one"""
+    job_key = f"export_job_{project['id']}"
+
+    with st.expander("📦 Export All Reports"):
+        col1, col2 = st.columns(2)
+        with col1:
+            date_range = st.date_input(
+                "Assessment dates",
+                value=(),
+                key=f"export_dates_{project['id']}",
+                help="Leave empty to export every assessment in the project"
+            )
+        with col2:
+            export_format = st.radio(
+                "Format",
+                options=['zip', 'pdf'],
+                format_func=lambda f: "ZIP of PDFs" if f == 'zip' else "Single PDF with contents",
+                key=f"export_format_{project['id']}"
+            )
+
+        if st.button("Start Export", key=f"start_export_{project['id']}"):
+            since = until = None
+            if len(date_range) > 0:
+                since = date_range[0].isoformat()
+                until = ((date_range[1] if len(date_range) > 1 else date_range[0]) + timedelta(days=1)).isoformat()
+            assessments = get_assessments(
+                project_id=project['id'],
+                columns=['id', 'timestamp', 'data'],
+                since=since,
+                until=until
+            )
+            if not assessments:
+                st.warning("No assessments in the selected date range.")
+            else:
+                try:
+                    job = start_export(project['id'], project['name'], assessments, export_format)
+                    st.session_state[job_key] = job.id
+                except Exception as e:
+                    st.error(f"Failed to start export: {str(e)}")
+
+        job_id = st.session_state.get(job_key)
+        if job_id:
+            show_export_progress(job_id)
+
+def show_export_progress(job_id):
+    """Poll an export job; reruns only this fragment while the job is running"""
+    job = get_export_job(job_id)
+    if job is None:
+        st.info("The last export is no longer available.")
+        return
+
+    if not job.done:
+        @st.fragment(run_every=EXPORT_POLL_INTERVAL)
+        def poll():
+            current = get_export_job(job_id)
+            st.progress(current.progress, text=current.message)
+            if current.done:
+                st.rerun()
+        poll()
+    elif job.status == 'failed':
+        st.error(job.message)
+    else:
+        st.success(job.message)
+        try:
+            show_file_download(
+                job.output_path,
+                label="📥 Download Export",
+                file_name=job.file_name,
+                mime="application/zip" if job.format == 'zip' else "application/pdf",
+                key=f"download_export_{job_id}"
+            )
+        except FileNotFoundError:
+            st.info("The export file has expired; start a new export.")